@@ -50,6 +50,7 @@ INSTALLED_APPS = [
     'attendance',
     'assets',
     'kpi',
+    'payroll',
 ]
 
 MIDDLEWARE = [
@@ -202,4 +203,35 @@ AUTH_USER_MODEL = 'authentication.User'
 
 # Media files configuration
 MEDIA_URL = '/media/'
-MEDIA_ROOT = BASE_DIR / 'media'
\ No newline at end of file
+MEDIA_ROOT = BASE_DIR / 'media'
+
+# Real-time attendance ingestion
+ATTENDANCE_SCAN_BATCH_SIZE = 500  # Max scans written per micro-batch
+ATTENDANCE_SCAN_FLUSH_INTERVAL = 1.0  # Seconds to wait for a batch to fill
+
+# Payroll
+PAYROLL_CHUNK_SIZE = 1000  # Employees computed and written per chunk
+PAYROLL_WORKERS = None  # Processes for run_payroll/render_payslips (None = one per CPU); requests compute inline
+PAYROLL_STALE_SECONDS = 900  # A 'processing' run without a chunk written for this long can be taken over
+PAYROLL_ATTENDANCE_BONUS = 775  # Paid to workers with no absent, late or unpaid days
+PAYROLL_COMPANY_NAME = 'HR Xen'  # Bank file header
+PAYROLL_DEBIT_ACCOUNT_NUMBER = ''  # Salary account debited
+
+# Salary grade revisions
+SALARY_GRADE_REVISION_CHUNK_SIZE = 1000  # Employees updated per bulk_update
+SALARY_GRADE_REVISION_BACKGROUND = True  # Run on a thread after the request; False runs inline on commit
+SALARY_GRADE_REVISION_STALE_SECONDS = 900  # A 'processing' revision without a chunk written for this long is reclaimed
+
+# Employee dashboard stats
+# Saves invalidate only the local process under LocMemCache, so the timeouts bound how
+# long other workers can serve stale figures
+EMPLOYEE_STATS_CACHE_TIMEOUT = 60  # Seconds; employee and organizational saves also invalidate
+ORGANIZATIONAL_DATA_CACHE_TIMEOUT = 60  # Seconds; versioned by signals
+
+# Cache (per-process; point at Redis/Memcached when running several workers)
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'hr-xen',
+    }
+}
@@ -17,6 +17,7 @@ urlpatterns = [
     path('api/assets/', include('assets.urls')),
     path('api/kpi/', include('kpi.urls')),
     path('api/attendance/', include('attendance.urls')),
+    path('api/payroll/', include('payroll.urls')),
 ]
 
 # Serve media files during development
@@ -1,6 +1,6 @@
 from django.contrib import admin
 from .models import (
-    AttendanceMachine, AttendanceScan, DailyAttendance, LeavePolicy,
+    AttendanceMachine, MachineSyncState, AttendanceScan, DailyAttendance, DailyAttendanceAggregate, LeavePolicy,
     LeaveBalance, LeaveRequest, Holiday, AttendanceSettings
 )
 
@@ -14,6 +14,14 @@ class AttendanceMachineAdmin(admin.ModelAdmin):
     ordering = ['name']
 
 
+@admin.register(MachineSyncState)
+class MachineSyncStateAdmin(admin.ModelAdmin):
+    list_display = ['machine', 'last_scan_time', 'last_record_id', 'records_synced', 'updated_at']
+    search_fields = ['machine__machine_id', 'machine__name']
+    readonly_fields = ['updated_at']
+    ordering = ['machine']
+
+
 @admin.register(AttendanceScan)
 class AttendanceScanAdmin(admin.ModelAdmin):
     list_display = ['employee', 'machine', 'scan_time', 'scan_type', 'is_processed']
@@ -45,6 +53,18 @@ class DailyAttendanceAdmin(admin.ModelAdmin):
     raw_id_fields = ['employee', 'edited_by']
 
 
+@admin.register(DailyAttendanceAggregate)
+class DailyAttendanceAggregateAdmin(admin.ModelAdmin):
+    list_display = [
+        'date', 'department', 'level_of_work', 'status', 'employee_count',
+        'total_working_hours', 'overtime_hours', 'extra_overtime_hours'
+    ]
+    list_filter = ['status', 'level_of_work', 'department']
+    readonly_fields = ['updated_at']
+    ordering = ['-date', 'department', 'level_of_work', 'status']
+    date_hierarchy = 'date'
+
+
 @admin.register(LeavePolicy)
 class LeavePolicyAdmin(admin.ModelAdmin):
     list_display = [
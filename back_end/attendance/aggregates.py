@@ -0,0 +1,138 @@
+"""
+Daily attendance rollup
+Maintains DailyAttendanceAggregate (date x department x level of work x status) so
+dashboards read a handful of pre-aggregated rows instead of scanning DailyAttendance
+"""
+
+import logging
+import threading
+from datetime import date, timedelta
+from typing import Dict, Iterable, Any
+
+from django.db import transaction
+from django.db.models import Count, Sum, Min, Max
+from django.utils import timezone
+
+from .models import DailyAttendance, DailyAttendanceAggregate
+
+logger = logging.getLogger(__name__)
+
+BACKFILL_CHUNK_DAYS = 31
+
+PRESENT_STATUSES = ('Present-OnTime', 'Present-Considered', 'Present-Late')
+
+# Dates waiting for the current thread's transaction to commit
+_pending = threading.local()
+
+
+def refresh_attendance_aggregates(dates: Iterable[date]) -> int:
+    """Rebuild the rollup rows for these dates from DailyAttendance, returns rows written"""
+    dates = sorted(set(dates))
+    if not dates:
+        return 0
+
+    groups = DailyAttendance.objects.filter(date__in=dates).values(
+        'date', 'employee__department_id', 'employee__level_of_work', 'status'
+    ).annotate(
+        employee_count=Count('id'),
+        working_hours=Sum('total_working_hours'),
+        overtime=Sum('overtime_hours'),
+        extra_overtime=Sum('extra_overtime_hours')
+    ).order_by()
+
+    # bulk_create bypasses auto_now, so stamp the rows ourselves
+    now = timezone.now()
+    rows = [
+        DailyAttendanceAggregate(
+            date=group['date'],
+            department_id=group['employee__department_id'],
+            level_of_work=group['employee__level_of_work'],
+            status=group['status'],
+            employee_count=group['employee_count'],
+            total_working_hours=group['working_hours'] or 0,
+            overtime_hours=group['overtime'] or 0,
+            extra_overtime_hours=group['extra_overtime'] or 0,
+            updated_at=now
+        )
+        for group in groups
+    ]
+
+    with transaction.atomic():
+        DailyAttendanceAggregate.objects.filter(date__in=dates).delete()
+        DailyAttendanceAggregate.objects.bulk_create(rows)
+    return len(rows)
+
+
+def _flush_pending_refresh():
+    dates, _pending.dates = getattr(_pending, 'dates', set()), set()
+    if dates:
+        refresh_attendance_aggregates(dates)
+
+
+def schedule_aggregate_refresh(dates: Iterable[date]):
+    """
+    Refresh the rollup for these dates once the surrounding transaction commits.
+    Dates collect per thread, so a transaction saving many records rebuilds each
+    date once: the first callback to run refreshes them all, the rest find nothing.
+    """
+    if not hasattr(_pending, 'dates'):
+        _pending.dates = set()
+    _pending.dates.update(dates)
+    # A rolled-back transaction drops its callbacks; its dates are refreshed by the
+    # next commit, which is harmless since a refresh rebuilds from DailyAttendance
+    transaction.on_commit(_flush_pending_refresh)
+
+
+def backfill_attendance_aggregates(start_date: date = None, end_date: date = None,
+                                   chunk_days: int = BACKFILL_CHUNK_DAYS) -> Dict[str, Any]:
+    """Rebuild the rollup for a date range (defaults to every recorded date), month-sized chunks at a time"""
+    if start_date is None or end_date is None:
+        bounds = DailyAttendance.objects.aggregate(first=Min('date'), last=Max('date'))
+        start_date = start_date or bounds['first']
+        end_date = end_date or bounds['last']
+    if start_date is None or end_date is None:
+        return {'start_date': None, 'end_date': None, 'days': 0, 'rows': 0}
+
+    rows, day = 0, start_date
+    while day <= end_date:
+        chunk_end = min(day + timedelta(days=chunk_days - 1), end_date)
+        rows += refresh_attendance_aggregates(day + timedelta(days=offset) for offset in range((chunk_end - day).days + 1))
+        day = chunk_end + timedelta(days=1)
+
+    logger.info(f"Backfilled attendance aggregates {start_date}..{end_date}: {rows} rows")
+    return {
+        'start_date': start_date.isoformat(),
+        'end_date': end_date.isoformat(),
+        'days': (end_date - start_date).days + 1,
+        'rows': rows,
+    }
+
+
+def daily_totals(target_date: date, queryset=None) -> Dict[str, Any]:
+    """Present/absent/leave totals and the per-department breakdown for one date"""
+    if queryset is None:
+        queryset = DailyAttendanceAggregate.objects.all()
+    rows = queryset.filter(date=target_date).values_list(
+        'department__name', 'status', 'employee_count'
+    )
+
+    totals = {'present': 0, 'absent': 0, 'leave': 0}
+    departments: Dict[str, Dict[str, Any]] = {}
+    for department, record_status, count in rows:
+        stats = departments.setdefault(department, {
+            'employee__department__name': department, 'total': 0, 'present': 0, 'absent': 0, 'leave': 0
+        })
+        stats['total'] += count
+        if record_status in PRESENT_STATUSES:
+            bucket = 'present'
+        elif record_status == 'Absent':
+            bucket = 'absent'
+        elif record_status.startswith('Leave-'):
+            bucket = 'leave'
+        else:
+            continue
+        stats[bucket] += count
+        totals[bucket] += count
+
+    totals['department_stats'] = sorted(departments.values(), key=lambda stats: stats['employee__department__name'] or '')
+    return totals
@@ -0,0 +1,99 @@
+"""
+Daily attendance summary builder
+Pairs each DailyAttendance row with its scans using one grouped scan query per chunk
+of employees, instead of one scan query per employee
+"""
+
+import json
+from collections import defaultdict
+from datetime import date, datetime, time, timedelta
+from datetime import timezone as dt_timezone
+from typing import Dict, Iterable, Iterator, List, Any
+
+from .models import AttendanceScan, DailyAttendance
+
+SUMMARY_CHUNK_SIZE = 1000  # Employees per grouped scan query when streaming
+
+SUMMARY_FIELDS = (
+    'employee_id', 'date', 'status', 'first_check_in', 'last_check_out',
+    'total_working_hours', 'overtime_hours', 'extra_overtime_hours', 'total_scans',
+    'employee__employee_id', 'employee__user__first_name', 'employee__user__last_name',
+    'employee__department__name', 'employee__designation__name', 'employee__level_of_work',
+)
+
+
+def summary_queryset(target_date: date):
+    """Flat, ordered projection of the day's attendance rows"""
+    return DailyAttendance.objects.filter(date=target_date).order_by('employee__employee_id')
+
+
+def _scans_by_employee(target_date: date, employee_pks: Iterable[int]) -> Dict[int, List[Dict[str, str]]]:
+    """All scans for the day for these employees, grouped by employee pk"""
+    day_start = datetime.combine(target_date, time.min, tzinfo=dt_timezone.utc)
+    day_end = day_start + timedelta(days=1)
+    rows = AttendanceScan.objects.filter(
+        employee_id__in=list(employee_pks), scan_time__gte=day_start, scan_time__lt=day_end
+    ).order_by('scan_time').values_list('employee_id', 'scan_time', 'scan_type')
+
+    scans = defaultdict(list)
+    for employee_pk, scan_time, scan_type in rows:
+        scans[employee_pk].append({
+            'time': scan_time.astimezone(dt_timezone.utc).strftime('%H:%M'),
+            'type': scan_type
+        })
+    return scans
+
+
+def _summary_row(record: Dict[str, Any], scans: List[Dict[str, str]]) -> Dict[str, Any]:
+    check_in, check_out = record['first_check_in'], record['last_check_out']
+    return {
+        'employee_id': record['employee__employee_id'],
+        'employee_name': f"{record['employee__user__first_name']} {record['employee__user__last_name']}".strip(),
+        'department': record['employee__department__name'],
+        'designation': record['employee__designation__name'],
+        'level_of_work': record['employee__level_of_work'],
+        'date': record['date'].strftime('%Y-%m-%d'),
+        'status': record['status'],
+        'check_in': check_in.strftime('%H:%M') if check_in else None,
+        'check_out': check_out.strftime('%H:%M') if check_out else None,
+        'working_hours': float(record['total_working_hours']),
+        'overtime': float(record['overtime_hours']),
+        'extra_overtime': float(record['extra_overtime_hours']),
+        'attendance_count': record['total_scans'],
+        'scans': scans
+    }
+
+
+def build_daily_summary(queryset, target_date: date) -> List[Dict[str, Any]]:
+    """Summary rows for a (sliced) queryset - two queries regardless of size"""
+    records = list(queryset.values(*SUMMARY_FIELDS))
+    scans = _scans_by_employee(target_date, {record['employee_id'] for record in records})
+    return [_summary_row(record, scans.get(record['employee_id'], [])) for record in records]
+
+
+def iter_daily_summary(queryset, target_date: date, chunk_size: int = SUMMARY_CHUNK_SIZE) -> Iterator[Dict[str, Any]]:
+    """Summary rows for the whole queryset, one grouped scan query per chunk"""
+    chunk = []
+    for record in queryset.values(*SUMMARY_FIELDS).iterator(chunk_size=chunk_size):
+        chunk.append(record)
+        if len(chunk) >= chunk_size:
+            yield from _emit_chunk(chunk, target_date)
+            chunk = []
+    if chunk:
+        yield from _emit_chunk(chunk, target_date)
+
+
+def _emit_chunk(records, target_date: date) -> Iterator[Dict[str, Any]]:
+    scans = _scans_by_employee(target_date, {record['employee_id'] for record in records})
+    for record in records:
+        yield _summary_row(record, scans.get(record['employee_id'], []))
+
+
+def stream_daily_summary_json(queryset, target_date: date) -> Iterator[bytes]:
+    """Encode the full summary as a JSON array chunk by chunk"""
+    first = True
+    yield b'['
+    for row in iter_daily_summary(queryset, target_date):
+        yield (b'' if first else b',') + json.dumps(row, separators=(',', ':')).encode()
+        first = False
+    yield b']'
@@ -0,0 +1,295 @@
+"""
+Resident lookup cache for the scan path
+Maps machine-reported employee/machine ids to database identities without a query per punch.
+The identities live in process memory. A single edit appends an invalidation event to a
+log in the Django cache, and every process replays new events by dropping just those
+keys; bulk or unknown changes bump a generation instead, and a process that sees it move
+drops its whole copy (as it does if it fell too far behind the log). With a shared cache
+backend that reaches every worker. Under the default LocMemCache the log is per process
+too, so other processes keep a stale mapping until restart - run a single ingestion
+process, or point CACHES at Redis/Memcached.
+"""
+
+import logging
+import threading
+from dataclasses import dataclass
+from typing import Dict, Iterable, Optional, Any
+
+from django.core.cache import cache
+from django.utils import timezone
+
+from .machine_adapters import device_timezone
+from .models import AttendanceMachine
+from employees.models import Employee
+
+logger = logging.getLogger(__name__)
+
+GENERATION_KEY = 'attendance:identity-cache:generation'
+SEQUENCE_KEY = 'attendance:identity-cache:invalidations'
+EVENT_KEY = 'attendance:identity-cache:invalidation:{}'
+EVENT_TIMEOUT = 24 * 60 * 60  # seconds; a process further behind than this starts over
+MAX_REPLAYED_EVENTS = 500
+
+
+@dataclass(frozen=True)
+class EmployeeIdentity:
+    """Fields the scan path needs about an employee"""
+    pk: int
+    employee_id: str
+    full_name: str
+    level_of_work: str
+    department_id: Optional[int]
+    off_day: str
+
+
+class IdentityCache:
+    """
+    Thread-safe employee_id -> EmployeeIdentity and machine_id -> pk cache, plus each
+    machine's configured timezone (None for the project TIME_ZONE).
+    Kept in sync by the post_save/post_delete receivers in attendance.signals.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._employees: Dict[str, EmployeeIdentity] = {}
+        self._employee_keys: Dict[int, str] = {}  # pk -> employee_id, for invalidation
+        self._machines: Dict[str, int] = {}
+        self._machine_keys: Dict[int, str] = {}
+        self._machine_timezones: Dict[int, Any] = {}
+        self.hits = 0
+        self.misses = 0
+        self.warmed_at = None
+        self._generation = None
+        self._sequence = None
+
+    def _check_generation(self):
+        """
+        Catch up with invalidations made by any process since we last looked: replay
+        per-key events, or drop everything after a bulk change or a gap in the log
+        """
+        state = cache.get_many([GENERATION_KEY, SEQUENCE_KEY])
+        generation, sequence = state.get(GENERATION_KEY, 0), state.get(SEQUENCE_KEY, 0)
+        if generation == self._generation and sequence == self._sequence:
+            return
+
+        events = None
+        if generation == self._generation and self._sequence is not None \
+                and 0 < sequence - self._sequence <= MAX_REPLAYED_EVENTS:
+            keys = [EVENT_KEY.format(number) for number in range(self._sequence + 1, sequence + 1)]
+            events = cache.get_many(keys)
+            if len(events) < len(keys):
+                # Expired, evicted or not yet written - cannot tell what changed
+                events = None
+
+        with self._lock:
+            if events is None:
+                self._clear()
+            else:
+                for kind, pk in events.values():
+                    self._drop(kind, pk)
+            self._generation, self._sequence = generation, sequence
+
+    @staticmethod
+    def _incr(key: str) -> int:
+        try:
+            return cache.incr(key)
+        except ValueError:
+            cache.set(key, 1, None)
+            return 1
+
+    def _publish(self, kind: str, pk: int):
+        """Tell every process to drop one identity"""
+        cache.set(EVENT_KEY.format(self._incr(SEQUENCE_KEY)), (kind, pk), EVENT_TIMEOUT)
+
+    def _drop(self, kind: str, pk: int):
+        if kind == 'employee':
+            employee_id = self._employee_keys.pop(pk, None)
+            if employee_id is not None:
+                self._employees.pop(employee_id, None)
+        else:
+            machine_id = self._machine_keys.pop(pk, None)
+            if machine_id is not None:
+                self._machines.pop(machine_id, None)
+            self._machine_timezones.pop(pk, None)
+
+    def warm(self):
+        """Load every employee and machine identity"""
+        self._check_generation()
+        employees = self._load_employees(Employee.objects.all())
+        machine_rows = self._load_machines(AttendanceMachine.objects.all())
+        machines = {machine_id: pk for machine_id, pk, _ in machine_rows}
+
+        with self._lock:
+            self._employees = {identity.employee_id: identity for identity in employees}
+            self._employee_keys = {identity.pk: identity.employee_id for identity in employees}
+            self._machines = machines
+            self._machine_keys = {pk: machine_id for machine_id, pk in machines.items()}
+            self._machine_timezones = {pk: device_tz for _, pk, device_tz in machine_rows}
+            self.warmed_at = timezone.now()
+
+        logger.info(f"Identity cache warmed: {len(employees)} employees, {len(machines)} machines")
+
+    def get_employees(self, employee_ids: Iterable[str]) -> Dict[str, EmployeeIdentity]:
+        """Resolve employee ids, loading any misses with a single query"""
+        self._check_generation()
+        found, missing = {}, set()
+        with self._lock:
+            for employee_id in set(employee_ids):
+                identity = self._employees.get(employee_id)
+                if identity is None:
+                    missing.add(employee_id)
+                else:
+                    found[employee_id] = identity
+            self.hits += len(found)
+            self.misses += len(missing)
+
+        if missing:
+            loaded = self._load_employees(Employee.objects.filter(employee_id__in=missing))
+            with self._lock:
+                for identity in loaded:
+                    self._employees[identity.employee_id] = identity
+                    self._employee_keys[identity.pk] = identity.employee_id
+                    found[identity.employee_id] = identity
+
+        return found
+
+    def get_machines(self, machine_ids: Iterable[str]) -> Dict[str, int]:
+        """Resolve machine ids to primary keys, loading any misses with a single query"""
+        self._check_generation()
+        found, missing = {}, set()
+        with self._lock:
+            for machine_id in set(machine_ids):
+                pk = self._machines.get(machine_id)
+                if pk is None:
+                    missing.add(machine_id)
+                else:
+                    found[machine_id] = pk
+            self.hits += len(found)
+            self.misses += len(missing)
+
+        if missing:
+            loaded = self._load_machines(AttendanceMachine.objects.filter(machine_id__in=missing))
+            with self._lock:
+                for machine_id, pk, device_tz in loaded:
+                    self._machines[machine_id] = pk
+                    self._machine_keys[pk] = machine_id
+                    self._machine_timezones[pk] = device_tz
+                    found[machine_id] = pk
+
+        return found
+
+    def get_machine_timezone(self, pk: int):
+        """Timezone a machine's clock runs in (None: project TIME_ZONE), loading a miss with one query"""
+        self._check_generation()
+        with self._lock:
+            if pk in self._machine_timezones:
+                self.hits += 1
+                return self._machine_timezones[pk]
+            self.misses += 1
+
+        loaded = self._load_machines(AttendanceMachine.objects.filter(pk=pk))
+        if not loaded:
+            return None
+        machine_id, pk, device_tz = loaded[0]
+        with self._lock:
+            self._machines[machine_id] = pk
+            self._machine_keys[pk] = machine_id
+            self._machine_timezones[pk] = device_tz
+        return device_tz
+
+    def get_employee_by_pk(self, pk: int) -> Optional[EmployeeIdentity]:
+        """Resolve an employee primary key (as held by a scan row), loading a miss with one query"""
+        self._check_generation()
+        with self._lock:
+            employee_id = self._employee_keys.get(pk)
+            identity = self._employees.get(employee_id) if employee_id is not None else None
+            if identity is not None:
+                self.hits += 1
+                return identity
+            self.misses += 1
+
+        loaded = self._load_employees(Employee.objects.filter(pk=pk))
+        if not loaded:
+            return None
+        identity = loaded[0]
+        with self._lock:
+            self._employees[identity.employee_id] = identity
+            self._employee_keys[identity.pk] = identity.employee_id
+        return identity
+
+    def invalidate_employee(self, pk: int):
+        """Drop a cached employee by primary key, here and (through the event log) elsewhere"""
+        with self._lock:
+            self._drop('employee', pk)
+        self._publish('employee', pk)
+
+    def invalidate_machine(self, pk: int):
+        """Drop a cached machine by primary key, here and (through the event log) elsewhere"""
+        with self._lock:
+            self._drop('machine', pk)
+        self._publish('machine', pk)
+
+    def invalidate_all(self):
+        """Drop every identity in every process - for bulk or untracked changes"""
+        with self._lock:
+            self._clear()
+        self._incr(GENERATION_KEY)
+
+    def clear(self):
+        """Drop every cached identity"""
+        with self._lock:
+            self._clear()
+
+    def _clear(self):
+        self._employees.clear()
+        self._employee_keys.clear()
+        self._machines.clear()
+        self._machine_keys.clear()
+        self._machine_timezones.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Cache size and hit/miss counters"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'employees': len(self._employees),
+                'machines': len(self._machines),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups * 100, 2) if lookups else 0,
+                'warmed_at': self.warmed_at.isoformat() if self.warmed_at else None
+            }
+
+    @staticmethod
+    def _load_machines(queryset):
+        return [
+            (machine_id, pk, device_timezone(config, machine_id))
+            for machine_id, pk, config in queryset.values_list('machine_id', 'id', 'config')
+        ]
+
+    @staticmethod
+    def _load_employees(queryset):
+        rows = queryset.values_list(
+            'id', 'employee_id', 'user__first_name', 'user__last_name',
+            'level_of_work', 'department_id', 'off_day'
+        )
+        return [
+            EmployeeIdentity(
+                pk=pk,
+                employee_id=employee_id,
+                full_name=f"{first_name} {last_name}".strip(),
+                level_of_work=level_of_work,
+                department_id=department_id,
+                off_day=off_day
+            )
+            for pk, employee_id, first_name, last_name, level_of_work, department_id, off_day in rows
+        ]
+
+
+# Global instance
+identity_cache = IdentityCache()
+
+
+def get_identity_cache() -> IdentityCache:
+    """Get the process-wide identity cache"""
+    return identity_cache
@@ -9,10 +9,11 @@ import socket
 import json
 import logging
 from abc import ABC, abstractmethod
-from datetime import datetime, timezone
+from datetime import datetime, timezone, timedelta
 from typing import List, Dict, Any, Optional, Tuple
 from dataclasses import dataclass
 from enum import Enum
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
 
 logger = logging.getLogger(__name__)
 
@@ -36,6 +37,62 @@ class ScanData:
     raw_data: Dict[str, Any]
     is_valid: bool = True
     error_message: Optional[str] = None
+    record_id: Optional[str] = None  # Device-side log record id, if the machine reports one
+
+
+def aware_utc(value: datetime, device_tz=None) -> datetime:
+    """
+    Scan times are compared against watermarks restored from the database, which are
+    aware (USE_TZ) - so every parsed time is made aware UTC. Naive device clocks are
+    read in the machine's configured timezone, else the project TIME_ZONE.
+    """
+    if value.tzinfo is None:
+        if device_tz is None:
+            from django.conf import settings
+            device_tz = ZoneInfo(getattr(settings, 'TIME_ZONE', 'UTC') or 'UTC')
+        value = value.replace(tzinfo=device_tz)
+    return value.astimezone(timezone.utc)
+
+
+def device_timezone(config: Dict[str, Any], machine_id: Optional[str] = None):
+    """The machine's configured timezone, or None (project TIME_ZONE) when unset or unknown"""
+    name = (config or {}).get('timezone')
+    if not name:
+        return None
+    try:
+        return ZoneInfo(name)
+    except (ZoneInfoNotFoundError, ValueError):
+        logger.error(f"Unknown timezone {name!r} for machine {machine_id}, using TIME_ZONE")
+        return None
+
+
+def local_scan_time(value: datetime, device_tz=None) -> datetime:
+    """
+    Wall-clock time of a stored (UTC) scan where the machine stands - the attendance
+    date and the check-in/out times the rules compare are taken from this
+    """
+    if device_tz is None:
+        from django.utils import timezone as django_timezone
+        return django_timezone.localtime(value)
+    return value.astimezone(device_tz)
+
+
+def _scan_identity(scan: 'ScanData') -> Tuple[str, datetime, str]:
+    return (scan.employee_id, scan.scan_time, scan.scan_type.value)
+
+
+def _record_sort_key(record_id: Optional[str]) -> Tuple[int, int, str]:
+    """Order device record ids numerically when possible, otherwise lexically"""
+    if not record_id:
+        return (0, 0, '')
+    if record_id.isdigit():
+        return (1, int(record_id), '')
+    return (2, 0, record_id)
+
+
+def watermark_key(scan_time: datetime, record_id: Optional[str]) -> Tuple[datetime, Tuple[int, int, str]]:
+    """Comparable (scan_time, record_id) position in a machine's log"""
+    return (scan_time, _record_sort_key(record_id))
 
 
 class BaseMachineAdapter(ABC):
@@ -51,6 +108,17 @@ class BaseMachineAdapter(ABC):
         self.is_connected = False
         self.last_sync = None
         
+        # Incremental sync: committed_watermark is persisted once a batch is stored,
+        # fetch_watermark runs ahead of it for scans that are queued but not yet committed
+        self.device_tz = device_timezone(self.config, self.machine_id)
+        watermark = machine_config.get('watermark')
+        if watermark:
+            watermark = (aware_utc(watermark[0], self.device_tz), watermark[1])
+        self.committed_watermark: Optional[Tuple[datetime, Optional[str]]] = watermark
+        self.fetch_watermark: Optional[Tuple[datetime, Optional[str]]] = watermark
+        # Id-less scans at exactly the fetch watermark's time that were already taken
+        self._seen_at_watermark = set()
+        
     @abstractmethod
     async def connect(self) -> bool:
         """Connect to the machine"""
@@ -71,6 +139,49 @@ class BaseMachineAdapter(ABC):
         """Test machine connection"""
         pass
     
+    async def get_new_scans(self) -> List[ScanData]:
+        """Get only the scans after the fetch watermark and advance it"""
+        from_time = self.fetch_watermark[0] if self.fetch_watermark else None
+        scans = await self.get_scans(from_time)
+        
+        if self.fetch_watermark:
+            # Devices treat 'from' inclusively (or ignore it), so drop what we already have
+            floor_time = self.fetch_watermark[0]
+            floor = watermark_key(*self.fetch_watermark)
+            
+            def is_new(scan):
+                if watermark_key(scan.scan_time, scan.record_id) > floor:
+                    return True
+                # Without a record id, scans sharing the watermark's timestamp cannot be
+                # ordered - take the ones not seen yet; unique_attendance_scan drops any
+                # already stored (e.g. after a restart)
+                return (not scan.record_id and scan.scan_time == floor_time
+                        and _scan_identity(scan) not in self._seen_at_watermark)
+            
+            scans = [scan for scan in scans if is_new(scan)]
+        
+        if scans:
+            latest = max(scans, key=lambda scan: watermark_key(scan.scan_time, scan.record_id))
+            if self.fetch_watermark is None or latest.scan_time != self.fetch_watermark[0]:
+                self._seen_at_watermark = set()
+            self._seen_at_watermark.update(
+                _scan_identity(scan) for scan in scans if scan.scan_time == latest.scan_time
+            )
+            self.fetch_watermark = (latest.scan_time, latest.record_id)
+        
+        return scans
+    
+    def commit_watermark(self, scan_time: datetime, record_id: Optional[str]):
+        """Record that everything up to (scan_time, record_id) is stored"""
+        if self.committed_watermark is None or \
+                watermark_key(scan_time, record_id) > watermark_key(*self.committed_watermark):
+            self.committed_watermark = (scan_time, record_id)
+    
+    def rewind_watermark(self):
+        """Re-fetch everything after the committed watermark on the next poll"""
+        self.fetch_watermark = self.committed_watermark
+        self._seen_at_watermark = set()
+    
     def _parse_scan_type(self, raw_scan_type: str) -> ScanType:
         """Parse machine-specific scan type to standard format"""
         scan_type_mapping = {
@@ -128,7 +239,8 @@ class SimulatedMachineAdapter(BaseMachineAdapter):
         for _ in range(num_scans):
             self.scan_counter += 1
             employee_id = random.choice(self.employees)
-            scan_time = current_time - timedelta(minutes=random.randint(0, 30))
+            # Stay ahead of the sync watermark so incremental polling picks it up
+            scan_time = current_time + timedelta(microseconds=self.scan_counter)
             scan_type = random.choice([ScanType.IN, ScanType.OUT])
             
             scan = ScanData(
@@ -140,7 +252,8 @@ class SimulatedMachineAdapter(BaseMachineAdapter):
                     'simulated': True,
                     'scan_number': self.scan_counter,
                     'random_factor': random.random()
-                }
+                },
+                record_id=str(self.scan_counter)
             )
             scans.append(scan)
         
@@ -220,15 +333,18 @@ class ZKTecoAdapter(BaseMachineAdapter):
         if 'attendance' in data:
             for record in data['attendance']:
                 try:
-                    scan_time = datetime.fromisoformat(record['time'].replace('Z', '+00:00'))
+                    scan_time = aware_utc(datetime.fromisoformat(record['time'].replace('Z', '+00:00')), self.device_tz)
                     scan_type = self._parse_scan_type(record.get('type', 'IN'))
                     
+                    record_id = record.get('id', record.get('uid'))
+                    
                     scan = ScanData(
                         employee_id=record['user_id'],
                         scan_time=scan_time,
                         scan_type=scan_type,
                         machine_id=self.machine_id,
-                        raw_data=record
+                        raw_data=record,
+                        record_id=str(record_id) if record_id is not None else None
                     )
                     scans.append(scan)
                 except Exception as e:
@@ -318,15 +434,18 @@ class SupremaAdapter(BaseMachineAdapter):
         if 'records' in data:
             for record in data['records']:
                 try:
-                    scan_time = datetime.fromisoformat(record['timestamp'].replace('Z', '+00:00'))
+                    scan_time = aware_utc(datetime.fromisoformat(record['timestamp'].replace('Z', '+00:00')), self.device_tz)
                     scan_type = self._parse_scan_type(record.get('event_type', 'IN'))
                     
+                    record_id = record.get('id', record.get('event_id'))
+                    
                     scan = ScanData(
                         employee_id=record['user_id'],
                         scan_time=scan_time,
                         scan_type=scan_type,
                         machine_id=self.machine_id,
-                        raw_data=record
+                        raw_data=record,
+                        record_id=str(record_id) if record_id is not None else None
                     )
                     scans.append(scan)
                 except Exception as e:
@@ -415,15 +534,19 @@ class GenericTCPAdapter(BaseMachineAdapter):
                 parts = line.split('|')
                 if len(parts) >= 3:
                     employee_id = parts[0]
-                    scan_time = datetime.fromisoformat(parts[1])
+                    scan_time = aware_utc(datetime.fromisoformat(parts[1]), self.device_tz)
                     scan_type = self._parse_scan_type(parts[2])
                     
+                    # Optional 4th field carries the device record id
+                    record_id = parts[3] if len(parts) >= 4 and parts[3] else None
+                    
                     scan = ScanData(
                         employee_id=employee_id,
                         scan_time=scan_time,
                         scan_type=scan_type,
                         machine_id=self.machine_id,
-                        raw_data={'raw_line': line}
+                        raw_data={'raw_line': line},
+                        record_id=record_id
                     )
                     scans.append(scan)
             except Exception as e:
@@ -526,6 +649,39 @@ class MachineManager:
         
         return all_scans
     
+    async def get_new_scans(self) -> List[ScanData]:
+        """Get scans past each machine's watermark from all machines"""
+        all_scans = []
+        
+        tasks = []
+        for machine_id, adapter in self.adapters.items():
+            if adapter.is_connected:
+                tasks.append(adapter.get_new_scans())
+        
+        if tasks:
+            results = await asyncio.gather(*tasks, return_exceptions=True)
+            for result in results:
+                if isinstance(result, list):
+                    all_scans.extend(result)
+                elif isinstance(result, Exception):
+                    logger.error(f"Error getting scans: {str(result)}")
+        
+        return all_scans
+    
+    def commit_watermarks(self, watermarks: Dict[str, Tuple[datetime, Optional[str]]]):
+        """Advance committed watermarks after a batch is stored"""
+        for machine_id, (scan_time, record_id) in watermarks.items():
+            adapter = self.adapters.get(machine_id)
+            if adapter:
+                adapter.commit_watermark(scan_time, record_id)
+    
+    def rewind_watermarks(self, machine_ids):
+        """Roll fetch watermarks back to the committed position after a failed batch"""
+        for machine_id in machine_ids:
+            adapter = self.adapters.get(machine_id)
+            if adapter:
+                adapter.rewind_watermark()
+    
     async def test_all_connections(self) -> Dict[str, bool]:
         """Test all machine connections"""
         results = {}
@@ -0,0 +1,43 @@
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from attendance.aggregates import backfill_attendance_aggregates
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the daily attendance rollup used by dashboards and reports'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--start',
+            help='Range start date, as YYYY-MM-DD (defaults to the first recorded date)',
+        )
+        parser.add_argument(
+            '--end',
+            help='Range end date, as YYYY-MM-DD (defaults to the last recorded date)',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            start_date = datetime.strptime(options['start'], '%Y-%m-%d').date() if options['start'] else None
+            end_date = datetime.strptime(options['end'], '%Y-%m-%d').date() if options['end'] else None
+        except ValueError as e:
+            raise CommandError(f'Invalid date: {e}')
+
+        if start_date and end_date and start_date > end_date:
+            raise CommandError('Start date cannot be after end date')
+
+        self.stdout.write('Rebuilding attendance aggregates...')
+        result = backfill_attendance_aggregates(start_date, end_date)
+
+        if not result['days']:
+            self.stdout.write(self.style.WARNING('No daily attendance records to aggregate'))
+            return
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Wrote {result['rows']} aggregate rows for {result['days']} days "
+                f"({result['start_date']} to {result['end_date']})"
+            )
+        )
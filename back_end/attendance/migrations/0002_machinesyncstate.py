@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MachineSyncState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('last_scan_time', models.DateTimeField(blank=True, help_text='Scan time of the last committed record', null=True)),
+                ('last_record_id', models.CharField(blank=True, help_text='Device record id of the last committed record', max_length=100)),
+                ('records_synced', models.PositiveBigIntegerField(default=0, help_text='Total records committed through this machine')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('machine', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='sync_state', to='attendance.attendancemachine')),
+            ],
+            options={
+                'verbose_name': 'Machine Sync State',
+                'verbose_name_plural': 'Machine Sync States',
+                'db_table': 'attendance_machine_sync_state',
+            },
+        ),
+    ]
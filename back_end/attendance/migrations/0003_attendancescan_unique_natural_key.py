@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:12
+
+from django.db import migrations, models
+
+
+def remove_duplicate_scans(apps, schema_editor):
+    """Keep the earliest stored copy of each (employee, machine, scan_time, scan_type)"""
+    AttendanceScan = apps.get_model('attendance', 'AttendanceScan')
+    seen = set()
+    duplicate_ids = []
+    scans = AttendanceScan.objects.order_by('created_at').values_list(
+        'id', 'employee_id', 'machine_id', 'scan_time', 'scan_type'
+    )
+    for scan_id, employee_id, machine_id, scan_time, scan_type in scans.iterator(chunk_size=2000):
+        key = (employee_id, machine_id, scan_time, scan_type)
+        if key in seen:
+            duplicate_ids.append(scan_id)
+        else:
+            seen.add(key)
+    for start in range(0, len(duplicate_ids), 500):
+        AttendanceScan.objects.filter(id__in=duplicate_ids[start:start + 500]).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0002_machinesyncstate'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_scans, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='attendancescan',
+            constraint=models.UniqueConstraint(fields=('employee', 'machine', 'scan_time', 'scan_type'), name='unique_attendance_scan'),
+        ),
+    ]
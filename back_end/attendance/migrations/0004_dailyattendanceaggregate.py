@@ -0,0 +1,75 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:20
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.utils import timezone
+
+
+# Frozen copy of attendance.aggregates.refresh_attendance_aggregates as of this migration,
+# run over every recorded date so dashboards have their rollup as soon as it is created
+def backfill_attendance_aggregates(apps, schema_editor):
+    DailyAttendance = apps.get_model('attendance', 'DailyAttendance')
+    DailyAttendanceAggregate = apps.get_model('attendance', 'DailyAttendanceAggregate')
+    groups = DailyAttendance.objects.values(
+        'date', 'employee__department_id', 'employee__level_of_work', 'status'
+    ).annotate(
+        employee_count=Count('id'),
+        working_hours=Sum('total_working_hours'),
+        overtime=Sum('overtime_hours'),
+        extra_overtime=Sum('extra_overtime_hours')
+    ).order_by()
+
+    now = timezone.now()
+    DailyAttendanceAggregate.objects.bulk_create(
+        (
+            DailyAttendanceAggregate(
+                date=group['date'],
+                department_id=group['employee__department_id'],
+                level_of_work=group['employee__level_of_work'],
+                status=group['status'],
+                employee_count=group['employee_count'],
+                total_working_hours=group['working_hours'] or 0,
+                overtime_hours=group['overtime'] or 0,
+                extra_overtime_hours=group['extra_overtime'] or 0,
+                updated_at=now
+            )
+            for group in groups.iterator()
+        ),
+        batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0003_attendancescan_unique_natural_key'),
+        ('employees', '0008_employee_generated_email_employee_generated_password'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyAttendanceAggregate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(help_text='Attendance date')),
+                ('level_of_work', models.CharField(choices=[('worker', 'Worker'), ('staff', 'Staff')], max_length=20)),
+                ('status', models.CharField(choices=[('Present-OnTime', 'Present On Time'), ('Present-Considered', 'Present Considered'), ('Present-Late', 'Present Late'), ('Absent', 'Absent'), ('Leave-Earn', 'Leave Earn'), ('Leave-Casual', 'Leave Casual'), ('Leave-Sick', 'Leave Sick'), ('Leave-Maternity', 'Leave Maternity'), ('Leave-WithOutPay', 'Leave Without Pay'), ('Holiday', 'Holiday'), ('Weekend', 'Weekend')], max_length=20)),
+                ('employee_count', models.PositiveIntegerField(default=0)),
+                ('total_working_hours', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('overtime_hours', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('extra_overtime_hours', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('department', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='attendance_aggregates', to='employees.department')),
+            ],
+            options={
+                'verbose_name': 'Daily Attendance Aggregate',
+                'verbose_name_plural': 'Daily Attendance Aggregates',
+                'db_table': 'attendance_daily_aggregate',
+                'ordering': ['-date', 'department', 'level_of_work', 'status'],
+                'indexes': [models.Index(fields=['date', 'status'], name='attendance__date_8463ca_idx')],
+                'unique_together': {('date', 'department', 'level_of_work', 'status')},
+            },
+        ),
+        migrations.RunPython(backfill_attendance_aggregates, migrations.RunPython.noop),
+    ]
@@ -5,6 +5,8 @@ from employees.models import Employee, Department
 from authentication.models import User
 import uuid
 
+from .rules import get_attendance_rules
+
 
 class AttendanceMachine(models.Model):
     """
@@ -55,6 +57,29 @@ class AttendanceMachine(models.Model):
         return f"{self.name} ({self.machine_type})"
 
 
+class MachineSyncState(models.Model):
+    """
+    Model to store the incremental sync high-water mark for each machine
+    """
+    machine = models.OneToOneField(
+        AttendanceMachine,
+        on_delete=models.CASCADE,
+        related_name='sync_state'
+    )
+    last_scan_time = models.DateTimeField(null=True, blank=True, help_text="Scan time of the last committed record")
+    last_record_id = models.CharField(max_length=100, blank=True, help_text="Device record id of the last committed record")
+    records_synced = models.PositiveBigIntegerField(default=0, help_text="Total records committed through this machine")
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'attendance_machine_sync_state'
+        verbose_name = 'Machine Sync State'
+        verbose_name_plural = 'Machine Sync States'
+    
+    def __str__(self):
+        return f"{self.machine.machine_id} - {self.last_scan_time}"
+
+
 class AttendanceScan(models.Model):
     """
     Model to store individual attendance scans from machines
@@ -95,6 +120,13 @@ class AttendanceScan(models.Model):
             models.Index(fields=['machine', 'scan_time']),
             models.Index(fields=['scan_time']),
         ]
+        constraints = [
+            # Natural key - re-polled or retried scans are rejected instead of duplicated
+            models.UniqueConstraint(
+                fields=['employee', 'machine', 'scan_time', 'scan_type'],
+                name='unique_attendance_scan'
+            ),
+        ]
     
     def __str__(self):
         return f"{self.employee.employee_id} - {self.scan_type} at {self.scan_time}"
@@ -189,74 +221,114 @@ class DailyAttendance(models.Model):
     def __str__(self):
         return f"{self.employee.employee_id} - {self.date} - {self.status}"
     
-    def calculate_working_hours(self):
-        """Calculate working hours based on check-in/out times"""
-        if not self.first_check_in or not self.last_check_out:
-            return 0
-        
-        # Convert times to minutes for calculation
-        check_in_minutes = self.first_check_in.hour * 60 + self.first_check_in.minute
-        check_out_minutes = self.last_check_out.hour * 60 + self.last_check_out.minute
+    def apply_scan(self, scan_type, scan_time, level_of_work=None, rules=None):
+        """
+        Fold a single scan into the counters and check-in/out times. scan_time is the
+        machine's local wall-clock time (machine_adapters.local_scan_time), not UTC.
+        Pass level_of_work and rules when already known to avoid extra lookups.
+        """
+        self.total_scans += 1
         
-        # Handle overnight shifts (check-out next day)
-        if check_out_minutes < check_in_minutes:
-            check_out_minutes += 24 * 60
+        if scan_type in ['IN', 'BREAK_OUT', 'OVERTIME_IN']:
+            self.check_in_count += 1
+            if not self.first_check_in:
+                self.first_check_in = scan_time.time()
+        elif scan_type in ['OUT', 'BREAK_IN', 'OVERTIME_OUT']:
+            self.check_out_count += 1
+            self.last_check_out = scan_time.time()
         
-        # Calculate total minutes worked
-        total_minutes = check_out_minutes - check_in_minutes
-        
-        # Subtract lunch break (1 hour = 60 minutes)
-        total_minutes -= 60
-        
-        # Convert to hours
-        working_hours = max(0, total_minutes / 60)
-        return round(working_hours, 2)
+        self.recalculate(level_of_work, rules)
     
-    def calculate_overtime(self):
-        """Calculate overtime hours for workers"""
-        if self.employee.level_of_work != 'worker':
-            return 0
-        
-        if not self.last_check_out:
-            return 0
+    def recalculate(self, level_of_work=None, rules=None):
+        """Recalculate working hours, overtime, eligibility flags and status"""
+        if not self.first_check_in or not self.last_check_out:
+            return
         
-        # Overtime starts after 5:00 PM (17:00)
-        overtime_start_minutes = 17 * 60  # 5:00 PM
-        check_out_minutes = self.last_check_out.hour * 60 + self.last_check_out.minute
+        rules = rules or get_attendance_rules()
         
-        # Handle overnight shifts
-        if check_out_minutes < overtime_start_minutes:
-            check_out_minutes += 24 * 60
-            overtime_start_minutes += 24 * 60
+        self.total_working_hours = self.calculate_working_hours(rules)
+        if rules.auto_calculate_overtime:
+            self.overtime_hours = self.calculate_overtime(level_of_work, rules)
+        if rules.auto_calculate_extra_overtime:
+            self.extra_overtime_hours = self.calculate_extra_overtime(level_of_work, rules)
         
-        if check_out_minutes > overtime_start_minutes:
-            overtime_minutes = min(check_out_minutes - overtime_start_minutes, 2 * 60)  # Max 2 hours
-            return round(overtime_minutes / 60, 2)
+        # Update eligibility flags
+        self.snacks_eligible = rules.snacks_eligible(self.extra_overtime_hours)
+        self.night_bill_eligible = rules.night_bill_eligible(self.extra_overtime_hours)
         
-        return 0
+        # Update status
+        check_in = self.first_check_in
+        self.status = rules.status(check_in.hour * 3600 + check_in.minute * 60 + check_in.second)
     
-    def calculate_extra_overtime(self):
-        """Calculate extra overtime hours for workers (after 7:00 PM)"""
-        if self.employee.level_of_work != 'worker':
+    def calculate_working_hours(self, rules=None):
+        """Calculate working hours based on check-in/out times"""
+        if not self.first_check_in or not self.last_check_out:
             return 0
         
+        rules = rules or get_attendance_rules()
+        return rules.working_hours(
+            self.first_check_in.hour * 60 + self.first_check_in.minute,
+            self.last_check_out.hour * 60 + self.last_check_out.minute
+        )
+    
+    def calculate_overtime(self, level_of_work=None, rules=None):
+        """Calculate overtime hours for workers"""
         if not self.last_check_out:
             return 0
         
-        # Extra overtime starts after 7:00 PM (19:00)
-        extra_overtime_start_minutes = 19 * 60  # 7:00 PM
-        check_out_minutes = self.last_check_out.hour * 60 + self.last_check_out.minute
-        
-        # Handle overnight shifts
-        if check_out_minutes < extra_overtime_start_minutes:
-            check_out_minutes += 24 * 60
-            extra_overtime_start_minutes += 24 * 60
-        
-        if check_out_minutes > extra_overtime_start_minutes:
-            extra_overtime_minutes = check_out_minutes - extra_overtime_start_minutes
-            return round(extra_overtime_minutes / 60, 2)
+        rules = rules or get_attendance_rules()
+        return rules.overtime(
+            self.last_check_out.hour * 60 + self.last_check_out.minute,
+            (level_of_work or self.employee.level_of_work) == 'worker'
+        )
+    
+    def calculate_extra_overtime(self, level_of_work=None, rules=None):
+        """Calculate extra overtime hours for workers (after the extra overtime start time)"""
+        if not self.last_check_out:
+            return 0
         
-        return 0
+        rules = rules or get_attendance_rules()
+        return rules.extra_overtime(
+            self.last_check_out.hour * 60 + self.last_check_out.minute,
+            (level_of_work or self.employee.level_of_work) == 'worker'
+        )
+
+
+class DailyAttendanceAggregate(models.Model):
+    """
+    Model to store pre-aggregated daily attendance counts for dashboards and reports
+    (one row per date x department x level of work x status)
+    """
+    date = models.DateField(help_text="Attendance date")
+    department = models.ForeignKey(
+        Department,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='attendance_aggregates'
+    )
+    level_of_work = models.CharField(max_length=20, choices=Employee.EMPLOYEE_TYPE_CHOICES)
+    status = models.CharField(max_length=20, choices=DailyAttendance.STATUS_CHOICES)
+    
+    employee_count = models.PositiveIntegerField(default=0)
+    total_working_hours = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    overtime_hours = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    extra_overtime_hours = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'attendance_daily_aggregate'
+        verbose_name = 'Daily Attendance Aggregate'
+        verbose_name_plural = 'Daily Attendance Aggregates'
+        unique_together = ['date', 'department', 'level_of_work', 'status']
+        ordering = ['-date', 'department', 'level_of_work', 'status']
+        indexes = [
+            models.Index(fields=['date', 'status']),
+        ]
+    
+    def __str__(self):
+        return f"{self.date} - {self.department} - {self.level_of_work} - {self.status}: {self.employee_count}"
 
 
 class LeavePolicy(models.Model):
@@ -12,14 +12,17 @@ from dataclasses import dataclass, asdict
 from enum import Enum
 import websockets
 from websockets.server import WebSocketServerProtocol
+from asgiref.sync import sync_to_async
 from django.conf import settings
 from django.utils import timezone as django_timezone
 
 from .models import (
     AttendanceMachine, AttendanceScan, DailyAttendance, Employee,
-    AttendanceSettings
+    AttendanceSettings, MachineSyncState
 )
 from .machine_adapters import MachineManager, ScanData, ScanType
+from .scan_ingestion import ScanBatchProcessor, batch_watermarks
+from .identity_cache import get_identity_cache
 from employees.models import Employee
 
 logger = logging.getLogger(__name__)
@@ -55,6 +58,10 @@ class RealtimeAttendanceSystem:
         self.event_queue = asyncio.Queue()
         self.health_check_interval = 30  # seconds
         self.scan_processing_interval = 5  # seconds
+        self.scan_batch_size = getattr(settings, 'ATTENDANCE_SCAN_BATCH_SIZE', 500)
+        self.scan_flush_interval = getattr(settings, 'ATTENDANCE_SCAN_FLUSH_INTERVAL', 1.0)  # seconds
+        self.identity_cache = get_identity_cache()
+        self.scan_processor = ScanBatchProcessor(self.identity_cache)
         self.last_health_check = None
         
     async def start(self):
@@ -102,15 +109,25 @@ class RealtimeAttendanceSystem:
     async def _load_machines(self):
         """Load machines from database"""
         try:
-            machines = AttendanceMachine.objects.filter(status='active')
+            machines = AttendanceMachine.objects.filter(status='active').select_related('sync_state')
             for machine in machines:
+                # Resume incremental sync from the last committed record
+                watermark = None
+                try:
+                    sync_state = machine.sync_state
+                    if sync_state.last_scan_time:
+                        watermark = (sync_state.last_scan_time, sync_state.last_record_id or None)
+                except MachineSyncState.DoesNotExist:
+                    pass
+                
                 config = {
                     'machine_id': machine.machine_id,
                     'ip_address': machine.ip_address,
                     'port': machine.port,
                     'username': machine.config.get('username', ''),
                     'password': machine.config.get('password', ''),
-                    'config': machine.config
+                    'config': machine.config,
+                    'watermark': watermark
                 }
                 
                 await self.machine_manager.add_machine(
@@ -123,6 +140,9 @@ class RealtimeAttendanceSystem:
             connection_results = await self.machine_manager.connect_all()
             logger.info(f"Machine connection results: {connection_results}")
             
+            # Warm the identity cache so the scan path resolves ids without queries
+            await sync_to_async(self.identity_cache.warm)()
+            
         except Exception as e:
             logger.error(f"Error loading machines: {str(e)}")
     
@@ -132,8 +152,8 @@ class RealtimeAttendanceSystem:
         
         while self.is_running:
             try:
-                # Get scans from all machines
-                scans = await self.machine_manager.get_all_scans()
+                # Get scans past each machine's watermark
+                scans = await self.machine_manager.get_new_scans()
                 
                 # Process each scan
                 for scan in scans:
@@ -148,85 +168,79 @@ class RealtimeAttendanceSystem:
                 await asyncio.sleep(5)  # Wait before retrying
     
     async def _process_scans(self):
-        """Process queued scans"""
+        """Drain queued scans in micro-batches"""
         logger.info("Starting scan processing...")
         
         while self.is_running:
             try:
-                # Get scan from queue (with timeout)
-                scan = await asyncio.wait_for(
-                    self.scan_queue.get(), 
-                    timeout=1.0
-                )
-                
-                # Process the scan
-                await self._process_single_scan(scan)
-                
-            except asyncio.TimeoutError:
-                # No scans in queue, continue
-                continue
+                batch = await self._collect_scan_batch()
+                if batch:
+                    await self._process_scan_batch(batch)
             except Exception as e:
-                logger.error(f"Error processing scan: {str(e)}")
+                logger.error(f"Error processing scans: {str(e)}")
     
-    async def _process_single_scan(self, scan: ScanData):
-        """Process a single scan"""
+    async def _collect_scan_batch(self) -> List[ScanData]:
+        """Collect up to scan_batch_size scans, waiting at most scan_flush_interval"""
         try:
-            # Validate scan
-            if not self._validate_scan(scan):
-                logger.warning(f"Invalid scan: {scan.employee_id} at {scan.scan_time}")
-                return
-            
-            # Find employee
-            try:
-                employee = Employee.objects.get(employee_id=scan.employee_id)
-            except Employee.DoesNotExist:
-                logger.warning(f"Employee not found: {scan.employee_id}")
-                return
-            
-            # Find machine
+            # Block until the first scan arrives (with timeout)
+            first_scan = await asyncio.wait_for(self.scan_queue.get(), timeout=1.0)
+        except asyncio.TimeoutError:
+            # No scans in queue, continue
+            return []
+        
+        batch = [first_scan]
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.scan_flush_interval
+        
+        while len(batch) < self.scan_batch_size:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
             try:
-                machine = AttendanceMachine.objects.get(machine_id=scan.machine_id)
-            except AttendanceMachine.DoesNotExist:
-                logger.warning(f"Machine not found: {scan.machine_id}")
-                return
-            
-            # Create attendance scan record
-            attendance_scan = AttendanceScan.objects.create(
-                employee=employee,
-                machine=machine,
-                scan_time=scan.scan_time,
-                scan_type=scan.scan_type.value,
-                raw_data=scan.raw_data,
-                is_processed=False
-            )
-            
-            # Update daily attendance
-            await self._update_daily_attendance(employee, scan)
-            
-            # Mark scan as processed
-            attendance_scan.is_processed = True
-            attendance_scan.save()
-            
-            # Create event
+                batch.append(await asyncio.wait_for(self.scan_queue.get(), timeout=remaining))
+            except asyncio.TimeoutError:
+                break
+        
+        return batch
+    
+    async def _process_scan_batch(self, scans: List[ScanData]):
+        """Validate a batch, persist it off the event loop and queue the resulting events"""
+        valid_scans = []
+        for scan in scans:
+            if self._validate_scan(scan):
+                valid_scans.append(scan)
+            else:
+                logger.warning(f"Invalid scan: {scan.employee_id} at {scan.scan_time}")
+        
+        # Invalid scans still move the watermark - re-fetching them would not help
+        watermarks = batch_watermarks(scans)
+        
+        try:
+            # ORM work runs in a worker thread so the loop keeps polling machines
+            processed = await sync_to_async(self.scan_processor.process_batch)(valid_scans, watermarks)
+        except Exception:
+            # Nothing was committed, so pull these records again on the next poll
+            self.machine_manager.rewind_watermarks(watermarks.keys())
+            raise
+        
+        self.machine_manager.commit_watermarks(watermarks)
+        
+        now = django_timezone.now()
+        for scan_data in processed:
             event = RealtimeEvent(
                 event_type=EventType.SCAN_RECEIVED,
-                machine_id=scan.machine_id,
-                data={
-                    'scan_id': str(attendance_scan.id),
-                    'employee_id': scan.employee_id,
-                    'employee_name': employee.user.full_name,
-                    'scan_time': scan.scan_time.isoformat(),
-                    'scan_type': scan.scan_type.value
-                },
-                timestamp=django_timezone.now(),
-                employee_id=scan.employee_id
+                machine_id=scan_data.pop('machine_id'),
+                data=scan_data,
+                timestamp=now,
+                employee_id=scan_data['employee_id']
             )
-            
             await self.event_queue.put(event)
-            logger.info(f"Processed scan: {scan.employee_id} - {scan.scan_type.value}")
-            
-        except Exception as e:
-            logger.error(f"Error processing single scan: {str(e)}")
+        
+        logger.info(f"Processed scan batch: {len(processed)} of {len(scans)} scans stored")
+    
+    async def _process_single_scan(self, scan: ScanData):
+        """Process a single scan"""
+        await self._process_scan_batch([scan])
     
     def _validate_scan(self, scan: ScanData) -> bool:
         """Validate scan data"""
@@ -240,52 +254,6 @@ class RealtimeAttendanceSystem:
         
         return True
     
-    async def _update_daily_attendance(self, employee: Employee, scan: ScanData):
-        """Update daily attendance record"""
-        try:
-            date = scan.scan_time.date()
-            
-            # Get or create daily attendance record
-            daily_attendance, created = DailyAttendance.objects.get_or_create(
-                employee=employee,
-                date=date,
-                defaults={'status': 'Absent'}
-            )
-            
-            # Update scan counts
-            daily_attendance.total_scans += 1
-            
-            if scan.scan_type in [ScanType.IN, ScanType.BREAK_OUT, ScanType.OVERTIME_IN]:
-                daily_attendance.check_in_count += 1
-                if not daily_attendance.first_check_in:
-                    daily_attendance.first_check_in = scan.scan_time.time()
-            elif scan.scan_type in [ScanType.OUT, ScanType.BREAK_IN, ScanType.OVERTIME_OUT]:
-                daily_attendance.check_out_count += 1
-                daily_attendance.last_check_out = scan.scan_time.time()
-            
-            # Calculate working hours and overtime
-            if daily_attendance.first_check_in and daily_attendance.last_check_out:
-                daily_attendance.total_working_hours = daily_attendance.calculate_working_hours()
-                daily_attendance.overtime_hours = daily_attendance.calculate_overtime()
-                daily_attendance.extra_overtime_hours = daily_attendance.calculate_extra_overtime()
-                
-                # Update eligibility flags
-                daily_attendance.snacks_eligible = daily_attendance.extra_overtime_hours >= 1.0
-                daily_attendance.night_bill_eligible = daily_attendance.extra_overtime_hours >= 5.0
-                
-                # Update status
-                if daily_attendance.first_check_in <= django_timezone.now().time().replace(hour=8, minute=0):
-                    daily_attendance.status = 'Present-OnTime'
-                elif daily_attendance.first_check_in <= django_timezone.now().time().replace(hour=8, minute=5):
-                    daily_attendance.status = 'Present-Considered'
-                else:
-                    daily_attendance.status = 'Present-Late'
-            
-            daily_attendance.save()
-            
-        except Exception as e:
-            logger.error(f"Error updating daily attendance: {str(e)}")
-    
     async def _process_events(self):
         """Process real-time events"""
         logger.info("Starting event processing...")
@@ -441,7 +409,8 @@ class RealtimeAttendanceSystem:
             'connected_machines': sum(1 for adapter in self.machine_manager.adapters.values() if adapter.is_connected),
             'total_clients': len(self.websocket_clients),
             'queue_size': self.scan_queue.qsize(),
-            'last_health_check': self.last_health_check.isoformat() if self.last_health_check else None
+            'last_health_check': self.last_health_check.isoformat() if self.last_health_check else None,
+            'identity_cache': self.identity_cache.get_stats()
         }
 
 
@@ -0,0 +1,259 @@
+"""
+Bulk DailyAttendance recompute engine
+Rebuilds every employee-day in a date range from the stored scans in a single pass
+"""
+
+import logging
+from array import array
+from datetime import date, datetime, time, timedelta
+from datetime import timezone as dt_timezone
+from typing import Dict, Iterable, List, Optional, Any
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .identity_cache import identity_cache
+from .machine_adapters import local_scan_time
+from .models import AttendanceScan, DailyAttendance
+from .rules import AttendanceRules, get_attendance_rules
+from .aggregates import backfill_attendance_aggregates
+from employees.models import Employee
+
+logger = logging.getLogger(__name__)
+
+CHECK_IN_TYPES = ('IN', 'BREAK_OUT', 'OVERTIME_IN')
+CHECK_OUT_TYPES = ('OUT', 'BREAK_IN', 'OVERTIME_OUT')
+
+UPDATE_FIELDS = [
+    'status', 'first_check_in', 'last_check_out', 'total_working_hours',
+    'overtime_hours', 'extra_overtime_hours', 'total_scans',
+    'check_in_count', 'check_out_count', 'snacks_eligible',
+    'night_bill_eligible', 'updated_at'
+]
+
+NO_TIME = -1  # Column sentinel for a missing check-in/out
+
+
+def month_range(year: int, month: int):
+    """First and last day of a month"""
+    start = date(year, month, 1)
+    next_month = date(year + month // 12, month % 12 + 1, 1)
+    return start, next_month - timedelta(days=1)
+
+
+class ScanColumns:
+    """Per employee-day scan aggregates laid out as parallel arrays"""
+
+    def __init__(self):
+        self.keys: List[tuple] = []  # (employee_pk, date)
+        self.total_scans = array('l')
+        self.check_ins = array('l')
+        self.check_outs = array('l')
+        self.first_in = array('l')  # seconds after midnight, NO_TIME if none
+        self.last_out = array('l')
+
+    def __len__(self):
+        return len(self.keys)
+
+    def add_scan(self, key, scan_type: str, seconds: int):
+        if not self.keys or self.keys[-1] != key:
+            self.keys.append(key)
+            self.total_scans.append(0)
+            self.check_ins.append(0)
+            self.check_outs.append(0)
+            self.first_in.append(NO_TIME)
+            self.last_out.append(NO_TIME)
+
+        i = len(self.keys) - 1
+        self.total_scans[i] += 1
+        if scan_type in CHECK_IN_TYPES:
+            self.check_ins[i] += 1
+            if self.first_in[i] == NO_TIME:
+                self.first_in[i] = seconds
+        elif scan_type in CHECK_OUT_TYPES:
+            self.check_outs[i] += 1
+            self.last_out[i] = seconds
+
+
+def load_scan_columns(start_date: date, end_date: date, employee_ids: Optional[Iterable[int]] = None) -> ScanColumns:
+    """
+    Stream all scans whose local (machine wall-clock) date is in the range, ordered so
+    each employee-day is contiguous
+    """
+    # A day either side covers every UTC offset; out-of-range local dates are skipped below
+    range_start = datetime.combine(start_date - timedelta(days=1), time.min, tzinfo=dt_timezone.utc)
+    range_end = datetime.combine(end_date + timedelta(days=2), time.min, tzinfo=dt_timezone.utc)
+
+    scans = AttendanceScan.objects.filter(scan_time__gte=range_start, scan_time__lt=range_end)
+    if employee_ids is not None:
+        scans = scans.filter(employee_id__in=list(employee_ids))
+    rows = scans.order_by('employee_id', 'scan_time').values_list('employee_id', 'machine_id', 'scan_time', 'scan_type')
+
+    columns = ScanColumns()
+    for employee_pk, machine_pk, scan_time, scan_type in rows.iterator(chunk_size=5000):
+        scan_time = local_scan_time(scan_time, identity_cache.get_machine_timezone(machine_pk))
+        if not start_date <= scan_time.date() <= end_date:
+            continue
+        seconds = scan_time.hour * 3600 + scan_time.minute * 60 + scan_time.second
+        columns.add_scan((employee_pk, scan_time.date()), scan_type, seconds)
+    return columns
+
+
+def compute_columns(columns: ScanColumns, worker_flags: array, rules: AttendanceRules) -> Dict[str, list]:
+    """Apply the attendance rules to every employee-day at once"""
+    # Same arithmetic as AttendanceRules.working_hours/overtime/extra_overtime/status, column-wise
+    lunch = rules.lunch_break_minutes
+    ot_start, ot_cap = rules.overtime_start_minutes, rules.overtime_cap_minutes
+    extra_start = rules.extra_overtime_start_minutes
+    on_time, considered = rules.on_time_seconds, rules.considered_seconds
+
+    first_in_minutes = [s // 60 if s != NO_TIME else NO_TIME for s in columns.first_in]
+    last_out_minutes = [s // 60 if s != NO_TIME else NO_TIME for s in columns.last_out]
+    complete = [i != NO_TIME and o != NO_TIME for i, o in zip(first_in_minutes, last_out_minutes)]
+
+    working_hours = [
+        round(max(0, ((o if o >= i else o + 24 * 60) - i - lunch) / 60), 2) if ok else None
+        for i, o, ok in zip(first_in_minutes, last_out_minutes, complete)
+    ]
+    overtime = [
+        round(min(o - ot_start, ot_cap) / 60, 2)
+        if ok and worker and o > ot_start else 0
+        for o, ok, worker in zip(last_out_minutes, complete, worker_flags)
+    ]
+    extra_overtime = [
+        round((o - extra_start) / 60, 2)
+        if ok and worker and o > extra_start else 0
+        for o, ok, worker in zip(last_out_minutes, complete, worker_flags)
+    ]
+    status = [
+        None if not ok else
+        'Present-OnTime' if s <= on_time else
+        'Present-Considered' if s <= considered else
+        'Present-Late'
+        for s, ok in zip(columns.first_in, complete)
+    ]
+
+    return {
+        'complete': complete,
+        'working_hours': working_hours,
+        'overtime': overtime,
+        'extra_overtime': extra_overtime,
+        'status': status,
+    }
+
+
+def _seconds_to_time(seconds: int) -> Optional[time]:
+    if seconds == NO_TIME:
+        return None
+    return time(seconds // 3600, seconds % 3600 // 60, seconds % 60)
+
+
+def _reset_record(record: DailyAttendance, rules: AttendanceRules):
+    """Clear the scan-derived values of a day left without scans"""
+    record.status = 'Absent'
+    record.total_scans = record.check_in_count = record.check_out_count = 0
+    record.first_check_in = record.last_check_out = None
+    record.total_working_hours = 0
+    if rules.auto_calculate_overtime:
+        record.overtime_hours = 0
+    if rules.auto_calculate_extra_overtime:
+        record.extra_overtime_hours = 0
+    record.snacks_eligible = rules.snacks_eligible(record.extra_overtime_hours)
+    record.night_bill_eligible = rules.night_bill_eligible(record.extra_overtime_hours)
+
+
+def recompute_daily_attendance(start_date: date, end_date: date,
+                               employee_ids: Optional[Iterable[int]] = None,
+                               batch_size: int = 1000) -> Dict[str, Any]:
+    """
+    Rebuild DailyAttendance for every employee-day with scans in [start_date, end_date].
+    Days that still hold scan-derived values but no longer have any scans are reset
+    to Absent. HR-edited records (is_edited) are left untouched.
+    """
+    started = timezone.now()
+    if employee_ids is not None:
+        employee_ids = list(employee_ids)
+    columns = load_scan_columns(start_date, end_date, employee_ids)
+
+    employee_pks = {employee_pk for employee_pk, _ in columns.keys}
+    levels = dict(Employee.objects.filter(pk__in=employee_pks).values_list('id', 'level_of_work'))
+    worker_flags = array('b', (levels.get(employee_pk) == 'worker' for employee_pk, _ in columns.keys))
+
+    rules = get_attendance_rules()
+    results = compute_columns(columns, worker_flags, rules)
+
+    existing_qs = DailyAttendance.objects.filter(date__range=(start_date, end_date))
+    if employee_ids is not None:
+        existing_qs = existing_qs.filter(employee_id__in=employee_ids)
+    existing_qs = existing_qs.filter(Q(employee_id__in=employee_pks) | Q(total_scans__gt=0))
+    existing = {(record.employee_id, record.date): record for record in existing_qs}
+
+    now = timezone.now()
+    to_create, to_update, skipped = [], [], 0
+
+    # Every scan of these days was deleted since they were computed
+    scanned = set(columns.keys)
+    reset = [
+        record for key, record in existing.items()
+        if key not in scanned and record.total_scans and not record.is_edited
+    ]
+    for record in reset:
+        _reset_record(record, rules)
+        record.updated_at = now
+        to_update.append(record)
+    for i, key in enumerate(columns.keys):
+        record = existing.get(key)
+        if record is None:
+            record = DailyAttendance(employee_id=key[0], date=key[1], status='Absent')
+            to_create.append(record)
+        elif record.is_edited:
+            skipped += 1
+            continue
+        else:
+            to_update.append(record)
+
+        record.total_scans = columns.total_scans[i]
+        record.check_in_count = columns.check_ins[i]
+        record.check_out_count = columns.check_outs[i]
+        record.first_check_in = _seconds_to_time(columns.first_in[i])
+        record.last_check_out = _seconds_to_time(columns.last_out[i])
+        if results['complete'][i]:
+            record.total_working_hours = results['working_hours'][i]
+            if rules.auto_calculate_overtime:
+                record.overtime_hours = results['overtime'][i]
+            if rules.auto_calculate_extra_overtime:
+                record.extra_overtime_hours = results['extra_overtime'][i]
+            record.snacks_eligible = rules.snacks_eligible(record.extra_overtime_hours)
+            record.night_bill_eligible = rules.night_bill_eligible(record.extra_overtime_hours)
+            record.status = results['status'][i]
+        record.updated_at = now
+
+    with transaction.atomic():
+        DailyAttendance.objects.bulk_create(to_create, batch_size=batch_size)
+        DailyAttendance.objects.bulk_update(to_update, UPDATE_FIELDS, batch_size=batch_size)
+    # Bulk writes skip post_save, so invalidate timesheets and refresh rollups here
+    from .timesheet import invalidate_timesheet_range
+    from .signals import daily_attendance_bulk_changed
+    invalidate_timesheet_range(start_date, end_date)
+    backfill_attendance_aggregates(start_date, end_date)
+    daily_attendance_bulk_changed.send(
+        sender=DailyAttendance, keys=[(record.employee_id, record.date) for record in to_create + to_update]
+    )
+
+    duration_ms = int((timezone.now() - started).total_seconds() * 1000)
+    logger.info(
+        f"Recomputed {len(columns)} employee-days {start_date}..{end_date} "
+        f"({len(to_create)} created, {len(to_update)} updated, {len(reset)} reset) in {duration_ms} ms"
+    )
+    return {
+        'start_date': start_date.isoformat(),
+        'end_date': end_date.isoformat(),
+        'employee_days': len(columns),
+        'created': len(to_create),
+        'updated': len(to_update) - len(reset),
+        'reset': len(reset),
+        'skipped_edited': skipped,
+        'rules_version': rules.version,
+        'duration_ms': duration_ms,
+    }
@@ -0,0 +1,156 @@
+"""
+Compiled attendance rules
+Process-local, version-stamped snapshot of AttendanceSettings with every threshold
+pre-converted to minute/second offsets, so scan processing never re-reads settings
+"""
+
+import logging
+import threading
+import time as monotonic_time
+from dataclasses import dataclass
+from datetime import time, datetime
+from typing import FrozenSet, Optional
+
+logger = logging.getLogger(__name__)
+
+# How often a process re-checks the settings row for edits made by another process
+RULES_RECHECK_INTERVAL = 60  # seconds
+
+OVERTIME_CAP_MINUTES = 2 * 60  # Regular overtime is capped at 2 hours per day
+
+
+def _to_time(value) -> time:
+    """TimeField values are strings until the instance is reloaded"""
+    if isinstance(value, time):
+        return value
+    return datetime.strptime(str(value), '%H:%M' if len(str(value)) <= 5 else '%H:%M:%S').time()
+
+
+def _minutes(value) -> int:
+    value = _to_time(value)
+    return value.hour * 60 + value.minute
+
+
+def _seconds(value) -> int:
+    value = _to_time(value)
+    return value.hour * 3600 + value.minute * 60 + value.second
+
+
+@dataclass(frozen=True)
+class AttendanceRules:
+    """Immutable rule set evaluated by the scan, signal and recompute paths"""
+    version: int
+    settings_stamp: Optional[datetime]
+    lunch_break_minutes: int = 60
+    on_time_seconds: int = 8 * 3600
+    considered_seconds: int = 8 * 3600 + 5 * 60
+    overtime_start_minutes: int = 17 * 60
+    overtime_cap_minutes: int = OVERTIME_CAP_MINUTES
+    extra_overtime_start_minutes: int = 19 * 60
+    snacks_eligibility_hours: float = 1.0
+    night_bill_eligibility_hours: float = 5.0
+    weekend_days: FrozenSet[int] = frozenset()
+    auto_calculate_overtime: bool = True
+    auto_calculate_extra_overtime: bool = True
+
+    @classmethod
+    def from_settings(cls, settings_obj, version: int) -> 'AttendanceRules':
+        if settings_obj is None:
+            return cls(version=version, settings_stamp=None)
+        return cls(
+            version=version,
+            settings_stamp=settings_obj.updated_at,
+            lunch_break_minutes=int(round(float(settings_obj.lunch_break_duration) * 60)),
+            on_time_seconds=_seconds(settings_obj.safe_entry_time),
+            considered_seconds=_seconds(settings_obj.late_entry_time),
+            overtime_start_minutes=_minutes(settings_obj.overtime_start_time),
+            extra_overtime_start_minutes=_minutes(settings_obj.extra_overtime_start_time),
+            snacks_eligibility_hours=float(settings_obj.snacks_eligibility_hours),
+            night_bill_eligibility_hours=float(settings_obj.night_bill_eligibility_hours),
+            weekend_days=frozenset(int(day) for day in (settings_obj.weekend_days or [])),
+            auto_calculate_overtime=settings_obj.auto_calculate_overtime,
+            auto_calculate_extra_overtime=settings_obj.auto_calculate_extra_overtime,
+        )
+
+    # ----- rule evaluation (minutes/seconds after midnight) -----
+
+    def working_hours(self, check_in_minutes: int, check_out_minutes: int) -> float:
+        """Hours between check-in and check-out, less lunch, allowing overnight check-out"""
+        if check_out_minutes < check_in_minutes:
+            check_out_minutes += 24 * 60
+        total_minutes = check_out_minutes - check_in_minutes - self.lunch_break_minutes
+        return round(max(0, total_minutes / 60), 2)
+
+    def overtime(self, check_out_minutes: int, is_worker: bool) -> float:
+        """Capped overtime after the overtime start time (workers only)"""
+        if not is_worker or check_out_minutes <= self.overtime_start_minutes:
+            return 0
+        return round(min(check_out_minutes - self.overtime_start_minutes, self.overtime_cap_minutes) / 60, 2)
+
+    def extra_overtime(self, check_out_minutes: int, is_worker: bool) -> float:
+        """Uncapped overtime after the extra overtime start time (workers only)"""
+        if not is_worker or check_out_minutes <= self.extra_overtime_start_minutes:
+            return 0
+        return round((check_out_minutes - self.extra_overtime_start_minutes) / 60, 2)
+
+    def status(self, check_in_seconds: int) -> str:
+        if check_in_seconds <= self.on_time_seconds:
+            return 'Present-OnTime'
+        if check_in_seconds <= self.considered_seconds:
+            return 'Present-Considered'
+        return 'Present-Late'
+
+    def snacks_eligible(self, extra_overtime_hours) -> bool:
+        return float(extra_overtime_hours) >= self.snacks_eligibility_hours
+
+    def night_bill_eligible(self, extra_overtime_hours) -> bool:
+        return float(extra_overtime_hours) >= self.night_bill_eligibility_hours
+
+
+class _RulesCache:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._rules: Optional[AttendanceRules] = None
+        self._version = 0
+        self._checked_at = 0.0
+
+    def get(self) -> AttendanceRules:
+        rules = self._rules
+        if rules is not None and monotonic_time.monotonic() - self._checked_at < RULES_RECHECK_INTERVAL:
+            return rules
+
+        with self._lock:
+            if self._rules is not None and not self._is_stale(self._rules):
+                self._checked_at = monotonic_time.monotonic()
+                return self._rules
+
+            from .models import AttendanceSettings
+            self._version += 1
+            self._rules = AttendanceRules.from_settings(AttendanceSettings.objects.first(), self._version)
+            self._checked_at = monotonic_time.monotonic()
+            logger.info(f"Compiled attendance rules v{self._version}")
+            return self._rules
+
+    def invalidate(self):
+        with self._lock:
+            self._rules = None
+
+    @staticmethod
+    def _is_stale(rules: AttendanceRules) -> bool:
+        """Cheap cross-process check: has the settings row changed since we compiled?"""
+        from .models import AttendanceSettings
+        stamp = AttendanceSettings.objects.values_list('updated_at', flat=True).first()
+        return stamp != rules.settings_stamp
+
+
+_rules_cache = _RulesCache()
+
+
+def get_attendance_rules() -> AttendanceRules:
+    """Current compiled rules for this process"""
+    return _rules_cache.get()
+
+
+def invalidate_attendance_rules():
+    """Force the next get_attendance_rules() call to recompile"""
+    _rules_cache.invalidate()
@@ -0,0 +1,231 @@
+"""
+Batched scan ingestion for the real-time attendance system
+Resolves, stores and folds a micro-batch of machine scans with a fixed number of queries
+"""
+
+import logging
+from datetime import datetime
+from typing import Dict, List, Any, Optional, Tuple
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import AttendanceScan, DailyAttendance, MachineSyncState
+from .machine_adapters import ScanData, local_scan_time, watermark_key
+from .identity_cache import EmployeeIdentity, IdentityCache, get_identity_cache
+from .rules import get_attendance_rules
+from .timesheet import invalidate_timesheet_months
+from .aggregates import schedule_aggregate_refresh
+from .signals import daily_attendance_bulk_changed
+
+logger = logging.getLogger(__name__)
+
+Watermark = Tuple[datetime, Optional[str]]
+
+
+def batch_watermarks(scans: List[ScanData]) -> Dict[str, Watermark]:
+    """Latest (scan_time, record_id) per machine in a batch"""
+    watermarks: Dict[str, Watermark] = {}
+    for scan in scans:
+        current = watermarks.get(scan.machine_id)
+        if current is None or watermark_key(scan.scan_time, scan.record_id) > watermark_key(*current):
+            watermarks[scan.machine_id] = (scan.scan_time, scan.record_id)
+    return watermarks
+
+
+class ScanBatchProcessor:
+    """Synchronous batch processor - run it off the event loop"""
+
+    def __init__(self, identity_cache: IdentityCache = None):
+        self.identity_cache = identity_cache or get_identity_cache()
+
+    def process_batch(self, scans: List[ScanData], watermarks: Dict[str, Watermark] = None) -> List[Dict[str, Any]]:
+        """
+        Persist a batch of scans and upsert the affected daily attendance rows.
+        Machine watermarks, if given, are stored in the same transaction.
+        Returns one summary dict per stored scan for event broadcasting.
+        """
+        if watermarks:
+            with transaction.atomic():
+                events = self._store_scans(scans)
+                # Only rows actually inserted count towards records_synced
+                counts: Dict[str, int] = {}
+                for event in events:
+                    counts[event['machine_id']] = counts.get(event['machine_id'], 0) + 1
+                self._store_watermarks(watermarks, counts)
+            return events
+
+        return self._store_scans(scans)
+
+    def _store_scans(self, scans: List[ScanData]) -> List[Dict[str, Any]]:
+        if not scans:
+            return []
+
+        employees = self.identity_cache.get_employees(scan.employee_id for scan in scans)
+        machines = self.identity_cache.get_machines(scan.machine_id for scan in scans)
+
+        resolved: List[Tuple[ScanData, EmployeeIdentity, int]] = []
+        for scan in scans:
+            employee = employees.get(scan.employee_id)
+            if employee is None:
+                logger.warning(f"Employee not found: {scan.employee_id}")
+                continue
+            machine_pk = machines.get(scan.machine_id)
+            if machine_pk is None:
+                logger.warning(f"Machine not found: {scan.machine_id}")
+                continue
+            resolved.append((scan, employee, machine_pk))
+
+        if not resolved:
+            return []
+
+        # Replays and retries are no-ops: only never-seen scans are stored and counted
+        resolved = self._drop_duplicates(resolved)
+        if not resolved:
+            return []
+
+        # Fold scans in chronological order so first-in/last-out stay correct
+        resolved.sort(key=lambda item: item[0].scan_time)
+
+        with transaction.atomic():
+            # bulk_create skips post_save, so the per-scan signal does not double count.
+            # A concurrent writer may still race us on unique_attendance_scan; those rows
+            # are skipped silently, so read back which of our ids made it in.
+            scan_records = AttendanceScan.objects.bulk_create([
+                AttendanceScan(
+                    employee_id=employee.pk,
+                    machine_id=machine_pk,
+                    scan_time=scan.scan_time,
+                    scan_type=scan.scan_type.value,
+                    raw_data=scan.raw_data,
+                    is_processed=True
+                )
+                for scan, employee, machine_pk in resolved
+            ], ignore_conflicts=True)
+            inserted = set(
+                AttendanceScan.objects.filter(id__in=[record.id for record in scan_records])
+                .values_list('id', flat=True)
+            )
+            stored = [
+                (record, item) for record, item in zip(scan_records, resolved) if record.id in inserted
+            ]
+            if len(stored) < len(resolved):
+                logger.info(f"Skipped {len(resolved) - len(stored)} scans stored concurrently")
+            if stored:
+                self._upsert_daily_attendance([item for _, item in stored])
+
+        return [
+            {
+                'scan_id': str(record.id),
+                'employee_id': scan.employee_id,
+                'employee_name': employee.full_name,
+                'machine_id': scan.machine_id,
+                'scan_time': scan.scan_time.isoformat(),
+                'scan_type': scan.scan_type.value
+            }
+            for record, (scan, employee, _) in stored
+        ]
+
+    def _drop_duplicates(self, resolved: List[Tuple[ScanData, EmployeeIdentity, int]]):
+        """Remove scans already stored or repeated within the batch, using one query"""
+        def natural_key(scan, employee, machine_pk):
+            return (employee.pk, machine_pk, scan.scan_time, scan.scan_type.value)
+
+        scan_times = [scan.scan_time for scan, _, _ in resolved]
+        existing = set(
+            AttendanceScan.objects.filter(
+                employee_id__in={employee.pk for _, employee, _ in resolved},
+                scan_time__range=(min(scan_times), max(scan_times))
+            ).values_list('employee_id', 'machine_id', 'scan_time', 'scan_type')
+        )
+
+        fresh = []
+        for item in resolved:
+            key = natural_key(*item)
+            if key not in existing:
+                existing.add(key)
+                fresh.append(item)
+
+        if len(fresh) < len(resolved):
+            logger.info(f"Skipped {len(resolved) - len(fresh)} duplicate scans")
+        return fresh
+
+    def _store_watermarks(self, watermarks: Dict[str, Watermark], counts: Dict[str, int]):
+        """Advance the persisted per-machine watermarks, never moving them backwards"""
+        machines = self.identity_cache.get_machines(watermarks.keys())
+        states = {
+            state.machine_id: state
+            for state in MachineSyncState.objects.filter(machine_id__in=machines.values())
+        }
+        now = timezone.now()
+
+        for machine_id, (scan_time, record_id) in watermarks.items():
+            machine_pk = machines.get(machine_id)
+            if machine_pk is None:
+                continue
+            state = states.get(machine_pk)
+            if state is None:
+                state = MachineSyncState(machine_id=machine_pk)
+                states[machine_pk] = state
+            state.records_synced += counts.get(machine_id, 0)
+            if state.last_scan_time is None or \
+                    watermark_key(scan_time, record_id) > watermark_key(state.last_scan_time, state.last_record_id):
+                state.last_scan_time = scan_time
+                state.last_record_id = record_id or ''
+            state.updated_at = now
+
+        MachineSyncState.objects.bulk_create(
+            states.values(),
+            update_conflicts=True,
+            unique_fields=['machine'],
+            update_fields=['last_scan_time', 'last_record_id', 'records_synced', 'updated_at']
+        )
+
+    def _upsert_daily_attendance(self, resolved: List[Tuple[ScanData, EmployeeIdentity, int]]):
+        """Fold scans into daily records, creating and updating rows in bulk"""
+        employee_pks = {employee.pk for _, employee, _ in resolved}
+        # Attendance days and check-in/out times are the machine's wall clock, not UTC
+        local_times = [
+            local_scan_time(scan.scan_time, self.identity_cache.get_machine_timezone(machine_pk))
+            for scan, _, machine_pk in resolved
+        ]
+        dates = {local_time.date() for local_time in local_times}
+
+        existing = {
+            (record.employee_id, record.date): record
+            for record in DailyAttendance.objects.filter(employee_id__in=employee_pks, date__in=dates)
+        }
+        to_create = {}
+        touched = {}
+        rules = get_attendance_rules()
+
+        for (scan, employee, _), local_time in zip(resolved, local_times):
+            key = (employee.pk, local_time.date())
+            record = existing.get(key) or to_create.get(key)
+            if record is None:
+                record = DailyAttendance(employee_id=employee.pk, date=key[1], status='Absent')
+                to_create[key] = record
+            elif key in existing:
+                touched[key] = record
+            # Cached level_of_work keeps the overtime rules from lazy-loading the employee
+            record.apply_scan(scan.scan_type.value, local_time, employee.level_of_work, rules)
+
+        if to_create:
+            DailyAttendance.objects.bulk_create(to_create.values())
+
+        if touched:
+            # bulk_update bypasses auto_now, so stamp the rows ourselves
+            now = timezone.now()
+            for record in touched.values():
+                record.updated_at = now
+            DailyAttendance.objects.bulk_update(touched.values(), [
+                'status', 'first_check_in', 'last_check_out', 'total_working_hours',
+                'overtime_hours', 'extra_overtime_hours', 'total_scans',
+                'check_in_count', 'check_out_count', 'snacks_eligible',
+                'night_bill_eligible', 'updated_at'
+            ])
+
+        # Bulk writes skip post_save, so invalidate timesheets and refresh rollups here
+        invalidate_timesheet_months(dates)
+        schedule_aggregate_refresh(dates)
+        daily_attendance_bulk_changed.send(sender=DailyAttendance, keys=list(to_create) + list(touched))
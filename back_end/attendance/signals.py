@@ -1,7 +1,21 @@
-from django.db.models.signals import post_save, post_delete
-from django.dispatch import receiver
+from django.db import transaction
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver, Signal
 from django.utils import timezone
-from .models import AttendanceScan, DailyAttendance, LeaveRequest, LeaveBalance
+from .models import (
+    AttendanceMachine, AttendanceScan, DailyAttendance, LeaveRequest, LeaveBalance, AttendanceSettings,
+    Holiday
+)
+from .identity_cache import identity_cache
+from .machine_adapters import local_scan_time
+from .rules import invalidate_attendance_rules
+from .timesheet import invalidate_timesheet_months, invalidate_timesheet_range, invalidate_all_timesheets
+from .aggregates import schedule_aggregate_refresh
+from employees.models import Employee
+
+# Sent by the bulk write paths (scan ingestion, recompute), which bypass post_save.
+# keys: list of (employee_pk, date) whose DailyAttendance rows were created or updated.
+daily_attendance_bulk_changed = Signal()
 
 
 @receiver(post_save, sender=AttendanceScan)
@@ -10,40 +24,20 @@ def attendance_scan_created(sender, instance, created, **kwargs):
     if created:
         # Update daily attendance record
         try:
+            # The identity cache answers level_of_work without loading the employee
+            employee = identity_cache.get_employee_by_pk(instance.employee_id)
+            if employee is None:
+                return
+            scan_time = local_scan_time(instance.scan_time, identity_cache.get_machine_timezone(instance.machine_id))
             daily_attendance, created = DailyAttendance.objects.get_or_create(
-                employee=instance.employee,
-                date=instance.scan_time.date(),
+                employee_id=instance.employee_id,
+                date=scan_time.date(),
                 defaults={'status': 'Absent'}
             )
             
-            # Update scan counts
-            daily_attendance.total_scans += 1
-            
-            if instance.scan_type in ['IN', 'BREAK_OUT', 'OVERTIME_IN']:
-                daily_attendance.check_in_count += 1
-                if not daily_attendance.first_check_in:
-                    daily_attendance.first_check_in = instance.scan_time.time()
-            elif instance.scan_type in ['OUT', 'BREAK_IN', 'OVERTIME_OUT']:
-                daily_attendance.check_out_count += 1
-                daily_attendance.last_check_out = instance.scan_time.time()
-            
-            # Recalculate working hours and overtime
-            if daily_attendance.first_check_in and daily_attendance.last_check_out:
-                daily_attendance.total_working_hours = daily_attendance.calculate_working_hours()
-                daily_attendance.overtime_hours = daily_attendance.calculate_overtime()
-                daily_attendance.extra_overtime_hours = daily_attendance.calculate_extra_overtime()
-                
-                # Update eligibility flags
-                daily_attendance.snacks_eligible = daily_attendance.extra_overtime_hours >= 1.0
-                daily_attendance.night_bill_eligible = daily_attendance.extra_overtime_hours >= 5.0
-                
-                # Update status
-                if daily_attendance.first_check_in <= timezone.now().time().replace(hour=8, minute=0):
-                    daily_attendance.status = 'Present-OnTime'
-                elif daily_attendance.first_check_in <= timezone.now().time().replace(hour=8, minute=5):
-                    daily_attendance.status = 'Present-Considered'
-                else:
-                    daily_attendance.status = 'Present-Late'
+            daily_attendance.apply_scan(
+                instance.scan_type, scan_time, employee.level_of_work
+            )
             
             daily_attendance.save()
             
@@ -83,3 +77,69 @@ def leave_balance_updated(sender, instance, created, **kwargs):
     instance.available_days = instance.total_days + instance.carried_forward - instance.used_days
     if instance.available_days != instance.available_days:  # Check if calculation changed
         instance.save(update_fields=['available_days'])
+
+
+# Employee columns a timesheet row shows or filters on
+TIMESHEET_EMPLOYEE_FIELDS = ('employee_id', 'user_id', 'department_id', 'designation_id', 'level_of_work', 'off_day', 'status')
+
+
+@receiver(pre_save, sender=Employee)
+def employee_timesheet_fields_before(sender, instance, **kwargs):
+    """Remember the timesheet columns so post_save can tell whether they changed"""
+    if instance.pk:
+        instance._timesheet_fields_before = Employee.objects.filter(pk=instance.pk).values_list(
+            *TIMESHEET_EMPLOYEE_FIELDS
+        ).first()
+
+
+@receiver(post_save, sender=Employee)
+@receiver(post_delete, sender=Employee)
+def employee_identity_changed(sender, instance, created=False, **kwargs):
+    """Keep the scan-path identity cache and timesheets in sync with employee edits"""
+    # After commit, so no process can reload the old row before the invalidation
+    pk = instance.pk
+    transaction.on_commit(lambda: identity_cache.invalidate_employee(pk))
+
+    # Salary and contact edits do not show on a timesheet - only drop them when a row changes
+    before = getattr(instance, '_timesheet_fields_before', None)
+    after = tuple(getattr(instance, field) for field in TIMESHEET_EMPLOYEE_FIELDS)
+    if created or kwargs.get('signal') is post_delete or before is None or tuple(before) != after:
+        invalidate_all_timesheets()
+
+
+@receiver(post_save, sender=AttendanceMachine)
+@receiver(post_delete, sender=AttendanceMachine)
+def machine_identity_changed(sender, instance, **kwargs):
+    """Keep the scan-path identity cache in sync with machine edits"""
+    pk = instance.pk
+    transaction.on_commit(lambda: identity_cache.invalidate_machine(pk))
+
+
+@receiver(post_save, sender=AttendanceSettings)
+@receiver(post_delete, sender=AttendanceSettings)
+def attendance_settings_changed(sender, instance, **kwargs):
+    """Recompile the attendance rules after settings change"""
+    invalidate_attendance_rules()
+    invalidate_all_timesheets()
+
+
+@receiver(post_save, sender=DailyAttendance)
+@receiver(post_delete, sender=DailyAttendance)
+def daily_attendance_changed(sender, instance, **kwargs):
+    """Drop the cached timesheet for the record's month and refresh its rollup"""
+    invalidate_timesheet_months([instance.date])
+    schedule_aggregate_refresh([instance.date])
+
+
+@receiver(post_save, sender=LeaveRequest)
+@receiver(post_delete, sender=LeaveRequest)
+def leave_request_changed(sender, instance, **kwargs):
+    """Drop cached timesheets for the months a leave request spans"""
+    invalidate_timesheet_range(instance.start_date, instance.end_date)
+
+
+@receiver(post_save, sender=Holiday)
+@receiver(post_delete, sender=Holiday)
+def holiday_changed(sender, instance, **kwargs):
+    """Holidays may recur across years, so drop every cached timesheet"""
+    invalidate_all_timesheets()
@@ -1,3 +1,446 @@
-from django.test import TestCase
+import asyncio
+import json
+from datetime import date, datetime, time, timezone
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.db import IntegrityError, connection, transaction
+from django.db.migrations.executor import MigrationExecutor
+from django.test import SimpleTestCase, TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from authentication.models import User
+from employees.models import Department, Designation, Employee
+
+from .aggregates import daily_totals
+from .identity_cache import EVENT_KEY, IdentityCache, identity_cache
+from .machine_adapters import BaseMachineAdapter, GenericTCPAdapter, ScanData, ScanType
+from .models import (
+    AttendanceMachine, AttendanceScan, DailyAttendance, DailyAttendanceAggregate, MachineSyncState
+)
+from .recompute import recompute_daily_attendance
+from .timesheet import timesheet_cache_key
+from .scan_ingestion import ScanBatchProcessor
+
+
+class FixedScansAdapter(BaseMachineAdapter):
+    """Adapter returning whatever scans the test queued, like a device ignoring 'from'"""
+
+    def __init__(self, machine_config):
+        super().__init__(machine_config)
+        self.queued = []
+
+    async def connect(self):
+        return True
+
+    async def disconnect(self):
+        return True
+
+    async def test_connection(self):
+        return True
+
+    async def get_scans(self, from_time=None):
+        return list(self.queued)
+
+
+def scan(employee_id, scan_time, record_id=None):
+    return ScanData(
+        employee_id=employee_id, scan_time=scan_time, scan_type=ScanType.IN,
+        machine_id='M1', raw_data={}, record_id=record_id
+    )
+
+
+class WatermarkTests(SimpleTestCase):
+    def poll(self, adapter):
+        return asyncio.run(adapter.get_new_scans())
+
+    def test_scans_are_taken_once_in_watermark_order(self):
+        adapter = FixedScansAdapter({'machine_id': 'M1'})
+        t1 = datetime(2026, 10, 1, 8, 0, tzinfo=timezone.utc)
+        t2 = datetime(2026, 10, 1, 8, 5, tzinfo=timezone.utc)
+        adapter.queued = [scan('E1', t2, '11'), scan('E2', t1, '10'), scan('E3', t2, '9')]
+
+        self.assertEqual({s.record_id for s in self.poll(adapter)}, {'9', '10', '11'})
+        self.assertEqual(adapter.fetch_watermark, (t2, '11'))
+        self.assertEqual(self.poll(adapter), [])
+
+        adapter.queued.append(scan('E4', t2, '12'))
+        self.assertEqual([s.record_id for s in self.poll(adapter)], ['12'])
+
+    def test_naive_device_times_compare_with_restored_aware_watermark(self):
+        class ReplayTCPAdapter(GenericTCPAdapter):
+            async def get_scans(self, from_time=None):
+                return self._parse_tcp_response('E1|2026-10-01T07:59:00|IN|4\nE2|2026-10-01T08:01:00|IN|6')
+
+        # Watermark as restored from MachineSyncState after a restart (aware)
+        restored = (datetime(2026, 10, 1, 8, 0, tzinfo=timezone.utc), '5')
+        adapter = ReplayTCPAdapter({'machine_id': 'M1', 'watermark': restored})
+
+        self.assertEqual([s.record_id for s in self.poll(adapter)], ['6'])
+
+    def test_tcp_adapter_parses_aware_utc(self):
+        adapter = GenericTCPAdapter({'machine_id': 'M1', 'config': {'timezone': 'Asia/Dhaka'}})
+        scans = adapter._parse_tcp_response('E1|2026-10-01T14:00:00|IN|7')
+        self.assertEqual(scans[0].scan_time, datetime(2026, 10, 1, 8, 0, tzinfo=timezone.utc))
+
+    def test_same_second_scans_without_record_ids_are_not_dropped(self):
+        adapter = FixedScansAdapter({'machine_id': 'M1'})
+        t = datetime(2026, 10, 1, 8, 0, tzinfo=timezone.utc)
+        adapter.queued = [scan('E1', t)]
+        self.assertEqual(len(self.poll(adapter)), 1)
+
+        # E2 scanned in the same second but only showed up on the next poll
+        adapter.queued = [scan('E1', t), scan('E2', t)]
+        self.assertEqual([s.employee_id for s in self.poll(adapter)], ['E2'])
+        self.assertEqual(self.poll(adapter), [])
+
+    def test_rewind_refetches_after_committed_watermark(self):
+        adapter = FixedScansAdapter({'machine_id': 'M1'})
+        t1 = datetime(2026, 10, 1, 8, 0, tzinfo=timezone.utc)
+        t2 = datetime(2026, 10, 1, 9, 0, tzinfo=timezone.utc)
+        adapter.queued = [scan('E1', t1, '1')]
+        self.poll(adapter)
+        adapter.commit_watermark(t1, '1')
+
+        adapter.queued.append(scan('E2', t2, '2'))
+        self.assertEqual(len(self.poll(adapter)), 1)
+        adapter.rewind_watermark()
+        self.assertEqual([s.record_id for s in self.poll(adapter)], ['2'])
+
+
+def make_employee(employee_id='EMP001'):
+    department, _ = Department.objects.get_or_create(name='Sewing')
+    designation, _ = Designation.objects.get_or_create(
+        name='Operator', department=department, defaults={'level': 'worker'}
+    )
+    user = User.objects.create_user(
+        email=f'{employee_id.lower()}@example.com', password='x', first_name='E', last_name=employee_id
+    )
+    return Employee.objects.create(
+        user=user, employee_id=employee_id, department=department, designation=designation,
+        level_of_work='worker', gross_salary=10000, off_day='Friday'
+    )
+
+
+class ScanDedupeTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.employee = make_employee()
+        cls.machine = AttendanceMachine.objects.create(machine_id='M1', name='Gate', machine_type='simulated')
+        cls.scan_time = datetime(2026, 10, 1, 8, 0, tzinfo=timezone.utc)
+
+    def setUp(self):
+        self.processor = ScanBatchProcessor(IdentityCache())
+
+    def store(self):
+        return self.processor.process_batch([scan('EMP001', self.scan_time, '1')], {'M1': (self.scan_time, '1')})
+
+    def test_constraint_rejects_duplicate_scan(self):
+        fields = dict(employee=self.employee, machine=self.machine, scan_time=self.scan_time, scan_type='IN')
+        AttendanceScan.objects.create(**fields)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            AttendanceScan.objects.create(**fields)
+
+    def test_replayed_scan_is_stored_and_counted_once(self):
+        self.assertEqual(len(self.store()), 1)
+        self.assertEqual(self.store(), [])
+
+        self.assertEqual(AttendanceScan.objects.count(), 1)
+        self.assertEqual(MachineSyncState.objects.get(machine=self.machine).records_synced, 1)
+        self.assertEqual(DailyAttendance.objects.get(employee=self.employee).total_scans, 1)
+
+    def test_scan_lost_to_a_concurrent_writer_is_not_counted(self):
+        AttendanceScan.objects.create(
+            employee=self.employee, machine=self.machine, scan_time=self.scan_time, scan_type='IN'
+        )
+        # The other writer committed after our duplicate check ran
+        with mock.patch.object(ScanBatchProcessor, '_drop_duplicates', lambda self, resolved: resolved):
+            self.assertEqual(self.store(), [])
+
+        self.assertEqual(AttendanceScan.objects.count(), 1)
+        self.assertEqual(MachineSyncState.objects.get(machine=self.machine).records_synced, 0)
+        # Folded once, by the other writer's save
+        self.assertEqual(DailyAttendance.objects.get(employee=self.employee).total_scans, 1)
+
+
+class DeviceTimezoneTests(TestCase):
+    """A machine at UTC+6: 05:30 and 17:00 on 2 October local are 23:30 on 1 October and 11:00 UTC"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.employee = make_employee()
+        cls.machine = AttendanceMachine.objects.create(
+            machine_id='M1', name='Gate', machine_type='simulated', config={'timezone': 'Asia/Dhaka'}
+        )
+        cls.check_in = datetime(2026, 10, 1, 23, 30, tzinfo=timezone.utc)
+        cls.check_out = datetime(2026, 10, 2, 11, 0, tzinfo=timezone.utc)
+
+    def setUp(self):
+        identity_cache.clear()
+
+    def tearDown(self):
+        # Machine saves invalidate the shared cache on commit, which a TestCase never reaches
+        identity_cache.clear()
+
+    def assert_local_day(self):
+        record = DailyAttendance.objects.get(employee=self.employee)
+        self.assertEqual(record.date, date(2026, 10, 2))
+        self.assertEqual((record.first_check_in, record.last_check_out), (time(5, 30), time(17, 0)))
+        self.assertEqual(record.total_scans, 2)
+
+    def test_batch_ingestion_uses_the_machine_clock(self):
+        scans = [scan('EMP001', self.check_in, '1'), scan('EMP001', self.check_out, '2')]
+        scans[1].scan_type = ScanType.OUT
+        ScanBatchProcessor(IdentityCache()).process_batch(scans)
+        self.assert_local_day()
+
+    def test_single_scan_save_and_recompute_use_the_machine_clock(self):
+        for scan_time, scan_type in ((self.check_in, 'IN'), (self.check_out, 'OUT')):
+            AttendanceScan.objects.create(
+                employee=self.employee, machine=self.machine, scan_time=scan_time, scan_type=scan_type
+            )
+        self.assert_local_day()
+        record = DailyAttendance.objects.get(employee=self.employee)
+
+        result = recompute_daily_attendance(date(2026, 10, 1), date(2026, 10, 2))
+
+        self.assertEqual((result['created'], result['reset']), (0, 0))
+        self.assert_local_day()
+        self.assertEqual(DailyAttendance.objects.get(employee=self.employee).status, record.status)
+
+    def test_machine_without_timezone_uses_the_project_zone(self):
+        AttendanceMachine.objects.filter(pk=self.machine.pk).update(config={})
+        with self.settings(TIME_ZONE='America/New_York'):
+            AttendanceScan.objects.create(
+                employee=self.employee, machine=self.machine, scan_time=self.check_in, scan_type='IN'
+            )
+        record = DailyAttendance.objects.get(employee=self.employee)
+        self.assertEqual((record.date, record.first_check_in), (date(2026, 10, 1), time(19, 30)))
+
+
+class RecomputeTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.employee = make_employee()
+        machine = AttendanceMachine.objects.create(machine_id='M1', name='Gate', machine_type='simulated')
+        for hour, scan_type in ((8, 'IN'), (17, 'OUT')):
+            AttendanceScan.objects.create(
+                employee=cls.employee, machine=machine, scan_type=scan_type,
+                scan_time=datetime(2026, 10, 1, hour, 0, tzinfo=timezone.utc)
+            )
+        cls.hr = User.objects.create_user(
+            email='hr@example.com', password='x', first_name='H', last_name='R', role='hr_manager'
+        )
+
+    def test_day_without_scans_is_reset(self):
+        record = DailyAttendance.objects.get(employee=self.employee)
+        self.assertEqual(record.total_scans, 2)
+
+        AttendanceScan.objects.all().delete()
+        result = recompute_daily_attendance(record.date, record.date)
+
+        record.refresh_from_db()
+        self.assertEqual(result['reset'], 1)
+        self.assertEqual((record.status, record.total_scans, record.first_check_in), ('Absent', 0, None))
+        self.assertEqual(record.total_working_hours, 0)
+
+    def test_employee_ids_must_be_a_list_of_ints(self):
+        client = APIClient()
+        client.force_authenticate(self.hr)
+        url = '/api/attendance/daily-attendance/recompute/'
+        for employee_ids in ('1,2', [1, 'x'], {'id': 1}):
+            response = client.post(url, {'start_date': '2026-10-01', 'employee_ids': employee_ids}, format='json')
+            self.assertEqual(response.status_code, 400, employee_ids)
+
+        response = client.post(url, {'start_date': '2026-10-01', 'employee_ids': [self.employee.pk]}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['employee_days'], 1)
+
+    def test_every_month_in_the_range_is_invalidated(self):
+        keys = {month: timesheet_cache_key(2026, month) for month in (1, 2, 3, 4)}
+        recompute_daily_attendance(date(2026, 1, 15), date(2026, 3, 15))
+
+        for month in (1, 2, 3):
+            self.assertNotEqual(timesheet_cache_key(2026, month), keys[month], month)
+        self.assertEqual(timesheet_cache_key(2026, 4), keys[4])
+
+
+class DailySummaryTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        for employee_id in ('EMP001', 'EMP002', 'EMP003'):
+            employee = make_employee(employee_id)
+            DailyAttendance.objects.create(employee=employee, date=date(2026, 10, 1))
+        other = Department.objects.create(name='Cutting')
+        employee = make_employee('EMP004')
+        employee.department = other
+        employee.save()
+        DailyAttendance.objects.create(employee=employee, date=date(2026, 10, 1))
+        cls.hr = User.objects.create_user(
+            email='hr@example.com', password='x', first_name='H', last_name='R', role='hr_manager'
+        )
+
+    def test_page_links_keep_the_filters(self):
+        client = APIClient()
+        client.force_authenticate(self.hr)
+        url = '/api/attendance/daily-attendance/summary/'
+        response = client.get(url, {'date': '2026-10-01', 'department': 'Sewing', 'page': 1, 'page_size': 2})
+
+        self.assertEqual(response.data['count'], 3)
+        self.assertIn('department=Sewing', response.data['next'])
+        response = client.get(url + response.data['next'])
+        self.assertEqual(len(response.data['results']), 1)
+        self.assertIn('department=Sewing', response.data['previous'])
+
+
+class TimesheetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.employees = [make_employee(f'EMP{index:03d}') for index in range(1, 4)]
+        for employee in cls.employees:
+            DailyAttendance.objects.create(employee=employee, date=date(2026, 9, 1), status='Present-OnTime')
+
+    def get(self, user, params):
+        client = APIClient()
+        client.force_authenticate(user)
+        return client.get('/api/attendance/timesheet/', params)
+
+    def test_employee_timesheet_reads_only_their_own_records(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.get(self.employees[1].user, {'year': 2026, 'month': 9})
+            rows = json.loads(b''.join(response.streaming_content))
+
+        self.assertEqual([row['employeeId'] for row in rows], ['EMP002'])
+        [records_sql] = [query['sql'] for query in queries if 'first_check_in' in query['sql']]
+        self.assertIn('employee_id" IN (SELECT', records_sql)
+
+    def test_invalid_month_or_year_is_a_400_before_streaming(self):
+        for params in ({'year': 2026, 'month': 13}, {'year': 0, 'month': 1},
+                       {'year': 9999, 'month': 12}, {'year': 'x', 'month': 1}):
+            response = self.get(self.employees[0].user, params)
+            self.assertEqual(response.status_code, 400, params)
+            self.assertFalse(response.streaming, params)
+
+
+class AggregateRefreshTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.employees = [make_employee(f'EMP{index:03d}') for index in range(1, 4)]
+
+    def test_one_refresh_per_date_per_transaction(self):
+        with mock.patch('attendance.aggregates.refresh_attendance_aggregates') as refresh:
+            with self.captureOnCommitCallbacks(execute=True):
+                for employee in self.employees:
+                    DailyAttendance.objects.create(employee=employee, date=date(2026, 10, 1))
+                    DailyAttendance.objects.create(employee=employee, date=date(2026, 10, 2))
+
+        refresh.assert_called_once_with({date(2026, 10, 1), date(2026, 10, 2)})
+
+    def test_rollup_counts_every_saved_record(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            for employee in self.employees:
+                DailyAttendance.objects.create(employee=employee, date=date(2026, 10, 1))
+
+        rollup = DailyAttendanceAggregate.objects.get(date=date(2026, 10, 1))
+        self.assertEqual((rollup.status, rollup.employee_count), ('Absent', 3))
+
+
+class AggregateMigrationTests(TransactionTestCase):
+    def test_migration_backfills_the_rollup_from_existing_records(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate([('attendance', '0003_attendancescan_unique_natural_key')])
+        employees = [make_employee(f'EMP{index:03d}') for index in range(1, 4)]
+        DailyAttendance.objects.bulk_create([
+            DailyAttendance(employee=employee, date=date(2026, 10, 1), status=status, total_working_hours=8)
+            for employee, status in zip(employees, ('Present-OnTime', 'Present-OnTime', 'Absent'))
+        ])
+
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate(executor.loader.graph.leaf_nodes('attendance'))
+
+        self.assertEqual(
+            sorted(DailyAttendanceAggregate.objects.values_list('status', 'employee_count', 'total_working_hours')),
+            [('Absent', 1, 8), ('Present-OnTime', 2, 16)]
+        )
+        self.assertEqual(daily_totals(date(2026, 10, 1))['present'], 2)
+
+
+class IdentityCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.employee = make_employee()
+        cls.machine = AttendanceMachine.objects.create(machine_id='M1', name='Gate', machine_type='simulated')
+
+    def setUp(self):
+        cache.clear()
+        identity_cache.clear()
+
+    def test_scan_signal_resolves_the_employee_from_the_cache(self):
+        identity_cache.get_employees(['EMP001'])
+        with CaptureQueriesContext(connection) as queries:
+            AttendanceScan.objects.create(
+                employee_id=self.employee.pk, machine=self.machine, scan_type='IN',
+                scan_time=datetime(2026, 10, 1, 8, 0, tzinfo=timezone.utc)
+            )
+        self.assertFalse([query for query in queries if 'FROM "employees_employee"' in query['sql']])
+        self.assertEqual(DailyAttendance.objects.get(employee=self.employee).total_scans, 1)
+
+    def test_invalidation_reaches_other_processes_through_the_shared_log(self):
+        ingest, web = IdentityCache(), IdentityCache()
+        self.assertEqual(ingest.get_employees(['EMP001'])['EMP001'].level_of_work, 'worker')
+
+        Employee.objects.filter(pk=self.employee.pk).update(level_of_work='staff')
+        web.invalidate_employee(self.employee.pk)
+
+        self.assertEqual(ingest.get_employees(['EMP001'])['EMP001'].level_of_work, 'staff')
+
+    def test_employee_edit_invalidates_after_commit(self):
+        self.assertEqual(identity_cache.get_employee_by_pk(self.employee.pk).level_of_work, 'worker')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.employee.level_of_work = 'staff'
+            self.employee.save()
+            self.assertEqual(identity_cache.get_employee_by_pk(self.employee.pk).level_of_work, 'worker')
+        self.assertEqual(identity_cache.get_employee_by_pk(self.employee.pk).level_of_work, 'staff')
+
+    def test_invalidation_drops_only_the_changed_identity(self):
+        other = make_employee('EMP002')
+        ingest, web = IdentityCache(), IdentityCache()
+        ingest.get_employees(['EMP001', 'EMP002'])
+        ingest.get_machines(['M1'])
+
+        web.invalidate_employee(other.pk)
+
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(set(ingest.get_employees(['EMP001'])), {'EMP001'})
+            self.assertEqual(ingest.get_machines(['M1']), {'M1': self.machine.pk})
+        self.assertEqual(len(queries), 0)
+        with CaptureQueriesContext(connection) as queries:
+            ingest.get_employees(['EMP002'])
+        self.assertEqual(len(queries), 1)
+
+    def test_gap_in_the_log_or_bulk_change_drops_everything(self):
+        ingest, web = IdentityCache(), IdentityCache()
+        ingest.get_employees(['EMP001'])
+        web.invalidate_machine(self.machine.pk)
+        cache.delete(EVENT_KEY.format(1))
+
+        with CaptureQueriesContext(connection) as queries:
+            ingest.get_employees(['EMP001'])
+        self.assertEqual(len(queries), 1)
+
+        web.invalidate_all()
+        with CaptureQueriesContext(connection) as queries:
+            ingest.get_employees(['EMP001'])
+        self.assertEqual(len(queries), 1)
+
+    def test_only_timesheet_columns_drop_cached_timesheets(self):
+        key = timesheet_cache_key(2026, 10)
+        self.employee.gross_salary = 12000
+        self.employee.save()
+        self.assertEqual(timesheet_cache_key(2026, 10), key)
+
+        self.employee.off_day = 'Saturday'
+        self.employee.save()
+        self.assertNotEqual(timesheet_cache_key(2026, 10), key)
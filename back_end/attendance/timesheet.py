@@ -0,0 +1,244 @@
+"""
+Monthly timesheet builder
+Builds the employee x day status matrix from one DailyAttendance query plus
+bulk holiday/weekend/leave overlays, and caches the finished month as JSON
+"""
+
+import json
+import logging
+from collections import defaultdict
+from datetime import date, timedelta
+from typing import Dict, Iterable, Iterator, List, Optional, Any
+
+from django.core.cache import cache
+from django.db.models import Q
+
+from .models import DailyAttendance, Holiday, LeaveRequest
+from .recompute import month_range
+from .rules import get_attendance_rules
+from employees.models import Employee
+
+logger = logging.getLogger(__name__)
+
+TIMESHEET_CACHE_TIMEOUT = 60 * 60  # seconds
+GENERATION_KEY = 'attendance:timesheet:generation'
+
+# 0=Sunday ... 6=Saturday, matching AttendanceSettings.weekend_days
+WEEKDAY_INDEX = {
+    'Sunday': 0, 'Monday': 1, 'Tuesday': 2, 'Wednesday': 3,
+    'Thursday': 4, 'Friday': 5, 'Saturday': 6,
+}
+
+LEAVE_STATUS_BY_TYPE = {
+    'casual': 'Leave-Casual',
+    'sick': 'Leave-Sick',
+    'maternity': 'Leave-Maternity',
+    'without_pay': 'Leave-WithOutPay',
+    'earned': 'Leave-Earn',
+    'annual': 'Leave-Earn',
+    # No dedicated timesheet status - shown as paid (earned) leave
+    'paternity': 'Leave-Earn',
+    'compensatory': 'Leave-Earn',
+}
+
+PRESENT_STATUSES = ('Present-OnTime', 'Present-Considered', 'Present-Late')
+
+
+# ----- cache versioning -----
+
+def _month_version_key(year: int, month: int) -> str:
+    return f'attendance:timesheet:version:{year}-{month:02d}'
+
+
+def timesheet_cache_key(year: int, month: int) -> str:
+    """Cache key for a finished month - changes whenever its inputs change"""
+    generation = cache.get_or_set(GENERATION_KEY, 0, None)
+    version = cache.get_or_set(_month_version_key(year, month), 0, None)
+    key = f'attendance:timesheet:{year}-{month:02d}:g{generation}:v{version}'
+
+    # Future days render blank, so the current month also rolls over at midnight
+    today = date.today()
+    if (today.year, today.month) == (year, month):
+        key += f':{today.isoformat()}'
+    return key
+
+
+def _bump(key: str):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, 1, None)
+
+
+def invalidate_timesheet_months(dates: Iterable[date]):
+    """Drop cached timesheets for the months containing these dates"""
+    for year, month in {(d.year, d.month) for d in dates}:
+        _bump(_month_version_key(year, month))
+
+
+def invalidate_timesheet_range(start_date: date, end_date: date):
+    """Drop cached timesheets for every month from start_date through end_date"""
+    year, month = start_date.year, start_date.month
+    months = []
+    while (year, month) <= (end_date.year, end_date.month):
+        months.append(date(year, month, 1))
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    invalidate_timesheet_months(months)
+
+
+def invalidate_all_timesheets():
+    """Drop every cached timesheet (settings, holiday or employee changes)"""
+    _bump(GENERATION_KEY)
+
+
+# ----- matrix building -----
+
+def _employee_rows(employees_qs):
+    return employees_qs.order_by('employee_id').values_list(
+        'id', 'employee_id', 'user__first_name', 'user__last_name',
+        'department__name', 'designation__name', 'level_of_work', 'off_day', 'status'
+    )
+
+
+def holiday_dates(start: date, end: date) -> set:
+    """Observed holiday dates in [start, end], including recurring ones from earlier years"""
+    dates = set()
+    holidays = Holiday.objects.filter(is_observed=True).filter(
+        Q(start_date__lte=end, end_date__gte=start) | Q(is_recurring=True)
+    ).values_list('start_date', 'end_date', 'is_recurring')
+
+    for holiday_start, holiday_end, is_recurring in holidays:
+        day = holiday_start
+        while day <= holiday_end:
+            if start <= day <= end:
+                dates.add(day)
+            elif is_recurring:
+                try:
+                    shifted = day.replace(year=start.year)
+                except ValueError:  # 29 February
+                    shifted = None
+                if shifted and start <= shifted <= end:
+                    dates.add(shifted)
+            day += timedelta(days=1)
+    return dates
+
+
+def approved_leave_days(start: date, end: date, employee_pks) -> Dict[int, Dict[date, str]]:
+    """Approved leave status per employee per day (employee_pks=None for everyone)"""
+    leave_days: Dict[int, Dict[date, str]] = defaultdict(dict)
+    leaves = LeaveRequest.objects.filter(
+        status='approved', start_date__lte=end, end_date__gte=start
+    ).values_list('employee_id', 'start_date', 'end_date', 'leave_policy__leave_type')
+
+    for employee_pk, leave_start, leave_end, leave_type in leaves:
+        if employee_pks is not None and employee_pk not in employee_pks:
+            continue
+        leave_status = LEAVE_STATUS_BY_TYPE.get(leave_type, 'Leave-Earn')
+        day = max(leave_start, start)
+        while day <= min(leave_end, end):
+            leave_days[employee_pk][day] = leave_status
+            day += timedelta(days=1)
+    return leave_days
+
+
+def _hours(value) -> float:
+    return float(value) if value is not None else 0
+
+
+def iter_timesheet(year: int, month: int, employees_qs=None) -> Iterator[Dict[str, Any]]:
+    """Yield one timesheet row per employee for the month"""
+    start, end = month_range(year, month)
+    today = date.today()
+    rules = get_attendance_rules()
+
+    if employees_qs is None:
+        employees_qs = Employee.objects.all()
+    employees = list(_employee_rows(employees_qs))
+    employee_pks = {row[0] for row in employees}
+
+    # One query for every recorded employee-day in the month, limited to the requested employees
+    records: Dict[int, Dict[date, tuple]] = defaultdict(dict)
+    record_rows = DailyAttendance.objects.filter(
+        date__range=(start, end), employee_id__in=employees_qs.values('pk')
+    ).values_list(
+        'employee_id', 'date', 'status', 'first_check_in', 'last_check_out',
+        'total_working_hours', 'overtime_hours', 'extra_overtime_hours'
+    )
+    for row in record_rows.iterator(chunk_size=5000):
+        records[row[0]][row[1]] = row
+
+    holidays = holiday_dates(start, end)
+    leaves = approved_leave_days(start, end, employee_pks)
+
+    month_days = [start + timedelta(days=offset) for offset in range((end - start).days + 1)]
+    # 0=Sunday indexing, same as AttendanceSettings.weekend_days
+    weekday_of = {day: (day.weekday() + 1) % 7 for day in month_days}
+
+    for (employee_pk, employee_id, first_name, last_name, department, designation,
+         level_of_work, off_day, employee_status) in employees:
+        employee_records = records.get(employee_pk, {})
+        if employee_status in ('inactive', 'terminated') and not employee_records:
+            continue
+
+        employee_leaves = leaves.get(employee_pk, {})
+        weekend_days = {WEEKDAY_INDEX[off_day]} if off_day in WEEKDAY_INDEX else rules.weekend_days
+
+        days = []
+        for day in month_days:
+            record = employee_records.get(day)
+            if record and record[2] in PRESENT_STATUSES:
+                day_status = record[2]
+            elif day in employee_leaves:
+                day_status = employee_leaves[day]
+            elif day in holidays:
+                day_status = 'Holiday'
+            elif weekday_of[day] in weekend_days:
+                day_status = 'Weekend'
+            elif record:
+                day_status = record[2]
+            elif day > today:
+                day_status = None
+            else:
+                day_status = 'Absent'
+
+            days.append({
+                'day': day.day,
+                'date': day.isoformat(),
+                'status': day_status,
+                'checkIn': record[3].strftime('%H:%M') if record and record[3] else None,
+                'checkOut': record[4].strftime('%H:%M') if record and record[4] else None,
+                'workingHours': _hours(record[5]) if record else 0,
+                'overtime': _hours(record[6]) if record else 0,
+                'extraOvertime': _hours(record[7]) if record else 0,
+            })
+
+        yield {
+            'employeeId': employee_id,
+            'employeeName': f"{first_name} {last_name}".strip(),
+            'department': department,
+            'designation': designation,
+            'levelOfWork': dict(Employee.EMPLOYEE_TYPE_CHOICES).get(level_of_work, level_of_work),
+            'days': days,
+        }
+
+
+def stream_timesheet_json(year: int, month: int, employees_qs=None,
+                          cache_key: Optional[str] = None) -> Iterator[bytes]:
+    """
+    Encode the timesheet as a JSON array chunk by chunk.
+    With a cache_key, the finished document is cached once fully streamed.
+    """
+    chunks: List[bytes] = []
+    first = True
+    yield b'['
+    for row in iter_timesheet(year, month, employees_qs):
+        chunk = (b'' if first else b',') + json.dumps(row, separators=(',', ':')).encode()
+        first = False
+        if cache_key:
+            chunks.append(chunk)
+        yield chunk
+    yield b']'
+
+    if cache_key:
+        cache.set(cache_key, b'[' + b''.join(chunks) + b']', TIMESHEET_CACHE_TIMEOUT)
+        logger.info(f"Cached timesheet {year}-{month:02d}")
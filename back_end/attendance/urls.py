@@ -15,6 +15,10 @@ urlpatterns = [
     path('daily-attendance/', views.DailyAttendanceListCreateView.as_view(), name='daily-attendance-list'),
     path('daily-attendance/<int:pk>/', views.DailyAttendanceDetailView.as_view(), name='daily-attendance-detail'),
     path('daily-attendance/summary/', views.daily_attendance_summary, name='daily-attendance-summary'),
+    path('daily-attendance/recompute/', views.recompute_daily_attendance_view, name='daily-attendance-recompute'),
+    
+    # Timesheet
+    path('timesheet/', views.monthly_timesheet, name='monthly-timesheet'),
     
     # Leave Management
     path('leave-policies/', views.LeavePolicyListCreateView.as_view(), name='leave-policy-list'),
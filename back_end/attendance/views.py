@@ -7,6 +7,8 @@ from django_filters.rest_framework import DjangoFilterBackend
 from django.db.models import Q, Count, Sum, Avg
 from django.utils import timezone
 from django.core.paginator import Paginator
+from django.core.cache import cache
+from django.http import HttpResponse, StreamingHttpResponse
 from datetime import datetime, date, timedelta
 import json
 
@@ -22,6 +24,10 @@ from .serializers import (
 )
 from employees.models import Employee
 from .realtime_system import get_realtime_system
+from .recompute import month_range, recompute_daily_attendance
+from .timesheet import timesheet_cache_key, stream_timesheet_json
+from .aggregates import daily_totals
+from .daily_summary import summary_queryset, build_daily_summary, stream_daily_summary_json
 
 
 # ===== ATTENDANCE MACHINE VIEWS =====
@@ -146,9 +152,7 @@ def daily_attendance_summary(request):
         return Response({'error': 'Invalid date format. Use YYYY-MM-DD'}, status=status.HTTP_400_BAD_REQUEST)
     
     # Get attendance records for the date
-    queryset = DailyAttendance.objects.filter(date=target_date).select_related(
-        'employee__user', 'employee__department', 'employee__designation'
-    )
+    queryset = summary_queryset(target_date)
     
     # Apply role-based filtering
     if request.user.role == 'employee':
@@ -157,41 +161,124 @@ def daily_attendance_summary(request):
         queryset = queryset.filter(employee__department__head=request.user)
     # HR staff can see all
     
-    # Get scans for the date
-    scans = AttendanceScan.objects.filter(
-        scan_time__date=target_date
-    ).select_related('employee__user', 'machine')
+    department_filter = request.query_params.get('department', '').strip()
+    if department_filter and department_filter != 'All':
+        if department_filter.isdigit():
+            queryset = queryset.filter(employee__department_id=int(department_filter))
+        else:
+            queryset = queryset.filter(employee__department__name__icontains=department_filter)
     
-    # Build summary data
-    summary_data = []
-    for attendance in queryset:
-        employee_scans = scans.filter(employee=attendance.employee)
-        scan_list = []
-        
-        for scan in employee_scans:
-            scan_list.append({
-                'time': scan.scan_time.strftime('%H:%M'),
-                'type': scan.scan_type
-            })
-        
-        summary_data.append({
-            'employee_id': attendance.employee.employee_id,
-            'employee_name': attendance.employee.user.full_name,
-            'department': attendance.employee.department.name,
-            'designation': attendance.employee.designation.name,
-            'level_of_work': attendance.employee.level_of_work,
-            'date': attendance.date.strftime('%Y-%m-%d'),
-            'status': attendance.status,
-            'check_in': attendance.first_check_in.strftime('%H:%M') if attendance.first_check_in else None,
-            'check_out': attendance.last_check_out.strftime('%H:%M') if attendance.last_check_out else None,
-            'working_hours': float(attendance.total_working_hours),
-            'overtime': float(attendance.overtime_hours),
-            'extra_overtime': float(attendance.extra_overtime_hours),
-            'attendance_count': attendance.total_scans,
-            'scans': scan_list
-        })
+    # Without a page, stream the whole sheet (one grouped scan query per chunk of employees)
+    if 'page' not in request.query_params:
+        return StreamingHttpResponse(
+            stream_daily_summary_json(queryset, target_date), content_type='application/json'
+        )
+    
+    try:
+        page = max(int(request.query_params.get('page', 1)), 1)
+        page_size = int(request.query_params.get('page_size', 100))
+    except ValueError:
+        return Response({'error': 'Invalid page or page_size'}, status=status.HTTP_400_BAD_REQUEST)
+    if page_size < 1 or page_size > 1000:
+        page_size = 100
+    
+    total_count = queryset.count()
+    start_index = (page - 1) * page_size
+    end_index = start_index + page_size
+    total_pages = (total_count + page_size - 1) // page_size
+    
+    def link(target_page):
+        # Carry every filter over to the neighbouring pages
+        params = request.query_params.copy()
+        params['page'] = target_page
+        params['page_size'] = page_size
+        return f"?{params.urlencode()}"
+    
+    return Response({
+        'count': total_count,
+        'next': link(page + 1) if page < total_pages else None,
+        'previous': link(page - 1) if page > 1 else None,
+        'results': build_daily_summary(queryset[start_index:end_index], target_date),
+        'pagination': {
+            'current_page': page,
+            'page_size': page_size,
+            'total_pages': total_pages,
+            'has_next': page < total_pages,
+            'has_previous': page > 1
+        }
+    })
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def recompute_daily_attendance_view(request):
+    """Rebuild daily attendance from stored scans for a month or date range"""
+    if request.user.role not in ['hr_staff', 'hr_manager', 'super_admin']:
+        return Response({'error': 'Permission denied'}, status=status.HTTP_403_FORBIDDEN)
+    
+    try:
+        if request.data.get('month') and request.data.get('year'):
+            start_date, end_date = month_range(int(request.data['year']), int(request.data['month']))
+        elif request.data.get('start_date'):
+            start_date = datetime.strptime(request.data['start_date'], '%Y-%m-%d').date()
+            end_date = datetime.strptime(
+                request.data.get('end_date') or request.data['start_date'], '%Y-%m-%d'
+            ).date()
+        else:
+            return Response(
+                {'error': 'Provide month and year, or start_date (and optional end_date)'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+    except (TypeError, ValueError):
+        return Response({'error': 'Invalid date. Use YYYY-MM-DD, or numeric month and year'}, status=status.HTTP_400_BAD_REQUEST)
+    
+    if start_date > end_date:
+        return Response({'error': 'Start date cannot be after end date'}, status=status.HTTP_400_BAD_REQUEST)
+    
+    employee_ids = request.data.get('employee_ids') or None
+    if employee_ids is not None and (
+        not isinstance(employee_ids, list)
+        or not all(isinstance(pk, int) and not isinstance(pk, bool) for pk in employee_ids)
+    ):
+        return Response({'error': 'employee_ids must be a list of employee ids'}, status=status.HTTP_400_BAD_REQUEST)
+    
+    result = recompute_daily_attendance(start_date, end_date, employee_ids)
+    return Response(result)
+
+
+# ===== TIMESHEET VIEWS =====
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def monthly_timesheet(request):
+    """Get the employee x day attendance matrix for a month"""
+    try:
+        month = int(request.query_params.get('month', date.today().month))
+        year = int(request.query_params.get('year', date.today().year))
+        # Raises for months and years a date cannot hold - before the streaming response starts
+        month_range(year, month)
+    except ValueError:
+        return Response({'error': 'Invalid month or year'}, status=status.HTTP_400_BAD_REQUEST)
     
-    return Response(summary_data)
+    # Apply role-based filtering - only the unrestricted (HR) view is cached
+    employees = Employee.objects.all()
+    if request.user.role == 'employee':
+        employees = employees.filter(user=request.user)
+    elif request.user.role == 'department_head':
+        employees = employees.filter(department__head=request.user)
+    elif request.user.role not in ['hr_staff', 'hr_manager', 'super_admin']:
+        employees = employees.filter(user=request.user)
+    else:
+        cache_key = timesheet_cache_key(year, month)
+        cached = cache.get(cache_key)
+        if cached is not None:
+            return HttpResponse(cached, content_type='application/json')
+        return StreamingHttpResponse(
+            stream_timesheet_json(year, month, employees, cache_key=cache_key),
+            content_type='application/json'
+        )
+    
+    return StreamingHttpResponse(stream_timesheet_json(year, month, employees), content_type='application/json')
 
 
 # ===== LEAVE MANAGEMENT VIEWS =====
@@ -444,30 +531,12 @@ def attendance_statistics(request):
     
     # Get statistics
     total_employees = Employee.objects.count()
-    present_today = DailyAttendance.objects.filter(
-        date=end_date,
-        status__in=['Present-OnTime', 'Present-Considered', 'Present-Late']
-    ).count()
-    
-    absent_today = DailyAttendance.objects.filter(
-        date=end_date,
-        status='Absent'
-    ).count()
-    
-    leave_today = DailyAttendance.objects.filter(
-        date=end_date,
-        status__startswith='Leave-'
-    ).count()
     
-    # Department-wise statistics
-    dept_stats = DailyAttendance.objects.filter(
-        date=end_date
-    ).values('employee__department__name').annotate(
-        total=Count('id'),
-        present=Count('id', filter=Q(status__in=['Present-OnTime', 'Present-Considered', 'Present-Late'])),
-        absent=Count('id', filter=Q(status='Absent')),
-        leave=Count('id', filter=Q(status__startswith='Leave-'))
-    ).order_by('employee__department__name')
+    # Read the pre-aggregated rollup instead of scanning the daily table
+    totals = daily_totals(end_date)
+    present_today = totals['present']
+    absent_today = totals['absent']
+    leave_today = totals['leave']
     
     return Response({
         'total_employees': total_employees,
@@ -475,5 +544,5 @@ def attendance_statistics(request):
         'absent_today': absent_today,
         'leave_today': leave_today,
         'attendance_rate': round((present_today / total_employees * 100), 2) if total_employees > 0 else 0,
-        'department_stats': list(dept_stats)
+        'department_stats': totals['department_stats']
     })
\ No newline at end of file
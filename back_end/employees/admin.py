@@ -4,12 +4,14 @@ from .models import (
     Department, 
     Designation, 
     SalaryGrade, 
+    SalaryGradeRevision,
     SkillMetric, 
     ProcessExpertise, 
     Operation,
     Machine,
     Employee
 )
+from .salary import SALARY_SNAPSHOT_FIELDS
 
 # To improve the admin interface, we use ModelAdmin classes to customize the display.
 
@@ -70,6 +72,21 @@ class SalaryGradeAdmin(admin.ModelAdmin):
         super().save_model(request, obj, form, change)
 
 
+@admin.register(SalaryGradeRevision)
+class SalaryGradeRevisionAdmin(admin.ModelAdmin):
+    """
+    Admin configuration for the SalaryGradeRevision model.
+    Revisions are applied by the background job, so progress fields are read-only.
+    """
+    list_display = ('salary_grade', 'effective_date', 'gross_salary', 'status', 'processed_employees', 'updated_employees')
+    list_filter = ('status', 'salary_grade')
+    readonly_fields = (
+        'gross_salary', 'previous_values', 'status', 'total_employees', 'processed_employees',
+        'updated_employees', 'last_employee_pk', 'error_message', 'started_at', 'completed_at',
+        'created_at', 'updated_at'
+    )
+
+
 @admin.register(SkillMetric)
 class SkillMetricAdmin(admin.ModelAdmin):
     """
@@ -122,7 +139,7 @@ class EmployeeAdmin(admin.ModelAdmin):
     search_fields = ('employee_id', 'user__full_name', 'user__email', 'mobile_number', 'nid_number')
     list_filter = ('status', 'level_of_work', 'department', 'designation')
     autocomplete_fields = ('user', 'department', 'designation', 'reporting_manager', 'salary_grade')
-    readonly_fields = ('created_at', 'updated_at')
+    readonly_fields = ('created_at', 'updated_at', *SALARY_SNAPSHOT_FIELDS)
     list_per_page = 25
 
     # Using fieldsets to group the large number of fields into logical sections
@@ -160,6 +177,10 @@ class EmployeeAdmin(admin.ModelAdmin):
             'classes': ('collapse',),
             'fields': ('salary_grade', 'gross_salary', 'salary_components')
         }),
+        ('Effective Salary (computed on save)', {
+            'classes': ('collapse',),
+            'fields': SALARY_SNAPSHOT_FIELDS
+        }),
         ('Worker-Specific Information (for "Worker" level)', {
             'classes': ('collapse',),
             'description': "These fields are primarily for employees with 'Worker' level.",
@@ -0,0 +1,89 @@
+"""
+Process expertise table
+Employee.process_expertise ([{'operation': name, 'machine': name, 'duration': ''}]) is
+mirrored into EmployeeProcessExpertise with the names resolved to Operation and
+Machine rows where they exist. Skill filters match the indexed name columns (set for
+every entry) instead of searching JSON; the foreign keys serve lookups by id.
+"""
+
+from typing import Any, Dict, Iterable, List, Optional
+
+from django.db import transaction
+
+
+def _name(value) -> str:
+    return str(value).strip()[:200] if value else ''
+
+
+def expertise_entries(process_expertise) -> List[Dict[str, Any]]:
+    """The usable entries of a process_expertise value, in order"""
+    if not isinstance(process_expertise, list):
+        return []
+    entries = []
+    for entry in process_expertise:
+        if not isinstance(entry, dict):
+            continue
+        operation, machine = _name(entry.get('operation')), _name(entry.get('machine'))
+        if operation or machine:
+            entries.append({'operation': operation, 'machine': machine, 'duration': _name(entry.get('duration'))[:100]})
+    return entries
+
+
+def sync_process_expertise(employee_pks: Optional[Iterable[int]] = None, batch_size: int = 500) -> int:
+    """
+    Rewrite the expertise rows of the given employees (all of them when None) from
+    their JSON in pk-ordered batches. Returns the number of rows written.
+    """
+    from .models import Employee, EmployeeProcessExpertise, Operation, Machine
+
+    employees = Employee.objects.all()
+    if employee_pks is not None:
+        employees = employees.filter(pk__in=list(employee_pks))
+
+    written, last_pk = 0, 0
+    while True:
+        rows = list(employees.filter(pk__gt=last_pk).order_by('pk').values('id', 'process_expertise')[:batch_size])
+        if not rows:
+            return written
+        last_pk = rows[-1]['id']
+
+        entries = {row['id']: expertise_entries(row['process_expertise']) for row in rows}
+        names = [entry for employee_entries in entries.values() for entry in employee_entries]
+        operations = dict(Operation.objects.filter(
+            name__in={entry['operation'] for entry in names if entry['operation']}
+        ).values_list('name', 'id'))
+        machines = dict(Machine.objects.filter(
+            name__in={entry['machine'] for entry in names if entry['machine']}
+        ).values_list('name', 'id'))
+
+        with transaction.atomic():
+            EmployeeProcessExpertise.objects.filter(employee_id__in=list(entries)).delete()
+            created = EmployeeProcessExpertise.objects.bulk_create([
+                EmployeeProcessExpertise(
+                    employee_id=employee_pk,
+                    operation_id=operations.get(entry['operation']),
+                    machine_id=machines.get(entry['machine']),
+                    operation_name=entry['operation'],
+                    machine_name=entry['machine'],
+                    duration=entry['duration'],
+                    position=position,
+                )
+                for employee_pk, employee_entries in entries.items()
+                for position, entry in enumerate(employee_entries)
+            ], batch_size=1000)
+        written += len(created)
+
+
+def link_expertise_names(operation=None, machine=None) -> int:
+    """Point entries recorded under a name at its (new or renamed) Operation or Machine"""
+    from .models import EmployeeProcessExpertise
+
+    if operation is not None:
+        return EmployeeProcessExpertise.objects.filter(
+            operation__isnull=True, operation_name=operation.name
+        ).update(operation=operation)
+    if machine is not None:
+        return EmployeeProcessExpertise.objects.filter(
+            machine__isnull=True, machine_name=machine.name
+        ).update(machine=machine)
+    return 0
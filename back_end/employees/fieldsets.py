@@ -0,0 +1,97 @@
+"""
+Sparse fieldsets
+?fields=a,b keeps only those serializer fields, ?exclude=a,b drops some, and
+?expand=x swaps a foreign key id for a nested object. The narrowed serializer
+also narrows the SQL: JSON/file columns nothing asked for are deferred, and only
+the relations the remaining fields read are joined.
+"""
+
+from typing import Dict, List, Sequence, Tuple
+
+from rest_framework import serializers
+
+# Large Employee columns worth leaving in the database when not rendered
+DEFERRABLE_EMPLOYEE_FIELDS = (
+    'picture', 'children', 'present_address', 'permanent_address', 'work_experience',
+    'process_expertise', 'process_efficiency', 'nominee', 'emergency_contact', 'salary_components',
+)
+
+
+def _names(value: str) -> List[str]:
+    return list(dict.fromkeys(name.strip() for name in (value or '').split(',') if name.strip()))
+
+
+class SparseFieldsetMixin:
+    """
+    For ModelSerializers rendered on GET requests. Subclasses declare:
+    - expandable_fields: name -> (field factory, select_related paths, prefetch_related paths)
+    - field_dependencies: SerializerMethodField name -> model paths (lookup syntax) it reads
+    """
+    expandable_fields: Dict[str, Tuple] = {}
+    field_dependencies: Dict[str, Sequence[str]] = {}
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.expanded_fields = []
+        request = self.context.get('request')
+        if request is not None and request.method == 'GET':
+            self.apply_sparse_fieldset(request.query_params)
+
+    def apply_sparse_fieldset(self, params):
+        expand, fields, exclude = (_names(params.get(key)) for key in ('expand', 'fields', 'exclude'))
+
+        unknown = [name for name in expand if name not in self.expandable_fields]
+        if unknown:
+            raise serializers.ValidationError({'expand': f"Cannot expand: {', '.join(unknown)}"})
+        unknown = [name for name in fields + exclude if name not in self.fields and name not in self.expandable_fields]
+        if unknown:
+            raise serializers.ValidationError({'fields': f"Unknown fields: {', '.join(unknown)}"})
+
+        for name in expand:
+            self.fields[name] = self.expandable_fields[name][0]()
+            self.expanded_fields.append(name)
+        if fields:
+            # Expanding a field asks for it
+            keep = set(fields) | set(expand)
+            for name in list(self.fields):
+                if name not in keep:
+                    self.fields.pop(name)
+        for name in exclude:
+            self.fields.pop(name, None)
+
+
+def sparse_queryset(queryset, serializer):
+    """
+    Narrow an Employee queryset to what a (possibly sparse) serializer renders.
+    Left alone when a method field's dependencies are not declared.
+    """
+    columns, relations, prefetches = set(), set(), set()
+    for name, field in serializer.fields.items():
+        if name in getattr(serializer, 'expanded_fields', ()):
+            _, select, prefetch = serializer.expandable_fields[name]
+            paths = list(select)
+            prefetches.update(prefetch)
+            columns.add(name)
+        elif name in serializer.field_dependencies:
+            paths = serializer.field_dependencies[name]
+        elif field.source == '*':
+            return queryset
+        else:
+            paths = [field.source.replace('.', '__')]
+
+        for path in paths:
+            parts = path.split('__')
+            columns.add(parts[0])
+            if len(parts) > 1:
+                relations.add('__'.join(parts[:-1]))
+
+    queryset = queryset.select_related(None)
+    if relations:
+        queryset = queryset.select_related(*relations)
+    if prefetches:
+        queryset = queryset.prefetch_related(*prefetches)
+    deferred = [name for name in DEFERRABLE_EMPLOYEE_FIELDS if name not in columns]
+    if 'reporting_manager' in {relation.split('__')[0] for relation in relations}:
+        # The manager's row is joined for their name only
+        deferred += [f'reporting_manager__{name}' for name in DEFERRABLE_EMPLOYEE_FIELDS]
+    return queryset.defer(*deferred) if deferred else queryset
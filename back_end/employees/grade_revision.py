@@ -0,0 +1,221 @@
+"""
+Salary grade revisions
+Applies a revised SalaryGrade to every employee on it in pk-ordered chunks - one
+bulk_update per chunk, so Employee.save (and its credential logic) never runs.
+Jobs run on a background thread after the request commits, or from the
+apply_salary_grade_revisions command, and resume after the last employee written.
+"""
+
+import logging
+import threading
+from datetime import timedelta
+from typing import Any, Dict, List, Optional
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import Employee, SalaryGrade, SalaryGradeRevision
+from .organizational_data import invalidate_organizational_data
+from .salary import SALARY_COMPONENTS, SALARY_SNAPSHOT_FIELDS, refresh_salary_snapshots, salary_snapshot
+from .signals import salary_grade_revised
+
+logger = logging.getLogger(__name__)
+
+CLAIMABLE_STATUSES = ('scheduled', 'pending', 'failed')
+
+
+def stale_processing_q() -> Q:
+    """
+    Revisions left in 'processing' by a worker that died: no chunk has been
+    written for SALARY_GRADE_REVISION_STALE_SECONDS, so they may be claimed again
+    """
+    stale_before = timezone.now() - timedelta(seconds=getattr(settings, 'SALARY_GRADE_REVISION_STALE_SECONDS', 900))
+    return Q(status='processing') & (Q(heartbeat_at__lt=stale_before) | Q(heartbeat_at__isnull=True))
+
+
+def claimable_q(statuses=CLAIMABLE_STATUSES) -> Q:
+    return Q(status__in=statuses) | stale_processing_q()
+
+
+def is_claimable(revision: SalaryGradeRevision, statuses=CLAIMABLE_STATUSES) -> bool:
+    return SalaryGradeRevision.objects.filter(claimable_q(statuses), pk=revision.pk).exists()
+
+EMPLOYEE_UPDATE_FIELDS = ['salary_components', 'gross_salary', *SALARY_SNAPSHOT_FIELDS, 'updated_at']
+
+
+def revision_grade_values(revision: SalaryGradeRevision) -> Dict[str, Any]:
+    return {grade_field: getattr(revision, grade_field) for _, _, grade_field in SALARY_COMPONENTS}
+
+
+def revise_salary_components(salary_components: Dict[str, Any], grade: Dict[str, Any]) -> Dict[str, Any]:
+    """Components copied from the grade follow it; ones marked custom keep their own amount"""
+    if not salary_components:
+        return salary_components
+    revised = dict(salary_components)
+    for _, key, grade_field in SALARY_COMPONENTS:
+        data = revised.get(key)
+        if isinstance(data, dict) and not data.get('custom', False):
+            amount = grade[grade_field]
+            revised[key] = {**data, 'amount': float(amount), 'enabled': amount > 0}
+    return revised
+
+
+def apply_grade_revision(revision: SalaryGradeRevision, chunk_size: Optional[int] = None) -> SalaryGradeRevision:
+    """Apply (or resume) a revision whose effective date has come"""
+    chunk_size = chunk_size or getattr(settings, 'SALARY_GRADE_REVISION_CHUNK_SIZE', 1000)
+
+    # Claim the job so a duplicate trigger cannot run it twice; a claim whose
+    # heartbeat has gone stale belongs to a dead worker and is taken over
+    now = timezone.now()
+    claimed = SalaryGradeRevision.objects.filter(
+        claimable_q(), pk=revision.pk, effective_date__lte=timezone.localdate()
+    ).update(status='processing', error_message='', heartbeat_at=now, updated_at=now)
+    revision.refresh_from_db()
+    if not claimed:
+        return revision
+
+    grade = revision.salary_grade
+    values = revision_grade_values(revision)
+    employees = Employee.objects.filter(salary_grade=grade)
+    try:
+        if not revision.previous_values:
+            # First attempt: switch the grade itself. update() skips SalaryGrade.save's
+            # background snapshot refresh - the chunks below cover the same employees.
+            with transaction.atomic():
+                revision.previous_values = {
+                    field: str(getattr(grade, field)) for field in (*values, 'gross_salary')
+                }
+                revision.total_employees = employees.count()
+                revision.started_at = timezone.now()
+                revision.save(update_fields=['previous_values', 'total_employees', 'started_at', 'updated_at'])
+                SalaryGrade.objects.filter(pk=grade.pk).update(
+                    gross_salary=revision.gross_salary, updated_at=timezone.now(), **values
+                )
+                # update() sends no post_save - drop the cached dropdown grades by hand
+                transaction.on_commit(invalidate_organizational_data)
+
+        while True:
+            rows = list(
+                employees.filter(pk__gt=revision.last_employee_pk).order_by('pk')
+                .values('id', 'salary_components', 'gross_salary', *SALARY_SNAPSHOT_FIELDS)[:chunk_size]
+            )
+            if not rows:
+                break
+            _apply_chunk(revision, rows, values)
+    except Exception as e:
+        revision.status = 'failed'
+        revision.error_message = str(e)
+        revision.save(update_fields=['status', 'error_message', 'updated_at'])
+        logger.exception(f"Salary grade revision {revision.pk} failed")
+        raise
+
+    revision.status = 'completed'
+    revision.completed_at = timezone.now()
+    revision.save(update_fields=['status', 'completed_at', 'updated_at'])
+    logger.info(
+        f"Salary grade {grade.name} revised from {revision.effective_date}: "
+        f"{revision.updated_employees} of {revision.processed_employees} employees changed"
+    )
+    return revision
+
+
+def _apply_chunk(revision: SalaryGradeRevision, rows: List[Dict[str, Any]], grade: Dict[str, Any]):
+    now = timezone.now()
+    changed = []
+    for row in rows:
+        components = revise_salary_components(row['salary_components'], grade)
+        snapshot = salary_snapshot(components, grade, row['gross_salary'])
+        gross_salary = snapshot['effective_gross_salary']
+        if (components == row['salary_components'] and gross_salary == row['gross_salary']
+                and all(row[field] == value for field, value in snapshot.items())):
+            continue
+        changed.append(Employee(
+            id=row['id'], salary_components=components, gross_salary=gross_salary, updated_at=now, **snapshot
+        ))
+
+    # The chunk and the resume cursor commit together
+    with transaction.atomic():
+        if changed:
+            Employee.objects.bulk_update(changed, EMPLOYEE_UPDATE_FIELDS)
+        SalaryGradeRevision.objects.filter(pk=revision.pk).update(
+            last_employee_pk=rows[-1]['id'],
+            processed_employees=F('processed_employees') + len(rows),
+            updated_employees=F('updated_employees') + len(changed),
+            heartbeat_at=now,
+            updated_at=now
+        )
+    revision.refresh_from_db()
+
+    if changed:
+        salary_grade_revised.send(
+            sender=SalaryGradeRevision, revision=revision, employee_pks=[employee.id for employee in changed]
+        )
+
+
+def _run_revision(revision_pk: int):
+    try:
+        apply_grade_revision(SalaryGradeRevision.objects.get(pk=revision_pk))
+    except Exception:
+        # Already recorded on the revision as failed
+        pass
+
+
+def _run_in_thread(target, *args):
+    try:
+        target(*args)
+    finally:
+        # Thread-local connections are not closed by the request cycle
+        connections.close_all()
+
+
+def _start_after_commit(target, pk: int, name: str):
+    """Run target(pk) once the current transaction commits, on a background thread unless disabled"""
+    if getattr(settings, 'SALARY_GRADE_REVISION_BACKGROUND', True):
+        transaction.on_commit(lambda: threading.Thread(
+            target=_run_in_thread, args=(target, pk), name=name, daemon=True
+        ).start())
+    else:
+        transaction.on_commit(lambda: target(pk))
+
+
+def start_grade_revision(revision: SalaryGradeRevision):
+    """Run a due revision once the current transaction commits; future ones stay scheduled"""
+    if revision.effective_date > timezone.localdate():
+        return
+    _start_after_commit(_run_revision, revision.pk, f'salary-grade-revision-{revision.pk}')
+
+
+def refresh_grade_snapshots(grade_pk: int) -> int:
+    """Bring the salary snapshot of every employee on a grade in line with its amounts"""
+    chunk_size = getattr(settings, 'SALARY_GRADE_REVISION_CHUNK_SIZE', 1000)
+    try:
+        updated = refresh_salary_snapshots(Employee.objects.filter(salary_grade_id=grade_pk), chunk_size)
+    except Exception:
+        logger.exception(f"Salary snapshot refresh for grade {grade_pk} failed")
+        return 0
+    logger.info(f"Salary grade {grade_pk} edited: {updated} employee snapshots refreshed")
+    return updated
+
+
+def start_grade_snapshot_refresh(grade: SalaryGrade):
+    """Refresh the grade's employee snapshots once the edit commits (SalaryGrade.save)"""
+    _start_after_commit(refresh_grade_snapshots, grade.pk, f'salary-grade-snapshots-{grade.pk}')
+
+
+def apply_due_grade_revisions(retry_failed: bool = False, chunk_size: Optional[int] = None) -> List[SalaryGradeRevision]:
+    """Apply every revision whose effective date has come, oldest first, taking over stale claims"""
+    statuses = CLAIMABLE_STATUSES if retry_failed else ('scheduled', 'pending')
+    due = SalaryGradeRevision.objects.filter(
+        claimable_q(statuses), effective_date__lte=timezone.localdate()
+    ).order_by('effective_date', 'pk')
+    applied = []
+    for revision in due:
+        try:
+            apply_grade_revision(revision, chunk_size)
+        except Exception:
+            # Recorded on the revision as failed - carry on with the others
+            revision.refresh_from_db()
+        applied.append(revision)
+    return applied
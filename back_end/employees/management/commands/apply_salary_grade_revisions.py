@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+
+from employees.grade_revision import apply_due_grade_revisions
+
+
+class Command(BaseCommand):
+    help = 'Apply every salary grade revision whose effective date has come, resuming stalled ones (run daily)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--retry-failed',
+            action='store_true',
+            help='Also resume revisions that failed part way',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            help='Employees per bulk update (defaults to SALARY_GRADE_REVISION_CHUNK_SIZE)',
+        )
+
+    def handle(self, *args, **options):
+        revisions = apply_due_grade_revisions(options['retry_failed'], options['chunk_size'])
+
+        if not revisions:
+            self.stdout.write('No salary grade revisions due')
+        for revision in revisions:
+            message = (
+                f"{revision.salary_grade.name} from {revision.effective_date}: {revision.status}, "
+                f"{revision.updated_employees} of {revision.processed_employees} employees updated"
+            )
+            if revision.status == 'failed':
+                self.stderr.write(self.style.ERROR(f"{message} - {revision.error_message}"))
+            else:
+                self.stdout.write(self.style.SUCCESS(message))
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from employees.search import reindex_employees
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the employee search index (after bulk imports or raw SQL edits)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Employees reindexed per transaction',
+        )
+
+    def handle(self, *args, **options):
+        indexed = reindex_employees(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Indexed {indexed} employees'))
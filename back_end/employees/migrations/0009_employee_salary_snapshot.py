@@ -0,0 +1,130 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:37
+
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.conf import settings
+from django.db import migrations, models
+
+# Frozen copy of employees.salary as of this migration
+SALARY_COMPONENTS = [
+    ('basic_salary', 'basicSalary', 'basic_salary'),
+    ('house_rent', 'houseRent', 'house_rent'),
+    ('medical_allowance', 'medicalAllowance', 'medical_allowance'),
+    ('conveyance', 'conveyance', 'conveyance'),
+    ('food_allowance', 'foodAllowance', 'food_allowance'),
+    ('mobile_bill', 'mobileBill', 'mobile_bill'),
+]
+
+SALARY_SNAPSHOT_FIELDS = tuple(
+    f'effective_{component}' for component, _, _ in SALARY_COMPONENTS
+) + ('effective_gross_salary', 'salary_source')
+
+
+def _decimal(value):
+    if value in (None, ''):
+        return Decimal('0')
+    try:
+        return Decimal(str(value))
+    except ArithmeticError:
+        return Decimal('0')
+
+
+def salary_snapshot(salary_components, grade, gross_salary):
+    if salary_components:
+        source = 'components'
+        resolved = {}
+        for component, key, _ in SALARY_COMPONENTS:
+            data = salary_components.get(key)
+            enabled = isinstance(data, dict) and data.get('enabled', False)
+            resolved[component] = _decimal(data.get('amount')) if enabled else Decimal('0')
+    elif grade:
+        source = 'grade'
+        resolved = {component: _decimal(grade[grade_field]) for component, _, grade_field in SALARY_COMPONENTS}
+    else:
+        source = 'gross'
+        resolved = {component: Decimal('0') for component, _, _ in SALARY_COMPONENTS}
+        resolved['basic_salary'] = _decimal(gross_salary)
+
+    snapshot = {
+        f'effective_{component}': amount.quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+        for component, amount in resolved.items()
+    }
+    snapshot['effective_gross_salary'] = sum(snapshot.values(), Decimal('0'))
+    snapshot['salary_source'] = source
+    return snapshot
+
+
+def backfill_salary_snapshots(apps, schema_editor):
+    Employee = apps.get_model('employees', 'Employee')
+    SalaryGrade = apps.get_model('employees', 'SalaryGrade')
+    grades = {
+        row['id']: row for row in SalaryGrade.objects.values('id', *(field for _, _, field in SALARY_COMPONENTS))
+    }
+    employees = []
+    for employee in Employee.objects.only('id', 'salary_components', 'salary_grade_id', 'gross_salary').iterator():
+        for field, value in salary_snapshot(
+            employee.salary_components, grades.get(employee.salary_grade_id), employee.gross_salary
+        ).items():
+            setattr(employee, field, value)
+        employees.append(employee)
+    Employee.objects.bulk_update(employees, SALARY_SNAPSHOT_FIELDS, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('employees', '0008_employee_generated_email_employee_generated_password'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='employee',
+            name='effective_basic_salary',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=10),
+        ),
+        migrations.AddField(
+            model_name='employee',
+            name='effective_conveyance',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=10),
+        ),
+        migrations.AddField(
+            model_name='employee',
+            name='effective_food_allowance',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=10),
+        ),
+        migrations.AddField(
+            model_name='employee',
+            name='effective_gross_salary',
+            field=models.DecimalField(db_index=True, decimal_places=2, default=0, max_digits=10),
+        ),
+        migrations.AddField(
+            model_name='employee',
+            name='effective_house_rent',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=10),
+        ),
+        migrations.AddField(
+            model_name='employee',
+            name='effective_medical_allowance',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=10),
+        ),
+        migrations.AddField(
+            model_name='employee',
+            name='effective_mobile_bill',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=10),
+        ),
+        migrations.AddField(
+            model_name='employee',
+            name='salary_source',
+            field=models.CharField(choices=[('components', 'Salary Components'), ('grade', 'Salary Grade'), ('gross', 'Gross Salary')], default='gross', help_text='Where the effective salary comes from', max_length=20),
+        ),
+        migrations.AddIndex(
+            model_name='employee',
+            index=models.Index(fields=['department', 'effective_gross_salary'], name='employees_e_departm_f19170_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='employee',
+            index=models.Index(fields=['level_of_work', 'effective_gross_salary'], name='employees_e_level_o_66367c_idx'),
+        ),
+        migrations.RunPython(backfill_salary_snapshots, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:41
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('employees', '0009_employee_salary_snapshot'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SalaryGradeRevision',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('effective_date', models.DateField(help_text='Date the revised salary applies from')),
+                ('basic_salary', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('house_rent', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('medical_allowance', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('conveyance', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('food_allowance', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('mobile_bill', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('gross_salary', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('previous_values', models.JSONField(blank=True, default=dict, help_text='Grade components before the revision')),
+                ('status', models.CharField(choices=[('scheduled', 'Scheduled'), ('pending', 'Pending'), ('processing', 'Processing'), ('completed', 'Completed'), ('failed', 'Failed')], default='pending', max_length=20)),
+                ('total_employees', models.PositiveIntegerField(default=0)),
+                ('processed_employees', models.PositiveIntegerField(default=0)),
+                ('updated_employees', models.PositiveIntegerField(default=0)),
+                ('last_employee_pk', models.BigIntegerField(default=0)),
+                ('error_message', models.TextField(blank=True)),
+                ('notes', models.TextField(blank=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('completed_at', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='salary_grade_revisions', to=settings.AUTH_USER_MODEL)),
+                ('salary_grade', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='revisions', to='employees.salarygrade')),
+            ],
+            options={
+                'verbose_name': 'Salary Grade Revision',
+                'verbose_name_plural': 'Salary Grade Revisions',
+                'db_table': 'employees_salary_grade_revision',
+                'ordering': ['-effective_date', '-created_at'],
+                'indexes': [models.Index(fields=['status', 'effective_date'], name='employees_s_status_53c648_idx')],
+            },
+        ),
+    ]
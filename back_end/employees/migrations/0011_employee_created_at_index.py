@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:43
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('employees', '0010_salarygraderevision'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='employee',
+            index=models.Index(fields=['created_at', 'id'], name='employees_e_created_d6340b_idx'),
+        ),
+    ]
@@ -0,0 +1,91 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:44
+
+import re
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# Frozen copy of employees.search as of this migration
+SEARCH_FIELDS = [
+    ('employee_id', 'employee_id', 10),
+    ('name_english', 'name', 8),
+    ('name_bangla', 'name', 8),
+    ('user__first_name', 'name', 8),
+    ('user__last_name', 'name', 8),
+    ('user__email', 'email', 6),
+    ('user__phone', 'phone', 6),
+    ('department__name', 'department', 3),
+    ('designation__name', 'designation', 3),
+]
+
+TOKEN_MAX_LENGTH = 100
+
+_SPLIT = re.compile(r'[^\w\u0980-\u09ff]+|_')
+_ALNUM_BOUNDARY = re.compile(r'\d+|[^\d]+')
+
+
+def value_tokens(value, field):
+    if not value:
+        return set()
+    tokens = {token[:TOKEN_MAX_LENGTH] for token in _SPLIT.split(str(value).casefold()) if token}
+    if field == 'employee_id':
+        for token in list(tokens):
+            for part in _ALNUM_BOUNDARY.findall(token):
+                tokens.add(part)
+                if part.isdigit() and part.lstrip('0'):
+                    tokens.add(part.lstrip('0'))
+    elif field == 'email':
+        tokens.add(str(value).casefold()[:TOKEN_MAX_LENGTH])
+    elif field == 'phone':
+        digits = re.sub(r'\D', '', str(value))
+        if digits:
+            tokens = {digits}
+            if len(digits) > 11:
+                tokens.add(digits[-11:])
+    return tokens
+
+
+def employee_tokens(row):
+    tokens = {}
+    for path, field, weight in SEARCH_FIELDS:
+        for token in value_tokens(row.get(path), field):
+            tokens[(token, field)] = max(weight, tokens.get((token, field), 0))
+    return tokens
+
+
+def build_search_index(apps, schema_editor):
+    Employee = apps.get_model('employees', 'Employee')
+    EmployeeSearchToken = apps.get_model('employees', 'EmployeeSearchToken')
+    tokens = [
+        EmployeeSearchToken(employee_id=row['id'], token=token, field=field, weight=weight)
+        for row in Employee.objects.values('id', *(path for path, _, _ in SEARCH_FIELDS)).iterator()
+        for (token, field), weight in employee_tokens(row).items()
+    ]
+    EmployeeSearchToken.objects.bulk_create(tokens, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('employees', '0011_employee_created_at_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EmployeeSearchToken',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('token', models.CharField(max_length=100)),
+                ('field', models.CharField(choices=[('employee_id', 'Employee ID'), ('name', 'Name'), ('email', 'Email'), ('phone', 'Phone'), ('department', 'Department'), ('designation', 'Designation')], max_length=20)),
+                ('weight', models.PositiveSmallIntegerField(default=1)),
+                ('employee', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_tokens', to='employees.employee')),
+            ],
+            options={
+                'verbose_name': 'Employee Search Token',
+                'verbose_name_plural': 'Employee Search Tokens',
+                'db_table': 'employees_search_token',
+                'indexes': [models.Index(fields=['token', 'employee'], name='employees_s_token_831ef7_idx')],
+            },
+        ),
+        migrations.RunPython(build_search_index, migrations.RunPython.noop),
+    ]
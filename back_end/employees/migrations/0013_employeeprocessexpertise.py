@@ -0,0 +1,73 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:46
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+# Frozen copy of employees.expertise as of this migration
+def _name(value):
+    return str(value).strip()[:200] if value else ''
+
+
+def expertise_entries(process_expertise):
+    if not isinstance(process_expertise, list):
+        return []
+    entries = []
+    for entry in process_expertise:
+        if not isinstance(entry, dict):
+            continue
+        operation, machine = _name(entry.get('operation')), _name(entry.get('machine'))
+        if operation or machine:
+            entries.append({'operation': operation, 'machine': machine, 'duration': _name(entry.get('duration'))[:100]})
+    return entries
+
+
+def backfill_process_expertise(apps, schema_editor):
+    Employee = apps.get_model('employees', 'Employee')
+    EmployeeProcessExpertise = apps.get_model('employees', 'EmployeeProcessExpertise')
+    operations = dict(apps.get_model('employees', 'Operation').objects.values_list('name', 'id'))
+    machines = dict(apps.get_model('employees', 'Machine').objects.values_list('name', 'id'))
+    rows = []
+    for employee_pk, process_expertise in Employee.objects.values_list('id', 'process_expertise').iterator():
+        for position, entry in enumerate(expertise_entries(process_expertise)):
+            rows.append(EmployeeProcessExpertise(
+                employee_id=employee_pk,
+                operation_id=operations.get(entry['operation']),
+                machine_id=machines.get(entry['machine']),
+                operation_name=entry['operation'],
+                machine_name=entry['machine'],
+                duration=entry['duration'],
+                position=position,
+            ))
+    EmployeeProcessExpertise.objects.bulk_create(rows, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('employees', '0012_employeesearchtoken'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EmployeeProcessExpertise',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('operation_name', models.CharField(blank=True, max_length=200)),
+                ('machine_name', models.CharField(blank=True, max_length=200)),
+                ('duration', models.CharField(blank=True, max_length=100)),
+                ('position', models.PositiveSmallIntegerField(default=0)),
+                ('employee', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='process_expertise_entries', to='employees.employee')),
+                ('machine', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='employee_expertise', to='employees.machine')),
+                ('operation', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='employee_expertise', to='employees.operation')),
+            ],
+            options={
+                'verbose_name': 'Employee Process Expertise',
+                'verbose_name_plural': 'Employee Process Expertise',
+                'db_table': 'employees_employee_process_expertise',
+                'ordering': ['employee', 'position'],
+                'indexes': [models.Index(fields=['machine', 'employee'], name='employees_e_machine_498016_idx'), models.Index(fields=['operation', 'employee'], name='employees_e_operati_b966c1_idx'), models.Index(fields=['operation', 'machine'], name='employees_e_operati_bdb8d6_idx')],
+            },
+        ),
+        migrations.RunPython(backfill_process_expertise, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-18 21:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('employees', '0013_employeeprocessexpertise'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='employeeprocessexpertise',
+            index=models.Index(fields=['operation_name', 'employee'], name='employees_e_operati_1a7c72_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='employeeprocessexpertise',
+            index=models.Index(fields=['machine_name', 'employee'], name='employees_e_machine_1a7686_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 21:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('employees', '0014_employeeprocessexpertise_name_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='salarygraderevision',
+            name='heartbeat_at',
+            field=models.DateTimeField(blank=True, help_text='Last sign of life from the worker applying it; stale ones can be reclaimed', null=True),
+        ),
+    ]
@@ -1,6 +1,9 @@
 from django.db import models
 from django.core.validators import MinValueValidator, MaxValueValidator
 from authentication.models import User
+from .salary import (
+    SALARY_SNAPSHOT_FIELDS, SALARY_SOURCE_FIELDS, grade_values, salary_snapshot
+)
 
 
 class Department(models.Model):
@@ -103,6 +106,94 @@ class SalaryGrade(models.Model):
     def __str__(self):
         return f"{self.name} ({self.get_grade_type_display()})"
     
+    def save(self, *args, **kwargs):
+        previous = None
+        if self.pk:
+            previous = grade_values(SalaryGrade.objects.filter(pk=self.pk).first())
+        super().save(*args, **kwargs)
+        if previous is not None and previous != grade_values(self):
+            # Employees paid on this grade carry its amounts in their salary snapshot -
+            # refreshed in chunks by a background job once this save commits
+            from .grade_revision import start_grade_snapshot_refresh
+            start_grade_snapshot_refresh(self)
+    
+    def calculate_gross_salary(self):
+        """Calculate gross salary from components"""
+        return (
+            self.basic_salary + 
+            self.house_rent + 
+            self.medical_allowance + 
+            self.conveyance + 
+            self.food_allowance + 
+            self.mobile_bill
+        )
+
+
+class SalaryGradeRevision(models.Model):
+    """
+    Salary Grade revision applied to every employee on the grade as a background job
+    """
+    STATUS_CHOICES = [
+        ('scheduled', 'Scheduled'),
+        ('pending', 'Pending'),
+        ('processing', 'Processing'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+    ]
+    
+    salary_grade = models.ForeignKey(
+        SalaryGrade,
+        on_delete=models.CASCADE,
+        related_name='revisions'
+    )
+    effective_date = models.DateField(help_text="Date the revised salary applies from")
+    
+    # Revised components
+    basic_salary = models.DecimalField(max_digits=10, decimal_places=2)
+    house_rent = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    medical_allowance = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    conveyance = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    food_allowance = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    mobile_bill = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    gross_salary = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    previous_values = models.JSONField(default=dict, blank=True, help_text="Grade components before the revision")
+    
+    # Progress - employees are updated in pk order, so a failed job resumes after last_employee_pk
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    total_employees = models.PositiveIntegerField(default=0)
+    processed_employees = models.PositiveIntegerField(default=0)
+    updated_employees = models.PositiveIntegerField(default=0)
+    last_employee_pk = models.BigIntegerField(default=0)
+    error_message = models.TextField(blank=True)
+    heartbeat_at = models.DateTimeField(
+        null=True, blank=True, help_text="Last sign of life from the worker applying it; stale ones can be reclaimed"
+    )
+    
+    notes = models.TextField(blank=True)
+    created_by = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='salary_grade_revisions'
+    )
+    started_at = models.DateTimeField(null=True, blank=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'employees_salary_grade_revision'
+        verbose_name = 'Salary Grade Revision'
+        verbose_name_plural = 'Salary Grade Revisions'
+        ordering = ['-effective_date', '-created_at']
+        indexes = [
+            models.Index(fields=['status', 'effective_date']),
+        ]
+    
+    def __str__(self):
+        return f"{self.salary_grade.name} from {self.effective_date} ({self.status})"
+    
     def calculate_gross_salary(self):
         """Calculate gross salary from components"""
         return (
@@ -247,6 +338,13 @@ class Employee(models.Model):
         ('on_leave', 'On Leave'),
     ]
     
+    # Salary Source Choices
+    SALARY_SOURCE_CHOICES = [
+        ('components', 'Salary Components'),
+        ('grade', 'Salary Grade'),
+        ('gross', 'Gross Salary'),
+    ]
+    
     # Blood Group Choices (exactly as frontend)
     BLOOD_GROUP_CHOICES = [
         ('A+', 'A+'),
@@ -538,6 +636,22 @@ class Employee(models.Model):
         help_text="Salary components: {'basicSalary': {'enabled': true, 'amount': 0, 'custom': false}, 'houseRent': {...}, 'medicalAllowance': {...}, 'foodAllowance': {...}, 'conveyance': {...}, 'mobileBill': {...}}"
     )
     
+    # ===== EFFECTIVE SALARY SNAPSHOT =====
+    # Resolved from salary_components, else the salary grade, else gross_salary - kept in sync on save
+    effective_basic_salary = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    effective_house_rent = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    effective_medical_allowance = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    effective_conveyance = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    effective_food_allowance = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    effective_mobile_bill = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    effective_gross_salary = models.DecimalField(max_digits=10, decimal_places=2, default=0, db_index=True)
+    salary_source = models.CharField(
+        max_length=20,
+        choices=SALARY_SOURCE_CHOICES,
+        default='gross',
+        help_text="Where the effective salary comes from"
+    )
+    
     # ===== EMPLOYMENT STATUS =====
     status = models.CharField(
         max_length=20, 
@@ -577,6 +691,12 @@ class Employee(models.Model):
         verbose_name = 'Employee'
         verbose_name_plural = 'Employees'
         ordering = ['employee_id']
+        indexes = [
+            models.Index(fields=['department', 'effective_gross_salary']),
+            models.Index(fields=['level_of_work', 'effective_gross_salary']),
+            # Keyset pagination of the employee list
+            models.Index(fields=['created_at', 'id']),
+        ]
     
     def __str__(self):
         return f"{self.employee_id} - {self.user.full_name}"
@@ -606,15 +726,16 @@ class Employee(models.Model):
         return dict(self.EMPLOYEE_TYPE_CHOICES).get(self.level_of_work, self.level_of_work)
     
     def get_total_salary_components(self):
-        """Calculate total from salary components"""
-        if not self.salary_components:
+        """Total of the enabled salary components, read from the snapshot"""
+        if self.salary_source != 'components':
             return 0
-        
-        total = 0
-        for component, data in self.salary_components.items():
-            if isinstance(data, dict) and data.get('enabled', False):
-                total += data.get('amount', 0)
-        return total
+        return self.effective_gross_salary
+    
+    def apply_salary_snapshot(self):
+        """Recompute the effective salary columns from components, grade and gross salary"""
+        grade = grade_values(self.salary_grade) if self.salary_grade_id else None
+        for field, value in salary_snapshot(self.salary_components, grade, self.gross_salary).items():
+            setattr(self, field, value)
     
     def save(self, *args, **kwargs):
         """
@@ -633,4 +754,90 @@ class Employee(models.Model):
                 self.user.set_password(password)
                 self.user.save()
         
-        super().save(*args, **kwargs)
\ No newline at end of file
+        self.apply_salary_snapshot()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and set(update_fields) & set(SALARY_SOURCE_FIELDS):
+            kwargs['update_fields'] = {*update_fields, *SALARY_SNAPSHOT_FIELDS}
+        
+        super().save(*args, **kwargs)
+
+
+class EmployeeSearchToken(models.Model):
+    """One lowercase token of an employee's searchable fields - maintained by employees.signals"""
+    FIELD_CHOICES = [
+        ('employee_id', 'Employee ID'),
+        ('name', 'Name'),
+        ('email', 'Email'),
+        ('phone', 'Phone'),
+        ('department', 'Department'),
+        ('designation', 'Designation'),
+    ]
+    
+    employee = models.ForeignKey(
+        Employee,
+        on_delete=models.CASCADE,
+        related_name='search_tokens'
+    )
+    token = models.CharField(max_length=100)
+    field = models.CharField(max_length=20, choices=FIELD_CHOICES)
+    weight = models.PositiveSmallIntegerField(default=1)
+    
+    class Meta:
+        db_table = 'employees_search_token'
+        verbose_name = 'Employee Search Token'
+        verbose_name_plural = 'Employee Search Tokens'
+        indexes = [
+            models.Index(fields=['token', 'employee']),
+        ]
+    
+    def __str__(self):
+        return f"{self.token} ({self.field})"
+
+
+class EmployeeProcessExpertise(models.Model):
+    """
+    One entry of Employee.process_expertise as a row, so "who can run machine X" is an
+    index lookup. The JSON stays the source of truth; employees.signals rewrites an
+    employee's rows whenever it is saved.
+    """
+    employee = models.ForeignKey(
+        Employee,
+        on_delete=models.CASCADE,
+        related_name='process_expertise_entries'
+    )
+    operation = models.ForeignKey(
+        Operation,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='employee_expertise'
+    )
+    machine = models.ForeignKey(
+        Machine,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='employee_expertise'
+    )
+    # Names as entered, to link entries whose operation or machine is created later
+    operation_name = models.CharField(max_length=200, blank=True)
+    machine_name = models.CharField(max_length=200, blank=True)
+    duration = models.CharField(max_length=100, blank=True)
+    position = models.PositiveSmallIntegerField(default=0)
+    
+    class Meta:
+        db_table = 'employees_employee_process_expertise'
+        verbose_name = 'Employee Process Expertise'
+        verbose_name_plural = 'Employee Process Expertise'
+        ordering = ['employee', 'position']
+        indexes = [
+            models.Index(fields=['machine', 'employee']),
+            models.Index(fields=['operation', 'employee']),
+            models.Index(fields=['operation', 'machine']),
+            # Name filters match entries whose operation or machine has no row yet
+            models.Index(fields=['operation_name', 'employee']),
+            models.Index(fields=['machine_name', 'employee']),
+        ]
+    
+    def __str__(self):
+        return f"{self.employee_id}: {self.operation_name or '-'} / {self.machine_name or '-'}"
@@ -0,0 +1,57 @@
+"""
+Organizational data bundle
+The dropdown data every employee form loads (active departments, designations,
+salary grades, skill metrics, process expertise) rendered once to JSON and cached
+under a version that signals bump once a change to any of it commits. The ETag is
+the hash of the rendered bytes, so an unchanged bundle costs clients a 304.
+"""
+
+import hashlib
+from typing import Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.renderers import JSONRenderer
+
+VERSION_KEY = 'employees:organizational-data:version'
+
+
+def invalidate_organizational_data():
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.set(VERSION_KEY, 1, None)
+
+
+def build_organizational_data() -> dict:
+    from .models import Department, Designation, SalaryGrade, SkillMetric, ProcessExpertise
+    from .serializers import (
+        DepartmentSerializer, DesignationSerializer, SalaryGradeSerializer, SkillMetricSerializer,
+        ProcessExpertiseSerializer
+    )
+    from .stats import with_employee_counts
+
+    return {
+        'departments': DepartmentSerializer(
+            with_employee_counts(Department.objects.filter(is_active=True).select_related('head')), many=True
+        ).data,
+        'designations': DesignationSerializer(
+            with_employee_counts(Designation.objects.filter(is_active=True).select_related('department')), many=True
+        ).data,
+        'salary_grades': SalaryGradeSerializer(SalaryGrade.objects.filter(is_active=True), many=True).data,
+        'skill_metrics': SkillMetricSerializer(SkillMetric.objects.filter(is_active=True), many=True).data,
+        'process_expertise': ProcessExpertiseSerializer(ProcessExpertise.objects.filter(is_active=True), many=True).data,
+    }
+
+
+def organizational_data_bundle() -> Tuple[str, bytes]:
+    """(ETag, JSON body) of the current bundle, rendered on a cache miss only"""
+    version = cache.get_or_set(VERSION_KEY, 0, None)
+    key = f'employees:organizational-data:v{version}'
+    bundle = cache.get(key)
+    if bundle is None:
+        body = JSONRenderer().render(build_organizational_data())
+        bundle = (f'"{hashlib.sha256(body).hexdigest()[:32]}"', body)
+        # Versioned, so the timeout only bounds staleness across processes
+        cache.set(key, bundle, getattr(settings, 'ORGANIZATIONAL_DATA_CACHE_TIMEOUT', 60))
+    return bundle
@@ -0,0 +1,81 @@
+"""
+Lean employee projection for dashboard charts
+Only the columns the charts aggregate, read with values_list() - no model instances,
+no serializers - and encoded as JSON in batches while the rows stream from the
+database cursor. The columnar layout ({field: [values...]}) drops the repeated keys,
+which is most of the row layout's payload.
+"""
+
+import json
+from typing import Iterator, List, Sequence
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+# Output field -> Employee values() path
+STATS_PROJECTION = {
+    'id': 'id',
+    'employee_id': 'employee_id',
+    'name': 'name_english',
+    'department': 'department_id',
+    'department_name': 'department__name',
+    'designation': 'designation_id',
+    'designation_name': 'designation__name',
+    'level_of_work': 'level_of_work',
+    'gender': 'gender',
+    'status': 'status',
+    'date_of_joining': 'date_of_joining',
+    'salary_grade': 'salary_grade_id',
+    'gross_salary': 'effective_gross_salary',
+}
+
+BATCH_SIZE = 1000
+
+
+def projection_fields(requested: str) -> List[str]:
+    """Fields named in a comma-separated ?fields= (all of them when empty); unknown names raise ValueError"""
+    if not requested:
+        return list(STATS_PROJECTION)
+    fields = [field.strip() for field in requested.split(',') if field.strip()]
+    unknown = [field for field in fields if field not in STATS_PROJECTION]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    return list(dict.fromkeys(fields))
+
+
+def _encode(value) -> bytes:
+    return json.dumps(value, cls=DjangoJSONEncoder, separators=(',', ':')).encode()
+
+
+def _rows(queryset, fields: Sequence[str]):
+    return queryset.order_by('pk').values_list(
+        *(STATS_PROJECTION[field] for field in fields)
+    ).iterator(chunk_size=BATCH_SIZE)
+
+
+def stream_projection_rows(queryset, fields: Sequence[str]) -> Iterator[bytes]:
+    """A JSON array of {field: value} objects"""
+    yield b'['
+    batch, first = [], True
+    for row in _rows(queryset, fields):
+        batch.append(dict(zip(fields, row)))
+        if len(batch) == BATCH_SIZE:
+            yield (b'' if first else b',') + _encode(batch)[1:-1]
+            batch, first = [], False
+    if batch:
+        yield (b'' if first else b',') + _encode(batch)[1:-1]
+    yield b']'
+
+
+def stream_projection_columns(queryset, fields: Sequence[str]) -> Iterator[bytes]:
+    """{"count": n, "fields": [...], "columns": {field: [values...]}}"""
+    columns = [[] for _ in fields]
+    for row in _rows(queryset, fields):
+        for column, value in zip(columns, row):
+            column.append(value)
+
+    yield b'{"count":' + _encode(len(columns[0]) if columns else 0) + b',"fields":' + _encode(list(fields))
+    yield b',"columns":{'
+    for index, (field, column) in enumerate(zip(fields, columns)):
+        yield (b',' if index else b'') + _encode(field) + b':' + _encode(column)
+        columns[index] = None
+    yield b'}}'
@@ -0,0 +1,109 @@
+"""
+Effective salary snapshot
+An employee's monthly salary comes from their own salary_components JSON when set, else
+their salary grade, else the whole gross salary as basic. The resolved amounts are stored
+on Employee (effective_* columns) so they can be filtered, sorted and summed in SQL.
+"""
+
+from decimal import Decimal, ROUND_HALF_UP
+from typing import Any, Dict, Optional
+
+CENT = Decimal('0.01')
+
+# (component, salary_components key, SalaryGrade field)
+SALARY_COMPONENTS = [
+    ('basic_salary', 'basicSalary', 'basic_salary'),
+    ('house_rent', 'houseRent', 'house_rent'),
+    ('medical_allowance', 'medicalAllowance', 'medical_allowance'),
+    ('conveyance', 'conveyance', 'conveyance'),
+    ('food_allowance', 'foodAllowance', 'food_allowance'),
+    ('mobile_bill', 'mobileBill', 'mobile_bill'),
+]
+
+# Employee columns holding the snapshot
+SALARY_SNAPSHOT_FIELDS = tuple(
+    f'effective_{component}' for component, _, _ in SALARY_COMPONENTS
+) + ('effective_gross_salary', 'salary_source')
+
+# Employee fields the snapshot is derived from
+SALARY_SOURCE_FIELDS = ('salary_components', 'salary_grade', 'salary_grade_id', 'gross_salary')
+
+
+def _decimal(value) -> Decimal:
+    if value in (None, ''):
+        return Decimal('0')
+    try:
+        return Decimal(str(value))
+    except ArithmeticError:
+        return Decimal('0')
+
+
+def resolve_salary_components(salary_components: Optional[Dict[str, Any]], grade: Optional[Dict[str, Any]],
+                              gross_salary) -> Dict[str, Any]:
+    """Monthly components, their gross and where they came from ('components', 'grade' or 'gross')"""
+    if salary_components:
+        source = 'components'
+        resolved = {}
+        for component, key, _ in SALARY_COMPONENTS:
+            data = salary_components.get(key)
+            enabled = isinstance(data, dict) and data.get('enabled', False)
+            resolved[component] = _decimal(data.get('amount')) if enabled else Decimal('0')
+    elif grade:
+        source = 'grade'
+        resolved = {component: _decimal(grade[grade_field]) for component, _, grade_field in SALARY_COMPONENTS}
+    else:
+        source = 'gross'
+        resolved = {component: Decimal('0') for component, _, _ in SALARY_COMPONENTS}
+        resolved['basic_salary'] = _decimal(gross_salary)
+
+    resolved = {component: amount.quantize(CENT, rounding=ROUND_HALF_UP) for component, amount in resolved.items()}
+    resolved['gross_salary'] = sum(resolved.values(), Decimal('0'))
+    resolved['source'] = source
+    return resolved
+
+
+def salary_snapshot(salary_components, grade, gross_salary) -> Dict[str, Any]:
+    """Snapshot column values for an employee"""
+    resolved = resolve_salary_components(salary_components, grade, gross_salary)
+    snapshot = {f'effective_{component}': resolved[component] for component, _, _ in SALARY_COMPONENTS}
+    snapshot['effective_gross_salary'] = resolved['gross_salary']
+    snapshot['salary_source'] = resolved['source']
+    return snapshot
+
+
+def grade_values(grade) -> Optional[Dict[str, Any]]:
+    if grade is None:
+        return None
+    return {grade_field: getattr(grade, grade_field) for _, _, grade_field in SALARY_COMPONENTS}
+
+
+def refresh_salary_snapshots(employees, batch_size: int = 1000) -> int:
+    """
+    Recompute the snapshot for an Employee queryset in pk-ordered chunks, writing only
+    rows whose snapshot changed. Returns the number of employees updated.
+    """
+    from django.utils import timezone
+    from .models import Employee, SalaryGrade
+
+    grades = {
+        row['id']: row for row in SalaryGrade.objects.values('id', *(field for _, _, field in SALARY_COMPONENTS))
+    }
+    updated, last_pk = 0, 0
+    while True:
+        rows = list(
+            employees.filter(pk__gt=last_pk).order_by('pk')
+            .values('id', 'salary_components', 'salary_grade_id', 'gross_salary', *SALARY_SNAPSHOT_FIELDS)[:batch_size]
+        )
+        if not rows:
+            return updated
+        last_pk = rows[-1]['id']
+
+        now = timezone.now()
+        changed = []
+        for row in rows:
+            snapshot = salary_snapshot(row['salary_components'], grades.get(row['salary_grade_id']), row['gross_salary'])
+            if any(row[field] != value for field, value in snapshot.items()):
+                changed.append(Employee(id=row['id'], updated_at=now, **snapshot))
+        if changed:
+            Employee.objects.bulk_update(changed, [*SALARY_SNAPSHOT_FIELDS, 'updated_at'])
+            updated += len(changed)
@@ -0,0 +1,154 @@
+"""
+Employee search index
+Every searchable value of an employee (ID, English and Bangla names, email, phone,
+department, designation) is split into lowercase tokens stored in
+EmployeeSearchToken. A search term matches tokens by prefix with a range lookup on
+the token index - works the same on SQLite and PostgreSQL and never scans
+employees_employee. Results are ranked by the weight of the fields that matched.
+"""
+
+import re
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Max, OuterRef, Q, QuerySet, Subquery, Value, When
+
+# (Employee values() path, token field, weight)
+SEARCH_FIELDS = [
+    ('employee_id', 'employee_id', 10),
+    ('name_english', 'name', 8),
+    ('name_bangla', 'name', 8),
+    ('user__first_name', 'name', 8),
+    ('user__last_name', 'name', 8),
+    ('user__email', 'email', 6),
+    ('user__phone', 'phone', 6),
+    ('department__name', 'department', 3),
+    ('designation__name', 'designation', 3),
+]
+
+TOKEN_MAX_LENGTH = 100
+
+# Anything that is neither a word character nor Bangla script separates tokens
+# (Bangla vowel signs are combining marks, which \w alone would split on)
+_SPLIT = re.compile(r'[^\w\u0980-\u09ff]+|_')
+_ALNUM_BOUNDARY = re.compile(r'\d+|[^\d]+')
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    if not text:
+        return []
+    return [token[:TOKEN_MAX_LENGTH] for token in _SPLIT.split(str(text).casefold()) if token]
+
+
+def value_tokens(value: Optional[str], field: str) -> Set[str]:
+    """Tokens for one value; IDs, emails and phones also index the forms people type"""
+    if not value:
+        return set()
+    tokens = set(tokenize(value))
+    if field == 'employee_id':
+        # EMP0042 -> emp0042, emp, 0042, 42
+        for token in list(tokens):
+            for part in _ALNUM_BOUNDARY.findall(token):
+                tokens.add(part)
+                if part.isdigit() and part.lstrip('0'):
+                    tokens.add(part.lstrip('0'))
+    elif field == 'email':
+        tokens.add(str(value).casefold()[:TOKEN_MAX_LENGTH])
+    elif field == 'phone':
+        digits = re.sub(r'\D', '', str(value))
+        if digits:
+            tokens = {digits}
+            # +8801712345678 is typed as 01712345678 as often as not
+            if len(digits) > 11:
+                tokens.add(digits[-11:])
+    return tokens
+
+
+def employee_tokens(row: Dict[str, Any]) -> Dict[Tuple[str, str], int]:
+    """(token, field) -> weight for one employee values() row"""
+    tokens = {}
+    for path, field, weight in SEARCH_FIELDS:
+        for token in value_tokens(row.get(path), field):
+            tokens[(token, field)] = max(weight, tokens.get((token, field), 0))
+    return tokens
+
+
+def reindex_employees(employee_pks: Optional[Iterable[int]] = None, batch_size: int = 500) -> int:
+    """
+    Rebuild the tokens of the given employees (all of them when None) in pk-ordered
+    batches. Returns the number of employees indexed.
+    """
+    from .models import Employee, EmployeeSearchToken
+
+    employees = Employee.objects.all()
+    if employee_pks is not None:
+        employees = employees.filter(pk__in=list(employee_pks))
+
+    indexed, last_pk = 0, 0
+    while True:
+        rows = list(
+            employees.filter(pk__gt=last_pk).order_by('pk')
+            .values('id', *(path for path, _, _ in SEARCH_FIELDS))[:batch_size]
+        )
+        if not rows:
+            return indexed
+        last_pk = rows[-1]['id']
+
+        with transaction.atomic():
+            EmployeeSearchToken.objects.filter(employee_id__in=[row['id'] for row in rows]).delete()
+            EmployeeSearchToken.objects.bulk_create([
+                EmployeeSearchToken(employee_id=row['id'], token=token, field=field, weight=weight)
+                for row in rows
+                for (token, field), weight in employee_tokens(row).items()
+            ], batch_size=1000)
+        indexed += len(rows)
+
+
+def _prefix(term: str) -> Q:
+    # A range instead of LIKE 'term%' - SQLite only uses an index for LIKE under
+    # case-sensitive collation, a range works everywhere
+    return Q(token__gte=term, token__lt=term + '\U0010ffff')
+
+
+def search_matches(query: str) -> Optional[QuerySet]:
+    """
+    (employee_id, rank) rows of the employees matching every term of the query, or
+    None for a query with no terms
+    """
+    from .models import EmployeeSearchToken
+
+    terms = list(dict.fromkeys(tokenize(query)))[:8]
+    if not terms:
+        return None
+
+    any_term = Q()
+    per_term = {}
+    for index, term in enumerate(terms):
+        any_term |= _prefix(term)
+        # Best field the term hit; a whole-token match counts double
+        per_term[f'term_{index}'] = Max(Case(
+            When(token=term, then=F('weight') * 2),
+            When(_prefix(term), then=F('weight')),
+            default=Value(0),
+            output_field=IntegerField()
+        ))
+
+    rank = F('term_0')
+    for name in list(per_term)[1:]:
+        rank = rank + F(name)
+    return (
+        EmployeeSearchToken.objects.filter(any_term)
+        .values('employee_id').annotate(**per_term).order_by()
+        .filter(**{f'{name}__gt': 0 for name in per_term})
+        .annotate(rank=rank)
+    )
+
+
+def search_employees(queryset: QuerySet, query: str) -> QuerySet:
+    """Narrow an Employee queryset to the query's matches, annotated with search_rank"""
+    matches = search_matches(query)
+    if matches is None:
+        return queryset
+    return queryset.filter(pk__in=matches.values('employee_id')).annotate(
+        search_rank=Subquery(matches.filter(employee_id=OuterRef('pk')).values('rank')[:1])
+    )
@@ -1,9 +1,15 @@
 # employees/serializers.py
 
 from rest_framework import serializers
+from django.utils import timezone
 from django.contrib.auth import get_user_model
 from django.contrib.auth.password_validation import validate_password
-from .models import Employee, Department, Designation, SalaryGrade, SkillMetric, ProcessExpertise, Operation, Machine
+from .models import (
+    Employee, Department, Designation, SalaryGrade, SalaryGradeRevision, SkillMetric, ProcessExpertise, Operation, Machine,
+    EmployeeProcessExpertise
+)
+from .salary import SALARY_SNAPSHOT_FIELDS
+from .fieldsets import SparseFieldsetMixin
 import secrets
 import string
 
@@ -11,29 +17,38 @@ User = get_user_model()
 
 # ===== ORGANIZATIONAL DATA SERIALIZERS =====
 
-class DepartmentSerializer(serializers.ModelSerializer):
+class EmployeeCountMixin:
+    """employee_count / active_employee_count from stats.with_employee_counts annotations"""
+    
+    def get_employee_count(self, obj):
+        if hasattr(obj, 'employee_total'):
+            return obj.employee_total
+        return obj.employees.count()
+    
+    def get_active_employee_count(self, obj):
+        if hasattr(obj, 'employee_active'):
+            return obj.employee_active
+        return obj.employees.filter(status='active').count()
+
+class DepartmentSerializer(EmployeeCountMixin, serializers.ModelSerializer):
     head_name = serializers.CharField(source='head.full_name', read_only=True)
     employee_count = serializers.SerializerMethodField()
+    active_employee_count = serializers.SerializerMethodField()
     
     class Meta:
         model = Department
-        fields = ['id', 'name', 'description', 'head', 'head_name', 'is_active', 'employee_count', 'created_at', 'updated_at']
-        read_only_fields = ['created_at', 'updated_at', 'employee_count']
-    
-    def get_employee_count(self, obj):
-        return obj.employees.count()
+        fields = ['id', 'name', 'description', 'head', 'head_name', 'is_active', 'employee_count', 'active_employee_count', 'created_at', 'updated_at']
+        read_only_fields = ['created_at', 'updated_at', 'employee_count', 'active_employee_count']
 
-class DesignationSerializer(serializers.ModelSerializer):
+class DesignationSerializer(EmployeeCountMixin, serializers.ModelSerializer):
     department_name = serializers.CharField(source='department.name', read_only=True)
     employee_count = serializers.SerializerMethodField()
+    active_employee_count = serializers.SerializerMethodField()
     
     class Meta:
         model = Designation
-        fields = ['id', 'name', 'department', 'department_name', 'level', 'description', 'is_active', 'employee_count', 'created_at', 'updated_at']
-        read_only_fields = ['created_at', 'updated_at', 'employee_count']
-    
-    def get_employee_count(self, obj):
-        return obj.employees.count()
+        fields = ['id', 'name', 'department', 'department_name', 'level', 'description', 'is_active', 'employee_count', 'active_employee_count', 'created_at', 'updated_at']
+        read_only_fields = ['created_at', 'updated_at', 'employee_count', 'active_employee_count']
 
 class SalaryGradeSerializer(serializers.ModelSerializer):
     calculated_gross = serializers.SerializerMethodField()
@@ -48,6 +63,29 @@ class SalaryGradeSerializer(serializers.ModelSerializer):
     def get_calculated_gross(self, obj):
         return obj.calculate_gross_salary()
 
+class SalaryGradeRevisionSerializer(serializers.ModelSerializer):
+    salary_grade_name = serializers.CharField(source='salary_grade.name', read_only=True)
+    status_display = serializers.CharField(source='get_status_display', read_only=True)
+    created_by_name = serializers.CharField(source='created_by.full_name', read_only=True)
+    
+    class Meta:
+        model = SalaryGradeRevision
+        fields = ['id', 'salary_grade', 'salary_grade_name', 'effective_date', 'basic_salary', 'house_rent',
+                 'medical_allowance', 'conveyance', 'food_allowance', 'mobile_bill', 'gross_salary',
+                 'previous_values', 'status', 'status_display', 'total_employees', 'processed_employees',
+                 'updated_employees', 'error_message', 'notes', 'created_by', 'created_by_name',
+                 'started_at', 'heartbeat_at', 'completed_at', 'created_at', 'updated_at']
+        read_only_fields = ['gross_salary', 'previous_values', 'status', 'total_employees', 'processed_employees',
+                           'updated_employees', 'error_message', 'created_by', 'started_at', 'heartbeat_at',
+                           'completed_at', 'created_at', 'updated_at']
+    
+    def create(self, validated_data):
+        revision = SalaryGradeRevision(**validated_data)
+        revision.gross_salary = revision.calculate_gross_salary()
+        revision.status = 'scheduled' if revision.effective_date > timezone.localdate() else 'pending'
+        revision.save()
+        return revision
+
 class SkillMetricSerializer(serializers.ModelSerializer):
     class Meta:
         model = SkillMetric
@@ -74,7 +112,58 @@ class ProcessExpertiseSerializer(serializers.ModelSerializer):
 
 # ===== EMPLOYEE SERIALIZERS =====
 
-class EmployeeListSerializer(serializers.ModelSerializer):
+# Nested forms of employee relations for ?expand=
+class DepartmentBriefSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Department
+        fields = ['id', 'name']
+
+class DesignationBriefSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Designation
+        fields = ['id', 'name', 'level']
+
+class SalaryGradeBriefSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = SalaryGrade
+        fields = ['id', 'name', 'grade_type', 'gross_salary']
+
+class ReportingManagerBriefSerializer(serializers.ModelSerializer):
+    full_name = serializers.CharField(source='user.full_name', read_only=True)
+    
+    class Meta:
+        model = Employee
+        fields = ['id', 'employee_id', 'full_name']
+
+class EmployeeProcessExpertiseSerializer(serializers.ModelSerializer):
+    operation_name = serializers.SerializerMethodField()
+    machine_name = serializers.SerializerMethodField()
+    
+    class Meta:
+        model = EmployeeProcessExpertise
+        fields = ['id', 'operation', 'operation_name', 'machine', 'machine_name', 'duration']
+    
+    def get_operation_name(self, obj):
+        return obj.operation.name if obj.operation else obj.operation_name or None
+    
+    def get_machine_name(self, obj):
+        return obj.machine.name if obj.machine else obj.machine_name or None
+
+EMPLOYEE_EXPANDABLE_FIELDS = {
+    # name: (field factory, select_related paths, prefetch_related paths)
+    'department': (lambda: DepartmentBriefSerializer(read_only=True), ['department__name'], []),
+    'designation': (lambda: DesignationBriefSerializer(read_only=True), ['designation__name'], []),
+    'salary_grade': (lambda: SalaryGradeBriefSerializer(read_only=True), ['salary_grade__name'], []),
+    'reporting_manager': (
+        lambda: ReportingManagerBriefSerializer(read_only=True), ['reporting_manager__user__first_name'], []
+    ),
+    'process_expertise_entries': (
+        lambda: EmployeeProcessExpertiseSerializer(many=True, read_only=True), [],
+        ['process_expertise_entries__operation', 'process_expertise_entries__machine']
+    ),
+}
+
+class EmployeeListSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """Serializer for employee list view (minimal data)"""
     full_name = serializers.CharField(source='user.full_name', read_only=True)
     email = serializers.CharField(source='user.email', read_only=True)
@@ -93,11 +182,14 @@ class EmployeeListSerializer(serializers.ModelSerializer):
             'id', 'employee_id', 'full_name', 'email', 'phone',
             'department', 'department_name', 'designation', 'designation_name',
             'level_of_work', 'gender', 'status', 'date_of_joining',
-            'salary_grade', 'salary_grade_name', 'gross_salary',
+            'salary_grade', 'salary_grade_name', 'gross_salary', 'effective_gross_salary', 'salary_source',
             'reporting_manager', 'reporting_manager_name', 'process_expertise',
             'created_at'
         ]
-        read_only_fields = ['created_at']
+        read_only_fields = ['created_at', 'effective_gross_salary', 'salary_source']
+    
+    expandable_fields = EMPLOYEE_EXPANDABLE_FIELDS
+    field_dependencies = {'process_expertise': ['process_expertise']}
     
     def get_process_expertise(self, obj):
         """Get process expertise with operation and machine names"""
@@ -120,7 +212,7 @@ class EmployeeListSerializer(serializers.ModelSerializer):
             })
         return expertise_list
 
-class EmployeeDetailSerializer(serializers.ModelSerializer):
+class EmployeeDetailSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """Serializer for employee detail view (complete data)"""
     # User fields
     first_name = serializers.CharField(source='user.first_name')
@@ -182,10 +274,20 @@ class EmployeeDetailSerializer(serializers.ModelSerializer):
             # Salary Components
             'salary_components', 'total_salary_components',
             
+            # Effective Salary Snapshot
+            *SALARY_SNAPSHOT_FIELDS,
+            
             # Generated Credentials
             'generated_email', 'generated_password'
         ]
-        read_only_fields = ['created_at', 'updated_at', 'role', 'total_salary_components', 'generated_email', 'generated_password']
+        read_only_fields = [
+            'created_at', 'updated_at', 'role', 'total_salary_components', *SALARY_SNAPSHOT_FIELDS,
+            'generated_email', 'generated_password'
+        ]
+    
+    expandable_fields = EMPLOYEE_EXPANDABLE_FIELDS
+    # Read from the effective salary snapshot columns
+    field_dependencies = {'total_salary_components': list(SALARY_SNAPSHOT_FIELDS)}
     
     def get_total_salary_components(self, obj):
         return obj.get_total_salary_components()
@@ -0,0 +1,100 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete, pre_save
+from django.dispatch import Signal, receiver
+
+from .models import (
+    Employee, Department, Designation, Operation, Machine, SalaryGrade, SkillMetric, ProcessExpertise
+)
+from .expertise import sync_process_expertise, link_expertise_names
+from .search import reindex_employees
+from .organizational_data import invalidate_organizational_data
+from .stats import invalidate_employee_stats
+
+User = get_user_model()
+
+# Sent by the salary grade revision job after each chunk, which bypasses Employee.save.
+# revision: the SalaryGradeRevision, employee_pks: employees whose salary changed.
+salary_grade_revised = Signal()
+
+
+# Model fields the search tokens are built from (see search.SEARCH_FIELDS)
+EMPLOYEE_SEARCH_FIELDS = {'employee_id', 'name_english', 'name_bangla', 'department', 'designation'}
+USER_SEARCH_FIELDS = {'first_name', 'last_name', 'email', 'phone'}
+
+
+@receiver(post_save, sender=Employee)
+def employee_saved(sender, instance, raw=False, update_fields=None, **kwargs):
+    """Keep the employee's search tokens in step with their record"""
+    if raw or (update_fields is not None and not EMPLOYEE_SEARCH_FIELDS & set(update_fields)):
+        return
+    reindex_employees([instance.pk])
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    """Names, email and phone live on the user - logins only touch last_login"""
+    if raw or created or (update_fields is not None and not USER_SEARCH_FIELDS & set(update_fields)):
+        return
+    reindex_employees(Employee.objects.filter(user=instance).values_list('pk', flat=True))
+
+
+@receiver(pre_save, sender=Department)
+@receiver(pre_save, sender=Designation)
+def organization_saving(sender, instance, raw=False, update_fields=None, **kwargs):
+    """Remember the stored name so post_save can tell a rename from any other edit"""
+    instance._stored_name = None
+    if raw or instance.pk is None or (update_fields is not None and 'name' not in update_fields):
+        return
+    instance._stored_name = sender.objects.filter(pk=instance.pk).values_list('name', flat=True).first()
+
+
+@receiver(post_save, sender=Department)
+@receiver(post_save, sender=Designation)
+def organization_renamed(sender, instance, created, raw=False, **kwargs):
+    """A renamed department or designation changes the tokens of everyone in it"""
+    stored_name = getattr(instance, '_stored_name', None)
+    if raw or created or stored_name is None or stored_name == instance.name:
+        return
+    lookup = 'department' if sender is Department else 'designation'
+    reindex_employees(Employee.objects.filter(**{lookup: instance}).values_list('pk', flat=True))
+
+
+@receiver(post_save, sender=Employee)
+def employee_expertise_saved(sender, instance, raw=False, update_fields=None, **kwargs):
+    """Dual-write process_expertise into the EmployeeProcessExpertise table"""
+    if raw or (update_fields is not None and 'process_expertise' not in update_fields):
+        return
+    sync_process_expertise([instance.pk])
+
+
+@receiver(post_save, sender=Operation)
+def operation_saved(sender, instance, raw=False, **kwargs):
+    if not raw:
+        link_expertise_names(operation=instance)
+
+
+@receiver(post_save, sender=Machine)
+def machine_saved(sender, instance, raw=False, **kwargs):
+    if not raw:
+        link_expertise_names(machine=instance)
+
+
+@receiver(post_save, sender=Employee)
+@receiver(post_delete, sender=Employee)
+@receiver(post_save, sender=Department)
+@receiver(post_delete, sender=Department)
+@receiver(post_save, sender=Designation)
+@receiver(post_delete, sender=Designation)
+@receiver(post_save, sender=SalaryGrade)
+@receiver(post_delete, sender=SalaryGrade)
+@receiver(post_save, sender=SkillMetric)
+@receiver(post_delete, sender=SkillMetric)
+@receiver(post_save, sender=ProcessExpertise)
+@receiver(post_delete, sender=ProcessExpertise)
+def organization_changed(sender, **kwargs):
+    """Drop the cached dashboard stats and dropdown bundle (which carries employee counts)"""
+    # Only once the change commits - bumped earlier, a concurrent request could cache
+    # the uncommitted state under the new version
+    transaction.on_commit(invalidate_employee_stats)
+    transaction.on_commit(invalidate_organizational_data)
@@ -1,3 +1,447 @@
-from django.test import TestCase
+import json
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from authentication.models import User
+
+from . import grade_revision
+from .grade_revision import apply_due_grade_revisions, apply_grade_revision
+from .models import (
+    Department, Designation, Employee, EmployeeProcessExpertise, Machine, Operation, SalaryGrade, SalaryGradeRevision
+)
+from .search import search_employees
+
+
+def make_user(email, role='employee'):
+    return User.objects.create_user(email=email, password='x', first_name='U', last_name=role, role=role)
+
+
+def client_for(user):
+    client = APIClient()
+    client.force_authenticate(user)
+    return client
+
+
+def make_employee(employee_id, department=None, designation=None, first_name='E', last_name='Employee', **fields):
+    department = department or Department.objects.get_or_create(name='Sewing')[0]
+    designation = designation or Designation.objects.get_or_create(
+        name='Operator', department=department, defaults={'level': 'worker'}
+    )[0]
+    user = User.objects.create_user(
+        email=f'{employee_id.lower()}@example.com', password='x', first_name=first_name, last_name=last_name
+    )
+    fields.setdefault('level_of_work', 'worker')
+    fields.setdefault('gross_salary', 10000)
+    fields.setdefault('off_day', 'Friday')
+    return Employee.objects.create(
+        user=user, employee_id=employee_id, department=department, designation=designation, **fields
+    )
+
+
+@override_settings(SALARY_GRADE_REVISION_BACKGROUND=False)
+class SalaryGradeEditTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.grade = SalaryGrade.objects.create(
+            name='W1', grade_type='worker', basic_salary=8000, house_rent=2000, gross_salary=10000
+        )
+        cls.employees = [make_employee(f'EMP{index:03d}', salary_grade=cls.grade) for index in range(3)]
+
+    def test_edit_refreshes_snapshots_after_commit(self):
+        self.assertEqual(self.employees[0].effective_gross_salary, Decimal('10000'))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.grade.basic_salary = 9000
+            self.grade.save()
+            # Nothing is rewritten inside the saving request's transaction
+            self.assertEqual(Employee.objects.filter(effective_gross_salary=10000).count(), 3)
+
+        self.assertEqual(Employee.objects.filter(effective_gross_salary=11000).count(), 3)
+        self.assertEqual(Employee.objects.filter(effective_basic_salary=9000).count(), 3)
+
+    def test_save_keeps_the_entered_gross_and_skips_unchanged_amounts(self):
+        with mock.patch('employees.grade_revision.start_grade_snapshot_refresh') as refresh:
+            self.grade.name = 'W1-A'
+            self.grade.gross_salary = 10500
+            self.grade.save()
+
+        refresh.assert_not_called()
+        self.grade.refresh_from_db()
+        self.assertEqual(self.grade.gross_salary, Decimal('10500'))
+
+
+class SalaryGradeRevisionWithdrawTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        grade = SalaryGrade.objects.create(name='W1', grade_type='worker', basic_salary=8000, gross_salary=8000)
+        cls.revision = SalaryGradeRevision.objects.create(
+            salary_grade=grade, effective_date='2099-01-01', basic_salary=9000, gross_salary=9000, status='scheduled'
+        )
+        cls.url = reverse('salary_grade_revision_detail', args=[cls.revision.pk])
+
+    def test_employee_cannot_withdraw_a_revision(self):
+        response = client_for(make_user('emp@example.com')).delete(self.url)
+        self.assertEqual(response.status_code, 403)
+        self.assertTrue(SalaryGradeRevision.objects.filter(pk=self.revision.pk).exists())
+
+    def test_hr_can_withdraw_a_scheduled_revision(self):
+        response = client_for(make_user('hr@example.com', 'hr_manager')).delete(self.url)
+        self.assertEqual(response.status_code, 204)
+        self.assertFalse(SalaryGradeRevision.objects.filter(pk=self.revision.pk).exists())
+
+
+@override_settings(SALARY_GRADE_REVISION_BACKGROUND=False, SALARY_GRADE_REVISION_STALE_SECONDS=600)
+class SalaryGradeRevisionResumeTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.grade = SalaryGrade.objects.create(name='W1', grade_type='worker', basic_salary=8000, gross_salary=8000)
+        cls.employees = [make_employee(f'EMP{index:03d}', salary_grade=cls.grade) for index in range(5)]
+
+    def setUp(self):
+        self.revision = SalaryGradeRevision.objects.create(
+            salary_grade=self.grade, effective_date='2026-01-01', basic_salary=9000, gross_salary=9000
+        )
+        self.url = reverse('salary_grade_revision_retry', args=[self.revision.pk])
+        self.hr = client_for(make_user('hr@example.com', 'hr_manager'))
+
+    def interrupt_after_first_chunk(self):
+        """Apply one chunk, then die the way a killed worker thread does - no 'failed' is recorded"""
+        apply_chunk = grade_revision._apply_chunk
+        calls = []
+
+        def dying_apply_chunk(*args):
+            if calls:
+                raise SystemExit
+            calls.append(args)
+            apply_chunk(*args)
+
+        with mock.patch('employees.grade_revision._apply_chunk', dying_apply_chunk):
+            with self.assertRaises(SystemExit):
+                apply_grade_revision(self.revision, chunk_size=2)
+        self.revision.refresh_from_db()
+
+    def go_stale(self):
+        SalaryGradeRevision.objects.filter(pk=self.revision.pk).update(
+            heartbeat_at=self.revision.heartbeat_at - timedelta(minutes=11)
+        )
+
+    def test_live_claim_is_left_alone(self):
+        self.interrupt_after_first_chunk()
+        self.assertEqual(self.revision.status, 'processing')
+        self.assertEqual(self.revision.processed_employees, 2)
+
+        self.assertEqual(apply_due_grade_revisions(retry_failed=True), [])
+        self.assertEqual(self.hr.post(self.url).status_code, 400)
+        apply_grade_revision(self.revision)
+        self.assertEqual(self.revision.processed_employees, 2)
+
+    def test_retry_resumes_a_stalled_revision(self):
+        self.interrupt_after_first_chunk()
+        self.go_stale()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.hr.post(self.url)
+
+        self.assertEqual(response.status_code, 202)
+        self.revision.refresh_from_db()
+        self.assertEqual(self.revision.status, 'completed')
+        self.assertEqual(self.revision.processed_employees, 5)
+        self.assertEqual(self.revision.updated_employees, 5)
+        self.assertEqual(Employee.objects.filter(salary_grade=self.grade, effective_basic_salary=9000).count(), 5)
+
+    def test_daily_command_takes_over_a_stalled_revision(self):
+        self.interrupt_after_first_chunk()
+        self.go_stale()
+
+        [revision] = apply_due_grade_revisions()
+
+        self.assertEqual(revision.status, 'completed')
+        self.assertEqual(revision.processed_employees, 5)
+        self.assertEqual(revision.previous_values['basic_salary'], '8000.00')
+
+
+class CursorPaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.hr = make_user('hr@example.com', 'hr_manager')
+        for index in range(8):
+            make_employee(f'EMP{index:03d}', level_of_work='staff' if index == 7 else 'worker')
+        # Ties on created_at fall back to the pk
+        Employee.objects.filter(employee_id__in=['EMP002', 'EMP003', 'EMP004']).update(
+            created_at=datetime(2026, 1, 1, tzinfo=timezone.utc)
+        )
+        cls.url = reverse('employee_list')
+
+    def walk(self, client, response, direction):
+        pages = [response.data['results']]
+        while response.data[direction]:
+            response = client.get(self.url + response.data[direction])
+            self.assertEqual(response.status_code, 200)
+            pages.append(response.data['results'])
+        return pages
+
+    def employee_ids(self, pages):
+        return [row['employee_id'] for page in pages for row in page]
+
+    def test_next_and_previous_round_trip(self):
+        client = client_for(self.hr)
+        for ordering in ('-created_at', 'created_at', 'employee_id', '-employee_id'):
+            expected = list(
+                Employee.objects.order_by(ordering, 'pk' if not ordering.startswith('-') else '-pk')
+                .values_list('employee_id', flat=True)
+            )
+            response = client.get(self.url, {'pagination': 'cursor', 'ordering': ordering, 'page_size': 3})
+            forward = self.walk(client, response, 'next')
+            self.assertEqual(self.employee_ids(forward), expected, ordering)
+            self.assertEqual([len(page) for page in forward], [3, 3, 2])
+
+            last = client.get(self.url + response.data['next'])
+            last = client.get(self.url + last.data['next'])
+            backward = self.walk(client, last, 'previous')
+            self.assertEqual(self.employee_ids(reversed(backward)), expected, ordering)
+
+    def test_links_keep_filters(self):
+        client = client_for(self.hr)
+        response = client.get(self.url, {'pagination': 'cursor', 'level_of_work': 'worker', 'page_size': 4})
+        self.assertIn('level_of_work=worker', response.data['next'])
+        pages = self.walk(client, response, 'next')
+        self.assertEqual(len(self.employee_ids(pages)), 7)
+
+    def test_invalid_cursor_is_rejected(self):
+        response = client_for(self.hr).get(self.url, {'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, 400)
+
+
+class EmployeeSearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.karim = make_employee('EMP042', first_name='Karim', last_name='Hossain')
+        cls.karimullah = make_employee('EMP043', first_name='Rahim', last_name='Karimullah')
+        unit = Department.objects.create(name='Karim Unit')
+        cls.in_unit = make_employee('EMP044', department=unit, first_name='Salma', last_name='Begum')
+        cls.other = make_employee('EMP045', first_name='Nasir', last_name='Ahmed')
+
+    def search(self, query):
+        return list(
+            search_employees(Employee.objects.all(), query)
+            .order_by('-search_rank', 'employee_id').values_list('employee_id', flat=True)
+        )
+
+    def test_whole_token_outranks_prefix_and_weaker_fields(self):
+        # Name (exact) > name (prefix) > department (exact)
+        self.assertEqual(self.search('karim'), ['EMP042', 'EMP043', 'EMP044'])
+
+    def test_terms_match_by_prefix_and_all_must_match(self):
+        self.assertEqual(self.search('KAR hoss'), ['EMP042'])
+        self.assertEqual(self.search('sal beg'), ['EMP044'])
+        self.assertEqual(self.search('karim nasir'), [])
+
+    def test_employee_id_matches_with_or_without_prefix_and_zeros(self):
+        self.assertEqual(self.search('emp045'), ['EMP045'])
+        self.assertEqual(self.search('45'), ['EMP045'])
+        self.assertEqual(self.search('emp04'), ['EMP042', 'EMP043', 'EMP044', 'EMP045'])
+
+    def test_list_endpoint_orders_by_rank(self):
+        response = client_for(make_user('hr@example.com', 'hr_manager')).get(
+            reverse('employee_list'), {'search': 'karim'}
+        )
+        self.assertEqual([row['employee_id'] for row in response.data['results']], ['EMP042', 'EMP043', 'EMP044'])
+
+    def test_login_does_not_reindex(self):
+        user = self.other.user
+        with mock.patch('employees.signals.reindex_employees') as reindex:
+            user.save(update_fields=['last_login'])
+            reindex.assert_not_called()
+
+            user.last_name = 'Chowdhury'
+            user.save(update_fields=['last_name'])
+            reindex.assert_called_once()
+
+    def test_only_a_rename_reindexes_the_department(self):
+        unit = self.in_unit.department
+        with mock.patch('employees.signals.reindex_employees') as reindex:
+            unit.description = 'Second floor'
+            unit.save()
+            reindex.assert_not_called()
+
+        unit.name = 'Finishing'
+        unit.save()
+        self.assertEqual(self.search('finishing'), ['EMP044'])
+        self.assertEqual(self.search('karim'), ['EMP042', 'EMP043'])
+
+
+class ProcessExpertiseTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.hr = make_user('hr@example.com', 'hr_manager')
+        cls.overlock = Machine.objects.create(name='Overlock')
+        cls.employee = make_employee('EMP001', process_expertise=[
+            {'operation': 'Side seam', 'machine': 'Overlock', 'duration': '2 years'},
+            {'operation': ' rr ', 'machine': '', 'duration': ''},
+            {'operation': '', 'machine': ''},
+        ])
+        make_employee('EMP002', process_expertise=[{'operation': 'Hemming', 'machine': 'Flatlock'}])
+
+    def entries(self, employee):
+        return list(employee.process_expertise_entries.order_by('position').values_list(
+            'operation_name', 'machine_name', 'machine_id', 'duration'
+        ))
+
+    def test_json_is_mirrored_into_rows(self):
+        self.assertEqual(self.entries(self.employee), [
+            ('Side seam', 'Overlock', self.overlock.pk, '2 years'),
+            ('rr', '', None, ''),
+        ])
+
+        self.employee.process_expertise = [{'operation': 'Hemming', 'machine': 'Overlock'}]
+        self.employee.save()
+        self.assertEqual(self.entries(self.employee), [('Hemming', 'Overlock', self.overlock.pk, '')])
+
+        with mock.patch('employees.signals.sync_process_expertise') as sync:
+            self.employee.save(update_fields=['status'])
+        sync.assert_not_called()
+
+    def test_new_operation_links_existing_entries(self):
+        operation = Operation.objects.create(name='rr')
+        self.assertEqual(EmployeeProcessExpertise.objects.get(operation_name='rr').operation, operation)
+
+    def test_filters_match_names_without_operation_or_machine_rows(self):
+        client = client_for(self.hr)
+        response = client.get(reverse('employee_list'), {'process_expertise': 'rr'})
+        self.assertEqual([row['employee_id'] for row in response.data['results']], ['EMP001'])
+        response = client.get(reverse('employee_list'), {'machine': 'Flatlock'})
+        self.assertEqual([row['employee_id'] for row in response.data['results']], ['EMP002'])
+
+        response = client.get(reverse('employees_by_expertise'), {'operation': 'rr'})
+        self.assertEqual([(row['employee_id'], row['operation']) for row in response.data], [('EMP001', 'rr')])
+        response = client.get(reverse('employees_by_expertise'), {'machine': self.overlock.pk})
+        self.assertEqual([(row['employee_id'], row['operation']) for row in response.data], [('EMP001', 'Side seam')])
+
+
+class OrganizationalDataTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = make_user('emp@example.com')
+        make_employee('EMP001')
+        cls.url = reverse('organizational_data')
+
+    def setUp(self):
+        cache.clear()
+        self.client = client_for(self.user)
+
+    def department_names(self, response):
+        return [department['name'] for department in json.loads(response.content)['departments']]
+
+    def test_unchanged_bundle_is_a_304_without_queries(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_change_invalidates_the_bundle_once_committed(self):
+        etag = self.client.get(self.url)['ETag']
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Department.objects.create(name='Cutting')
+            # Not yet committed: other requests keep the old version
+            self.assertEqual(self.client.get(self.url)['ETag'], etag)
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(sorted(self.department_names(response)), ['Cutting', 'Sewing'])
+
+
+class EmployeeStatsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.hr = make_user('hr@example.com', 'hr_manager')
+        cutting = Department.objects.create(name='Cutting')
+        make_employee('EMP001')
+        make_employee('EMP002', level_of_work='staff', status='on_leave')
+        make_employee('EMP003', department=cutting)
+        cls.url = reverse('employee_stats')
+
+    def setUp(self):
+        cache.clear()
+        self.client = client_for(self.hr)
+
+    def test_counts(self):
+        stats = self.client.get(self.url).data
+        self.assertEqual(
+            (stats['total_employees'], stats['active_employees'], stats['on_leave_employees']), (3, 2, 1)
+        )
+        self.assertEqual((stats['workers'], stats['staff']), (2, 1))
+        self.assertEqual(
+            {row['name']: (row['total_employees'], row['active_employees']) for row in stats['department_breakdown']},
+            {'Cutting': (1, 1), 'Sewing': (2, 1)}
+        )
+
+    def test_cached_until_a_change_commits(self):
+        self.client.get(self.url)
+        with self.assertNumQueries(0):
+            self.client.get(self.url)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Employee.objects.get(employee_id='EMP002').delete()
+            self.assertEqual(self.client.get(self.url).data['total_employees'], 3)
+
+        self.assertEqual(self.client.get(self.url).data['total_employees'], 2)
+
+
+class SparseFieldsetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.hr = make_user('hr@example.com', 'hr_manager')
+        cls.employee = make_employee('EMP001', process_expertise=[{'operation': 'Hemming', 'machine': 'Overlock'}])
+        cls.url = reverse('employee_list')
+
+    def setUp(self):
+        self.client = client_for(self.hr)
+
+    def list_queries(self, params):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200)
+        return response, [query['sql'] for query in queries]
+
+    def test_unknown_names_are_a_400(self):
+        for params in ({'fields': 'employee_id,salary'}, {'exclude': 'nope'}, {'expand': 'user'}):
+            response = self.client.get(self.url, params)
+            self.assertEqual(response.status_code, 400, params)
+        response = self.client.get(reverse('employee_detail', args=[self.employee.pk]), {'expand': 'salary'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_fields_and_expand_shape_the_response(self):
+        response = self.client.get(self.url, {'fields': 'employee_id', 'expand': 'department'})
+        row = response.data['results'][0]
+        self.assertEqual(set(row), {'employee_id', 'department'})
+        self.assertEqual(row['department']['name'], 'Sewing')
+
+        response = self.client.get(self.url, {'exclude': 'process_expertise'})
+        self.assertNotIn('process_expertise', response.data['results'][0])
+
+    def test_query_count_does_not_grow_with_rows(self):
+        params = {'fields': 'employee_id,department', 'expand': 'department,process_expertise_entries,reporting_manager'}
+        _, few = self.list_queries(params)
+        for index in range(2, 7):
+            make_employee(f'EMP{index:03d}', reporting_manager=self.employee,
+                          process_expertise=[{'operation': 'Side seam', 'machine': 'Flatlock'}])
+        response, many = self.list_queries(params)
+
+        self.assertEqual(len(response.data['results']), 6)
+        self.assertEqual(len(many), len(few))
+
+    def test_unrequested_heavy_columns_are_deferred(self):
+        _, queries = self.list_queries({'fields': 'employee_id'})
+        employee_query = next(sql for sql in queries if 'FROM "employees_employee"' in sql and 'LIMIT' in sql)
+        self.assertNotIn('"picture"', employee_query)
+        self.assertNotIn('"process_expertise"', employee_query)
@@ -16,6 +16,9 @@ urlpatterns = [
     # Salary Grades
     path('salary-grades/', views.SalaryGradeListCreateView.as_view(), name='salary_grade_list'),
     path('salary-grades/<int:pk>/', views.SalaryGradeDetailView.as_view(), name='salary_grade_detail'),
+    path('salary-grade-revisions/', views.SalaryGradeRevisionListCreateView.as_view(), name='salary_grade_revision_list'),
+    path('salary-grade-revisions/<int:pk>/', views.SalaryGradeRevisionDetailView.as_view(), name='salary_grade_revision_detail'),
+    path('salary-grade-revisions/<int:pk>/retry/', views.retry_salary_grade_revision, name='salary_grade_revision_retry'),
     
     # Skill Metrics
     path('skill-metrics/', views.SkillMetricListCreateView.as_view(), name='skill_metric_list'),
@@ -51,6 +54,8 @@ urlpatterns = [
     path('employees/<int:employee_id>/activity/', views.employee_activity_log, name='employee_activity_log'),
     path('employees/department-count/', views.department_employee_count, name='department_employee_count'),
     path('employees/all-for-stats/', views.get_all_employees_for_stats, name='get_all_employees_for_stats'),
+    path('employees/stats-projection/', views.employee_stats_projection, name='employee_stats_projection'),
+    path('employees/by-expertise/', views.employees_by_expertise, name='employees_by_expertise'),
     path('employees/<str:employee_id>/credentials/', views.employee_credentials, name='employee_credentials'),
     
     # ===== ORGANIZATIONAL DATA ENDPOINT =====
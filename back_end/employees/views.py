@@ -1,32 +1,56 @@
 # employees/views.py
 
+from decimal import Decimal, InvalidOperation
+
 from rest_framework import generics, status, filters
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated, IsAdminUser, AllowAny
 from rest_framework.response import Response
+from rest_framework.exceptions import PermissionDenied
 from rest_framework.views import APIView
 from django_filters.rest_framework import DjangoFilterBackend
 from django.db.models import Q
+from django.http import HttpResponse, StreamingHttpResponse
 from django.contrib.auth import get_user_model, authenticate
 from django.contrib.auth.hashers import check_password
 from rest_framework_simplejwt.tokens import RefreshToken
 
-from .models import Employee, Department, Designation, SalaryGrade, SkillMetric, ProcessExpertise, Operation, Machine
+from .models import (
+    Employee, Department, Designation, SalaryGrade, SalaryGradeRevision, SkillMetric, ProcessExpertise, Operation, Machine,
+    EmployeeProcessExpertise
+)
+from .salary import SALARY_SNAPSHOT_FIELDS
+from .grade_revision import is_claimable, start_grade_revision
+from .search import search_employees
+from .organizational_data import organizational_data_bundle
+from .projection import projection_fields, stream_projection_rows, stream_projection_columns
+from .stats import employee_stats as cached_employee_stats, with_employee_counts
+from .fieldsets import sparse_queryset
+from .pagination import KeysetPaginator, InvalidCursor, estimated_count, parse_cursor_datetime, parse_cursor_string
 from .serializers import (
     EmployeeListSerializer, EmployeeDetailSerializer, EmployeeCreateSerializer,
     EmployeeUpdateSerializer, EmployeeSearchSerializer, EmployeeLoginSerializer,
     EmployeeCredentialsSerializer,
-    DepartmentSerializer, DesignationSerializer, SalaryGradeSerializer,
+    DepartmentSerializer, DesignationSerializer, SalaryGradeSerializer, SalaryGradeRevisionSerializer,
     SkillMetricSerializer, ProcessExpertiseSerializer, OperationSerializer, MachineSerializer
 )
 
 User = get_user_model()
 
+# Cursor mode of the employee list: (created_at, id) or (employee_id, id)
+EMPLOYEE_CURSOR_PAGINATOR = KeysetPaginator(
+    orderings={
+        'created_at': ('created_at', parse_cursor_datetime),
+        'employee_id': ('employee_id', parse_cursor_string),
+    },
+    default_ordering='-created_at',
+)
+
 # ===== ORGANIZATIONAL DATA VIEWS =====
 
 class DepartmentListCreateView(generics.ListCreateAPIView):
     """List and create departments"""
-    queryset = Department.objects.all()
+    queryset = with_employee_counts(Department.objects.select_related('head'))
     serializer_class = DepartmentSerializer
     permission_classes = [IsAuthenticated]
     filter_backends = [filters.SearchFilter, filters.OrderingFilter]
@@ -36,13 +60,13 @@ class DepartmentListCreateView(generics.ListCreateAPIView):
 
 class DepartmentDetailView(generics.RetrieveUpdateDestroyAPIView):
     """Retrieve, update, or delete a department"""
-    queryset = Department.objects.all()
+    queryset = with_employee_counts(Department.objects.select_related('head'))
     serializer_class = DepartmentSerializer
     permission_classes = [IsAuthenticated]
 
 class DesignationListCreateView(generics.ListCreateAPIView):
     """List and create designations"""
-    queryset = Designation.objects.select_related('department')
+    queryset = with_employee_counts(Designation.objects.select_related('department'))
     serializer_class = DesignationSerializer
     permission_classes = [IsAuthenticated]
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
@@ -53,7 +77,7 @@ class DesignationListCreateView(generics.ListCreateAPIView):
 
 class DesignationDetailView(generics.RetrieveUpdateDestroyAPIView):
     """Retrieve, update, or delete a designation"""
-    queryset = Designation.objects.select_related('department')
+    queryset = with_employee_counts(Designation.objects.select_related('department'))
     serializer_class = DesignationSerializer
     permission_classes = [IsAuthenticated]
 
@@ -74,6 +98,57 @@ class SalaryGradeDetailView(generics.RetrieveUpdateDestroyAPIView):
     serializer_class = SalaryGradeSerializer
     permission_classes = [IsAuthenticated]
 
+class SalaryGradeRevisionListCreateView(generics.ListCreateAPIView):
+    """List salary grade revisions and schedule new ones"""
+    queryset = SalaryGradeRevision.objects.select_related('salary_grade', 'created_by')
+    serializer_class = SalaryGradeRevisionSerializer
+    permission_classes = [IsAuthenticated]
+    filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
+    filterset_fields = ['salary_grade', 'status']
+    ordering_fields = ['effective_date', 'created_at']
+    ordering = ['-effective_date', '-created_at']
+    
+    def perform_create(self, serializer):
+        if self.request.user.role not in ['hr_staff', 'hr_manager', 'super_admin']:
+            raise PermissionDenied('Only HR can revise salary grades')
+        revision = serializer.save(created_by=self.request.user)
+        # Due revisions start in the background once this request commits
+        start_grade_revision(revision)
+
+class SalaryGradeRevisionDetailView(generics.RetrieveDestroyAPIView):
+    """Retrieve a salary grade revision (for progress), or withdraw one that has not started"""
+    queryset = SalaryGradeRevision.objects.select_related('salary_grade', 'created_by')
+    serializer_class = SalaryGradeRevisionSerializer
+    permission_classes = [IsAuthenticated]
+    
+    def perform_destroy(self, instance):
+        if self.request.user.role not in ['hr_staff', 'hr_manager', 'super_admin']:
+            raise PermissionDenied('Only HR can withdraw salary grade revisions')
+        if instance.status not in ('scheduled', 'pending'):
+            raise PermissionDenied('Only revisions that have not started can be withdrawn')
+        instance.delete()
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def retry_salary_grade_revision(request, pk):
+    """Resume a failed or interrupted salary grade revision in the background"""
+    if request.user.role not in ['hr_staff', 'hr_manager', 'super_admin']:
+        return Response({'error': 'Permission denied'}, status=status.HTTP_403_FORBIDDEN)
+    
+    try:
+        revision = SalaryGradeRevision.objects.get(pk=pk)
+    except SalaryGradeRevision.DoesNotExist:
+        return Response({'error': 'Salary grade revision not found'}, status=status.HTTP_404_NOT_FOUND)
+    
+    if not is_claimable(revision, ('pending', 'failed')):
+        return Response(
+            {'error': 'Only pending, failed or stalled revisions can be retried'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    start_grade_revision(revision)
+    return Response(SalaryGradeRevisionSerializer(revision).data, status=status.HTTP_202_ACCEPTED)
+
 class SkillMetricListCreateView(generics.ListCreateAPIView):
     """List and create skill metrics"""
     queryset = SkillMetric.objects.all()
@@ -167,10 +242,10 @@ class MachineDetailView(generics.RetrieveUpdateDestroyAPIView):
 class EmployeeListCreateView(generics.ListCreateAPIView):
     """List employees and create new employees"""
     permission_classes = [IsAuthenticated]
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    # ?search= goes through the search index in list(), not SearchFilter
+    filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
     filterset_fields = ['department', 'designation', 'status', 'level_of_work', 'gender', 'salary_grade']
-    search_fields = ['employee_id', 'user__first_name', 'user__last_name', 'user__email', 'name_english', 'name_bangla']
-    ordering_fields = ['employee_id', 'date_of_joining', 'user__first_name', 'created_at']
+    ordering_fields = ['employee_id', 'date_of_joining', 'user__first_name', 'created_at', 'effective_gross_salary']
     ordering = ['-created_at']
     pagination_class = None  # We'll add custom pagination
     
@@ -203,16 +278,21 @@ class EmployeeListCreateView(generics.ListCreateAPIView):
         # Role-based filtering
         if self.request.user.role == 'employee':
             # Employees can only see themselves
-            return queryset.filter(user=self.request.user)
+            queryset = queryset.filter(user=self.request.user)
         elif self.request.user.role == 'department_head':
             # Department heads can see their department employees
-            return queryset.filter(department__head=self.request.user)
+            queryset = queryset.filter(department__head=self.request.user)
         elif self.request.user.role in ['hr_staff', 'hr_manager', 'super_admin']:
             # HR staff can see all employees
-            return queryset
+            pass
         else:
             # Default: employees can only see themselves
-            return queryset.filter(user=self.request.user)
+            queryset = queryset.filter(user=self.request.user)
+        
+        # Read only the columns and joins ?fields= / ?exclude= / ?expand= leave
+        if self.request.method == 'GET':
+            queryset = sparse_queryset(queryset, self.get_serializer())
+        return queryset
     
     def get_serializer_class(self):
         if self.request.method == 'POST':
@@ -231,18 +311,15 @@ class EmployeeListCreateView(generics.ListCreateAPIView):
         level_filter = request.query_params.get('level', '').strip()
         process_expertise_filter = request.query_params.get('process_expertise', '').strip()
         machine_filter = request.query_params.get('machine', '').strip()
+        min_salary = request.query_params.get('min_salary', '').strip()
+        max_salary = request.query_params.get('max_salary', '').strip()
         
         # Apply custom filters
         if search_term:
-            queryset = queryset.filter(
-                Q(employee_id__icontains=search_term) |
-                Q(user__first_name__icontains=search_term) |
-                Q(user__last_name__icontains=search_term) |
-                Q(user__email__icontains=search_term) |
-                Q(name_english__icontains=search_term) |
-                Q(name_bangla__icontains=search_term) |
-                Q(user__phone__icontains=search_term)
-            )
+            queryset = search_employees(queryset, search_term)
+            # Best matches first unless the client picked an order
+            if not request.query_params.get('ordering'):
+                queryset = queryset.order_by('-search_rank', '-created_at')
         
         if department_filter and department_filter != 'All':
             queryset = queryset.filter(department__name__icontains=department_filter)
@@ -257,12 +334,42 @@ class EmployeeListCreateView(generics.ListCreateAPIView):
             queryset = queryset.filter(level_of_work__icontains=level_filter)
         
         if process_expertise_filter and process_expertise_filter != 'All':
-            # Filter by process expertise operation
-            queryset = queryset.filter(process_expertise__contains=[{'operation': process_expertise_filter}])
+            # Filter by process expertise operation (indexed expertise table). The name
+            # column is set for every entry, the foreign key only once the Operation exists
+            queryset = queryset.filter(pk__in=EmployeeProcessExpertise.objects.filter(
+                operation_name=process_expertise_filter
+            ).values('employee_id'))
         
         if machine_filter and machine_filter != 'All':
-            # Filter by process expertise machine
-            queryset = queryset.filter(process_expertise__contains=[{'machine': machine_filter}])
+            # Filter by process expertise machine (indexed expertise table)
+            queryset = queryset.filter(pk__in=EmployeeProcessExpertise.objects.filter(
+                machine_name=machine_filter
+            ).values('employee_id'))
+        
+        # Salary range on the indexed effective gross salary
+        try:
+            if min_salary:
+                queryset = queryset.filter(effective_gross_salary__gte=Decimal(min_salary))
+            if max_salary:
+                queryset = queryset.filter(effective_gross_salary__lte=Decimal(max_salary))
+        except InvalidOperation:
+            return Response({'error': 'Invalid salary range'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        filters_applied = {
+            'search': search_term,
+            'department': department_filter,
+            'designation': designation_filter,
+            'status': status_filter,
+            'level': level_filter,
+            'process_expertise': process_expertise_filter,
+            'machine': machine_filter,
+            'min_salary': min_salary,
+            'max_salary': max_salary
+        }
+        
+        # Opt-in keyset pagination: ?pagination=cursor, or any ?cursor=
+        if request.query_params.get('pagination') == 'cursor' or 'cursor' in request.query_params:
+            return self.cursor_list(request, queryset, filters_applied)
         
         # Get pagination parameters
         page = int(request.query_params.get('page', 1))
@@ -305,16 +412,63 @@ class EmployeeListCreateView(generics.ListCreateAPIView):
                 'start_index': start_index + 1 if total_count > 0 else 0,
                 'end_index': min(end_index, total_count)
             },
-            'filters_applied': {
-                'search': search_term,
-                'department': department_filter,
-                'designation': designation_filter,
-                'status': status_filter,
-                'level': level_filter,
-                'process_expertise': process_expertise_filter,
-                'machine': machine_filter
-            }
+            'filters_applied': filters_applied
         })
+    
+    def cursor_list(self, request, queryset, filters_applied):
+        """
+        Constant-cost pages for infinite scroll: no COUNT and no OFFSET. ?count=estimate
+        or ?count=exact adds a total; next/previous carry the filters and an opaque cursor.
+        """
+        try:
+            page_size = int(request.query_params.get('page_size', 20))
+        except ValueError:
+            page_size = 20
+        
+        try:
+            page = EMPLOYEE_CURSOR_PAGINATOR.paginate(
+                queryset,
+                request.query_params.get('ordering', '').strip() or None,
+                request.query_params.get('cursor', '').strip() or None,
+                page_size
+            )
+        except InvalidCursor as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        def link(cursor):
+            if cursor is None:
+                return None
+            params = request.query_params.copy()
+            params['cursor'] = cursor
+            params['page_size'] = page['page_size']
+            params.pop('ordering', None)
+            params.pop('page', None)
+            return f"?{params.urlencode()}"
+        
+        serializer = self.get_serializer(page['results'], many=True)
+        data = {
+            'next': link(page['next']),
+            'previous': link(page['previous']),
+            'next_cursor': page['next'],
+            'previous_cursor': page['previous'],
+            'results': serializer.data,
+            'pagination': {
+                'mode': 'cursor',
+                'ordering': page['ordering'],
+                'page_size': page['page_size'],
+                'has_next': page['next'] is not None,
+                'has_previous': page['previous'] is not None,
+            },
+            'filters_applied': filters_applied
+        }
+        
+        count_mode = request.query_params.get('count', '').strip()
+        if count_mode == 'exact':
+            data['count'] = queryset.count()
+        elif count_mode == 'estimate':
+            data['count'] = estimated_count(queryset)
+            data['count_is_estimate'] = True
+        return Response(data)
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
@@ -322,20 +476,45 @@ def get_all_employees_for_stats(request):
     """Get all employees for statistics without pagination"""
     try:
         # Get all employees without pagination
-        employees = Employee.objects.select_related('user', 'department', 'designation', 'salary_grade').prefetch_related('process_expertise__operation', 'process_expertise__machine').all()
-        
-        # Apply role-based filtering
-        if request.user.role == 'employee':
-            employees = employees.filter(user=request.user)
-        elif request.user.role == 'department_head':
-            employees = employees.filter(department__head=request.user)
-        # For hr_staff, hr_manager, super_admin - no additional filtering
+        # process_expertise is a JSON column - there is nothing to prefetch
+        employees = _stats_employees(request.user).select_related(
+            'user', 'department', 'designation', 'salary_grade', 'reporting_manager__user'
+        )
         
         serializer = EmployeeListSerializer(employees, many=True)
         return Response(serializer.data)
     except Exception as e:
         return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+def _stats_employees(user):
+    """Employees a user may chart: own record, own department, or everyone for HR"""
+    employees = Employee.objects.all()
+    if user.role == 'employee':
+        employees = employees.filter(user=user)
+    elif user.role == 'department_head':
+        employees = employees.filter(department__head=user)
+    # For hr_staff, hr_manager, super_admin - no additional filtering
+    return employees
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def employee_stats_projection(request):
+    """
+    Just the columns the dashboard charts use, streamed without serializers.
+    ?fields=a,b picks columns; ?layout=columnar returns {field: [values...]}.
+    """
+    try:
+        fields = projection_fields(request.query_params.get('fields', '').strip())
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    
+    employees = _stats_employees(request.user)
+    if request.query_params.get('layout') == 'columnar':
+        stream = stream_projection_columns(employees, fields)
+    else:
+        stream = stream_projection_rows(employees, fields)
+    return StreamingHttpResponse(stream, content_type='application/json')
+
 class EmployeeDetailView(generics.RetrieveUpdateDestroyAPIView):
     """Retrieve, update, or delete an employee"""
     permission_classes = [IsAuthenticated]
@@ -348,13 +527,18 @@ class EmployeeDetailView(generics.RetrieveUpdateDestroyAPIView):
         
         # Role-based filtering
         if self.request.user.role == 'employee':
-            return queryset.filter(user=self.request.user)
+            queryset = queryset.filter(user=self.request.user)
         elif self.request.user.role == 'department_head':
-            return queryset.filter(department__head=self.request.user)
+            queryset = queryset.filter(department__head=self.request.user)
         elif self.request.user.role in ['hr_staff', 'hr_manager', 'super_admin']:
-            return queryset
+            pass
         else:
-            return queryset.filter(user=self.request.user)
+            queryset = queryset.filter(user=self.request.user)
+        
+        # Read only the columns and joins ?fields= / ?exclude= / ?expand= leave
+        if self.request.method == 'GET':
+            queryset = sparse_queryset(queryset, self.get_serializer())
+        return queryset
     
     def get_serializer_class(self):
         if self.request.method in ['PUT', 'PATCH']:
@@ -429,33 +613,8 @@ def employee_stats(request):
             status=status.HTTP_403_FORBIDDEN
         )
     
-    stats = {
-        'total_employees': Employee.objects.count(),
-        'active_employees': Employee.objects.filter(status='active').count(),
-        'inactive_employees': Employee.objects.filter(status='inactive').count(),
-        'on_leave_employees': Employee.objects.filter(status='on_leave').count(),
-        'terminated_employees': Employee.objects.filter(status='terminated').count(),
-        'departments': Department.objects.count(),
-        'designations': Designation.objects.count(),
-        'workers': Employee.objects.filter(level_of_work='worker').count(),
-        'staff': Employee.objects.filter(level_of_work='staff').count(),
-        'salary_grades': SalaryGrade.objects.count(),
-        'skill_metrics': SkillMetric.objects.count(),
-        'process_expertise': ProcessExpertise.objects.count(),
-    }
-    
-    # Department-wise breakdown
-    department_stats = []
-    for dept in Department.objects.all():
-        dept_count = Employee.objects.filter(department=dept).count()
-        department_stats.append({
-            'name': dept.name,
-            'count': dept_count
-        })
-    
-    stats['department_breakdown'] = department_stats
-    
-    return Response(stats)
+    # Conditional aggregates, cached briefly and dropped on employee/org changes
+    return Response(cached_employee_stats())
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
@@ -478,18 +637,6 @@ def employee_search(request):
     # Build search query
     search_query = Q()
     
-    if query:
-        search_query &= (
-            Q(employee_id__icontains=query) |
-            Q(user__first_name__icontains=query) |
-            Q(user__last_name__icontains=query) |
-            Q(user__email__icontains=query) |
-            Q(name_english__icontains=query) |
-            Q(name_bangla__icontains=query) |
-            Q(department__name__icontains=query) |
-            Q(designation__name__icontains=query)
-        )
-    
     if data.get('department'):
         search_query &= Q(department_id=data['department'])
     
@@ -508,6 +655,8 @@ def employee_search(request):
     employees = Employee.objects.filter(search_query).select_related(
         'user', 'department', 'designation', 'salary_grade', 'reporting_manager__user'
     )
+    if query:
+        employees = search_employees(employees, query).order_by('-search_rank', 'employee_id')
     
     serializer = EmployeeListSerializer(employees, many=True)
     return Response(serializer.data)
@@ -543,6 +692,7 @@ def employee_dashboard_data(request):
             'gross_salary': employee.gross_salary,
             'salary_components': employee.salary_components,
             'total_salary_components': employee.get_total_salary_components(),
+            'effective_salary': {field: getattr(employee, field) for field in SALARY_SNAPSHOT_FIELDS},
         }
         
         return Response(data)
@@ -556,16 +706,15 @@ def employee_dashboard_data(request):
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def organizational_data(request):
-    """Get all organizational data for frontend dropdowns"""
-    data = {
-        'departments': DepartmentSerializer(Department.objects.filter(is_active=True), many=True).data,
-        'designations': DesignationSerializer(Designation.objects.filter(is_active=True), many=True).data,
-        'salary_grades': SalaryGradeSerializer(SalaryGrade.objects.filter(is_active=True), many=True).data,
-        'skill_metrics': SkillMetricSerializer(SkillMetric.objects.filter(is_active=True), many=True).data,
-        'process_expertise': ProcessExpertiseSerializer(ProcessExpertise.objects.filter(is_active=True), many=True).data,
-    }
-    
-    return Response(data)
+    """Get all organizational data for frontend dropdowns (cached, ETag-validated)"""
+    etag, body = organizational_data_bundle()
+    if request.headers.get('If-None-Match') == etag:
+        response = HttpResponse(status=status.HTTP_304_NOT_MODIFIED)
+    else:
+        response = HttpResponse(body, content_type='application/json')
+    response['ETag'] = etag
+    response['Cache-Control'] = 'private, no-cache'
+    return response
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
@@ -589,6 +738,53 @@ def recent_employees(request):
             status=status.HTTP_500_INTERNAL_SERVER_ERROR
         )
 
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def employees_by_expertise(request):
+    """
+    Workers who can run an operation and/or machine (?operation= / ?machine=, id or
+    name) - for line balancing. Answered from the indexed expertise table.
+    """
+    if request.user.role not in ['hr_staff', 'hr_manager', 'super_admin', 'department_head']:
+        return Response(
+            {'error': 'Permission denied'}, 
+            status=status.HTTP_403_FORBIDDEN
+        )
+    
+    operation = request.query_params.get('operation', '').strip()
+    machine = request.query_params.get('machine', '').strip()
+    if not operation and not machine:
+        return Response(
+            {'error': 'operation or machine is required'}, 
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    entries = EmployeeProcessExpertise.objects.select_related(
+        'employee__user', 'employee__department', 'employee__designation', 'operation', 'machine'
+    )
+    if operation:
+        entries = entries.filter(operation_id=int(operation)) if operation.isdigit() else entries.filter(operation_name=operation)
+    if machine:
+        entries = entries.filter(machine_id=int(machine)) if machine.isdigit() else entries.filter(machine_name=machine)
+    if request.user.role == 'department_head':
+        entries = entries.filter(employee__department__head=request.user)
+    if request.query_params.get('status', 'active') != 'All':
+        entries = entries.filter(employee__status=request.query_params.get('status', 'active'))
+    
+    return Response([
+        {
+            'id': entry.employee_id,
+            'employee_id': entry.employee.employee_id,
+            'full_name': entry.employee.name_english or entry.employee.user.full_name,
+            'department_name': entry.employee.department.name if entry.employee.department else None,
+            'designation_name': entry.employee.designation.name if entry.employee.designation else None,
+            'operation': entry.operation.name if entry.operation else entry.operation_name or None,
+            'machine': entry.machine.name if entry.machine else entry.machine_name or None,
+            'duration': entry.duration,
+        }
+        for entry in entries.order_by('employee__employee_id', 'position')
+    ])
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def employee_activity_log(request, employee_id):
@@ -628,22 +824,17 @@ def employee_activity_log(request, employee_id):
 def department_employee_count(request):
     """Get employee count by department"""
     try:
-        departments = Department.objects.filter(is_active=True)
-        department_counts = []
-        
-        for dept in departments:
-            active_count = Employee.objects.filter(
-                department=dept, 
-                status='active'
-            ).count()
-            total_count = Employee.objects.filter(department=dept).count()
-            
-            department_counts.append({
-                'department_id': dept.id,
-                'department_name': dept.name,
-                'active_employees': active_count,
-                'total_employees': total_count
-            })
+        # Same cached aggregate as employee_stats
+        department_counts = [
+            {
+                'department_id': dept['department_id'],
+                'department_name': dept['name'],
+                'active_employees': dept['active_employees'],
+                'total_employees': dept['total_employees']
+            }
+            for dept in cached_employee_stats()['department_breakdown']
+            if dept['is_active']
+        ]
         
         return Response(department_counts)
     
@@ -0,0 +1,77 @@
+from django.contrib import admin
+from .models import (
+    PayrollRun, Payslip, PayrollDirtyEmployee, EmployeePaymentAccount, SalaryAdvance, AdvanceInstallment
+)
+from .advances import has_recoveries, schedule_installments
+
+
+@admin.register(PayrollRun)
+class PayrollRunAdmin(admin.ModelAdmin):
+    list_display = [
+        'year', 'month', 'status', 'total_employees', 'processed_employees',
+        'total_gross_salary', 'total_net_salary', 'completed_at'
+    ]
+    list_filter = ['status', 'year', 'month']
+    readonly_fields = [
+        'last_employee_pk', 'processed_employees', 'started_at', 'completed_at',
+        'created_at', 'updated_at'
+    ]
+    ordering = ['-year', '-month']
+
+
+@admin.register(Payslip)
+class PayslipAdmin(admin.ModelAdmin):
+    list_display = [
+        'employee_code', 'employee_name', 'run', 'department_name', 'gross_salary',
+        'overtime_pay', 'total_deductions', 'net_salary'
+    ]
+    list_filter = ['run', 'level_of_work', 'department_name']
+    search_fields = ['employee_code', 'employee_name']
+    readonly_fields = ['created_at', 'updated_at']
+    ordering = ['run', 'employee_code']
+    raw_id_fields = ['employee']
+
+
+@admin.register(PayrollDirtyEmployee)
+class PayrollDirtyEmployeeAdmin(admin.ModelAdmin):
+    list_display = ['employee', 'run', 'reason', 'marked_at']
+    list_filter = ['reason', 'run']
+    search_fields = ['employee__employee_id']
+    ordering = ['run', 'employee']
+    raw_id_fields = ['employee']
+
+
+@admin.register(EmployeePaymentAccount)
+class EmployeePaymentAccountAdmin(admin.ModelAdmin):
+    list_display = ['employee', 'payment_method', 'bank_name', 'account_number', 'wallet_provider', 'wallet_number']
+    list_filter = ['payment_method', 'wallet_provider', 'bank_name']
+    search_fields = ['employee__employee_id', 'account_number', 'wallet_number']
+    readonly_fields = ['created_at', 'updated_at']
+    raw_id_fields = ['employee']
+
+
+class AdvanceInstallmentInline(admin.TabularInline):
+    model = AdvanceInstallment
+    extra = 0
+    fields = ['sequence', 'due_month', 'amount', 'status', 'recovered_amount', 'recovered_at']
+    readonly_fields = fields
+    can_delete = False
+
+
+@admin.register(SalaryAdvance)
+class SalaryAdvanceAdmin(admin.ModelAdmin):
+    list_display = [
+        'employee', 'advance_type', 'amount', 'advance_date', 'first_deduction_month',
+        'installment_count', 'status'
+    ]
+    list_filter = ['advance_type', 'status', 'first_deduction_month']
+    search_fields = ['employee__employee_id', 'reason']
+    readonly_fields = ['created_at', 'updated_at']
+    raw_id_fields = ['employee']
+    inlines = [AdvanceInstallmentInline]
+
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        schedule_fields = {'employee', 'amount', 'first_deduction_month', 'installment_count'}
+        if not change or (schedule_fields & set(form.changed_data) and not has_recoveries(obj)):
+            schedule_installments(obj)
@@ -0,0 +1,160 @@
+"""
+Salary advance and loan ledger
+Instalment schedules, per-period amounts due and outstanding balances, all answered by
+indexed aggregate queries over AdvanceInstallment, plus recovery when a run is finalized
+"""
+
+from datetime import date
+from decimal import Decimal, ROUND_DOWN
+from typing import Dict, Iterable, Optional
+
+from django.db import transaction
+from django.db.models import Max, Q, Sum
+from django.utils import timezone
+
+from .dirty import mark_payroll_dirty, mark_employee_dirty_in_open_runs, mark_employees_dirty_in_open_runs
+from .models import SalaryAdvance, AdvanceInstallment, Payslip
+
+CENT = Decimal('0.01')
+
+
+def add_months(month: date, count: int) -> date:
+    """First day of the month `count` months after `month`"""
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def has_recoveries(advance: SalaryAdvance) -> bool:
+    return advance.installments.exclude(status='scheduled').exists()
+
+
+def schedule_installments(advance: SalaryAdvance):
+    """
+    (Re)build the instalment schedule of an advance nothing has been recovered from yet:
+    equal monthly instalments, the last one absorbing the rounding
+    """
+    count = advance.installment_count
+    installment = (advance.amount / count).quantize(CENT, rounding=ROUND_DOWN)
+    first_month = advance.first_deduction_month.replace(day=1)
+
+    with transaction.atomic():
+        advance.installments.all().delete()
+        AdvanceInstallment.objects.bulk_create([
+            AdvanceInstallment(
+                advance=advance,
+                employee_id=advance.employee_id,
+                sequence=sequence,
+                due_month=add_months(first_month, sequence - 1),
+                amount=installment if sequence < count else advance.amount - installment * (count - 1),
+            )
+            for sequence in range(1, count + 1)
+        ])
+    mark_employee_dirty_in_open_runs(advance.employee_id, 'advance')
+
+
+def installments_due(period_start: date, employee_pks: Optional[Iterable[int]] = None) -> Dict[int, Decimal]:
+    """
+    Instalment total due per employee in a pay period - one grouped query for the whole run.
+    Instalments of earlier months no finalized run recovered are still due.
+    """
+    installments = AdvanceInstallment.objects.filter(
+        due_month__lte=period_start, status='scheduled', advance__status='active'
+    )
+    if employee_pks is not None:
+        installments = installments.filter(employee_id__in=list(employee_pks))
+    return {
+        row['employee_id']: row['due']
+        for row in installments.values('employee_id').annotate(due=Sum('amount')).order_by()
+    }
+
+
+def outstanding_balances(period_start: date, employee_pks: Optional[Iterable[int]] = None) -> Dict[int, Dict[str, Decimal]]:
+    """
+    Per employee with an active advance: what is due in the period, what has not been
+    recovered yet, and what will still be outstanding once the period is deducted
+    """
+    installments = AdvanceInstallment.objects.filter(status='scheduled', advance__status='active')
+    if employee_pks is not None:
+        installments = installments.filter(employee_id__in=list(employee_pks))
+    rows = installments.values('employee_id').annotate(
+        due=Sum('amount', filter=Q(due_month__lte=period_start), default=Decimal('0')),
+        outstanding=Sum('amount'),
+        after_period=Sum('amount', filter=Q(due_month__gt=period_start), default=Decimal('0')),
+    ).order_by()
+    return {
+        row['employee_id']: {key: row[key] for key in ('due', 'outstanding', 'after_period')}
+        for row in rows
+    }
+
+
+def recover_advance_installments(run) -> Dict[str, Decimal]:
+    """
+    Settle the run's scheduled instalments - and any left over from earlier months that
+    were never finalized - against what its payslips actually deducted, oldest first.
+    A shortfall (pay too low to cover the instalment) is carried forward as a new
+    instalment after the end of that advance's schedule.
+    """
+    period_start = run.period_start.replace(day=1)
+    deducted, payslip_pks = {}, {}
+    for employee_pk, payslip_pk, amount in Payslip.objects.filter(run=run, advance_deduction__gt=0).values_list(
+        'employee_id', 'id', 'advance_deduction'
+    ):
+        deducted[employee_pk], payslip_pks[employee_pk] = amount, payslip_pk
+    installments = list(
+        AdvanceInstallment.objects.filter(due_month__lte=period_start, status='scheduled', advance__status='active')
+        .order_by('employee_id', 'due_month', 'advance__advance_date', 'advance_id', 'sequence')
+    )
+    if not installments:
+        return {'recovered': Decimal('0'), 'carried_forward': Decimal('0')}
+
+    now = timezone.now()
+    advance_pks = {installment.advance_id for installment in installments}
+    # Last (sequence, due month) of each schedule - carried-forward remainders are appended after it
+    schedule_ends = {
+        advance_pk: [last_sequence, last_month]
+        for advance_pk, last_sequence, last_month in AdvanceInstallment.objects.filter(advance_id__in=advance_pks)
+        .values('advance_id').annotate(last_sequence=Max('sequence'), last_month=Max('due_month'))
+        .values_list('advance_id', 'last_sequence', 'last_month')
+    }
+
+    carried, recovered_total, carried_total = [], Decimal('0'), Decimal('0')
+    for installment in installments:
+        available = deducted.get(installment.employee_id, Decimal('0'))
+        recovered = min(available, installment.amount)
+        deducted[installment.employee_id] = available - recovered
+
+        installment.recovered_amount = recovered
+        installment.recovered_at = now
+        installment.payslip_id = payslip_pks.get(installment.employee_id)
+        installment.status = 'recovered' if recovered == installment.amount else 'carried_forward'
+        recovered_total += recovered
+
+        if recovered < installment.amount:
+            end = schedule_ends[installment.advance_id]
+            end[0], end[1] = end[0] + 1, add_months(max(end[1], period_start), 1)
+            carried.append(AdvanceInstallment(
+                advance_id=installment.advance_id,
+                employee_id=installment.employee_id,
+                sequence=end[0],
+                due_month=end[1],
+                amount=installment.amount - recovered,
+            ))
+            carried_total += installment.amount - recovered
+
+    with transaction.atomic():
+        AdvanceInstallment.objects.bulk_update(
+            installments, ['status', 'recovered_amount', 'recovered_at', 'payslip'], batch_size=1000
+        )
+        AdvanceInstallment.objects.bulk_create(carried, batch_size=1000)
+        SalaryAdvance.objects.filter(id__in=advance_pks, status='active').exclude(
+            installments__status='scheduled'
+        ).update(status='settled', updated_at=now)
+        # Open runs of the months the remainders moved to now owe more
+        mark_payroll_dirty(
+            ((installment.employee_id, installment.due_month.year, installment.due_month.month) for installment in carried),
+            'advance'
+        )
+        # Other open months deducted these instalments as still due - they no longer are
+        mark_employees_dirty_in_open_runs({installment.employee_id for installment in installments}, 'advance')
+
+    return {'recovered': recovered_total, 'carried_forward': carried_total}
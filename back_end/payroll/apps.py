@@ -0,0 +1,11 @@
+from django.apps import AppConfig
+
+
+class PayrollConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'payroll'
+    verbose_name = 'Payroll Management'
+    
+    def ready(self):
+        """Register the dirty-set signal receivers"""
+        import payroll.signals
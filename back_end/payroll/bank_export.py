@@ -0,0 +1,184 @@
+"""
+Salary disbursement file export
+Streams bank-transfer and mobile-wallet batch files for a finalized payroll run straight
+from a database cursor, so memory stays flat regardless of headcount
+"""
+
+import csv
+from decimal import Decimal
+from typing import Dict, Iterator, Any
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db.models import Count, Sum
+from django.utils import timezone
+
+from .models import Payslip
+
+EXPORT_CHUNK_SIZE = 2000
+
+EXPORT_FORMATS = {
+    # format: (payment method, file extension, content type)
+    'bank_csv': ('bank', 'csv', 'text/csv'),
+    'bank_fixed': ('bank', 'txt', 'text/plain'),
+    'wallet_csv': ('mobile_wallet', 'csv', 'text/csv'),
+}
+
+EXPORT_FIELDS = (
+    'employee_code', 'employee_name', 'department_name', 'net_salary',
+    'employee__payment_account__account_name', 'employee__payment_account__account_number',
+    'employee__payment_account__bank_name', 'employee__payment_account__branch_name',
+    'employee__payment_account__routing_number', 'employee__payment_account__wallet_provider',
+    'employee__payment_account__wallet_number',
+)
+
+
+class _Echo:
+    """csv.writer target that hands each encoded line straight back"""
+
+    def write(self, value):
+        return value
+
+
+def export_queryset(run, export_format: str):
+    """Payable payslips of the run disbursed through this format's payment method"""
+    payment_method = EXPORT_FORMATS[export_format][0]
+    return Payslip.objects.filter(
+        run=run, net_salary__gt=0, employee__payment_account__payment_method=payment_method
+    ).order_by('employee_code')
+
+
+def export_summary(run, export_format: str) -> Dict[str, Any]:
+    """Record count and amount total - needed up front for headers and trailers"""
+    summary = export_queryset(run, export_format).aggregate(records=Count('id'), total=Sum('net_salary'))
+    return {'records': summary['records'], 'total': summary['total'] or Decimal('0')}
+
+
+def export_filename(run, export_format: str) -> str:
+    return f"payroll-{run.year}-{run.month:02d}-{export_format.replace('_', '-')}.{EXPORT_FORMATS[export_format][1]}"
+
+
+def _rows(run, export_format: str) -> Iterator[Dict[str, Any]]:
+    rows = export_queryset(run, export_format).values(*EXPORT_FIELDS)
+    for row in rows.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        yield {key.replace('employee__payment_account__', ''): value for key, value in row.items()}
+
+
+def _reference(run, row) -> str:
+    return f"SAL{run.year}{run.month:02d}-{row['employee_code']}"
+
+
+def stream_bank_csv(run) -> Iterator[str]:
+    writer = csv.writer(_Echo())
+    yield writer.writerow([
+        'Reference', 'Employee ID', 'Account Name', 'Account Number', 'Bank', 'Branch',
+        'Routing Number', 'Amount'
+    ])
+    for row in _rows(run, 'bank_csv'):
+        yield writer.writerow([
+            _reference(run, row), row['employee_code'], row['account_name'] or row['employee_name'],
+            row['account_number'], row['bank_name'], row['branch_name'], row['routing_number'],
+            f"{row['net_salary']:.2f}"
+        ])
+
+
+def stream_wallet_csv(run) -> Iterator[str]:
+    writer = csv.writer(_Echo())
+    yield writer.writerow(['Reference', 'Employee ID', 'Name', 'Provider', 'Wallet Number', 'Amount'])
+    for row in _rows(run, 'wallet_csv'):
+        yield writer.writerow([
+            _reference(run, row), row['employee_code'], row['account_name'] or row['employee_name'],
+            row['wallet_provider'], row['wallet_number'], f"{row['net_salary']:.2f}"
+        ])
+
+
+class ExportFieldOverflow(ValueError):
+    """Raised when values do not fit their fixed-width fields; carries the offending employees"""
+
+    def __init__(self, offenders):
+        self.offenders = offenders
+        super().__init__(
+            'Values too long for the fixed-width bank file: '
+            + '; '.join(f"{item['employee_code']} ({', '.join(item['fields'])})" for item in offenders)
+        )
+
+
+def _field(value, width: int, numeric: bool = False) -> str:
+    """Fixed-width field: numbers zero-padded right-aligned, text space-padded left-aligned, never truncated"""
+    value = str(value or ('0' if numeric else ''))
+    if len(value) > width:
+        raise ValueError(f'{value!r} does not fit a {width}-character field')
+    return value.rjust(width, '0') if numeric else value.ljust(width)
+
+
+def _paisa(amount) -> int:
+    return int((Decimal(amount) * 100).to_integral_value())
+
+
+# field: (width, value of the detail row)
+FIXED_WIDTH_DETAIL_FIELDS = {
+    'account_number': (20, lambda run, row: row['account_number']),
+    'routing_number': (9, lambda run, row: row['routing_number']),
+    'account_name': (35, lambda run, row: row['account_name'] or row['employee_name']),
+    'amount': (13, lambda run, row: _paisa(row['net_salary'])),
+    'reference': (20, _reference),
+}
+
+
+def check_fixed_width_fields(run) -> None:
+    """
+    Refuse the fixed-width export up front when any transfer has a value longer than
+    its field - a cut-off account number or reference would misdirect the payment
+    """
+    for setting, width in (('PAYROLL_COMPANY_NAME', 35), ('PAYROLL_DEBIT_ACCOUNT_NUMBER', 20)):
+        if len(getattr(settings, setting, '')) > width:
+            raise ImproperlyConfigured(f'{setting} must be at most {width} characters for the fixed-width bank file')
+
+    offenders = []
+    for row in _rows(run, 'bank_fixed'):
+        fields = [
+            name for name, (width, value) in FIXED_WIDTH_DETAIL_FIELDS.items()
+            if len(str(value(run, row) or '')) > width
+        ]
+        if fields:
+            offenders.append({'employee_code': row['employee_code'], 'fields': fields})
+    if offenders:
+        raise ExportFieldOverflow(offenders)
+
+
+def stream_bank_fixed_width(run, summary: Dict[str, Any]) -> Iterator[str]:
+    """
+    Header, one detail line per transfer, trailer - every line 120 characters:
+    H | value date(8) | company(35) | debit account(20) | records(6) | total paisa(15) | filler
+    D | sequence(6) | account number(20) | routing(9) | account name(35) | amount paisa(13) | reference(20) | filler
+    T | records(6) | total paisa(15) | filler
+    """
+    value_date = timezone.localdate().strftime('%Y%m%d')
+    company = getattr(settings, 'PAYROLL_COMPANY_NAME', '')
+    debit_account = getattr(settings, 'PAYROLL_DEBIT_ACCOUNT_NUMBER', '')
+    total_paisa = _paisa(summary['total'])
+
+    yield (
+        'H' + value_date + _field(company, 35) + _field(debit_account, 20)
+        + _field(summary['records'], 6, True) + _field(total_paisa, 15, True)
+    ).ljust(120) + '\r\n'
+
+    for sequence, row in enumerate(_rows(run, 'bank_fixed'), start=1):
+        values = {name: value(run, row) for name, (width, value) in FIXED_WIDTH_DETAIL_FIELDS.items()}
+        yield (
+            'D' + _field(sequence, 6, True) + _field(values['account_number'], 20)
+            + _field(values['routing_number'], 9, True) + _field(values['account_name'], 35)
+            + _field(values['amount'], 13, True) + _field(values['reference'], 20)
+        ).ljust(120) + '\r\n'
+
+    yield ('T' + _field(summary['records'], 6, True) + _field(total_paisa, 15, True)).ljust(120) + '\r\n'
+
+
+def stream_disbursement_file(run, export_format: str, summary: Dict[str, Any]) -> Iterator[str]:
+    """Pick the writer for the format; fixed-width files are checked before any line is sent"""
+    if export_format == 'bank_fixed':
+        check_fixed_width_fields(run)
+        return stream_bank_fixed_width(run, summary)
+    if export_format == 'wallet_csv':
+        return stream_wallet_csv(run)
+    return stream_bank_csv(run)
@@ -0,0 +1,79 @@
+"""
+Payroll dirty-set tracker
+Records which (employee, pay period) payslips went stale after a run was computed,
+so the draft can be brought up to date by recomputing only those employees
+"""
+
+from datetime import date
+from typing import Iterable, Optional, Tuple
+
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import PayrollRun, PayrollDirtyEmployee
+
+# Runs whose payslips can still change
+OPEN_RUN_STATUSES = ('processing', 'completed', 'failed')
+
+
+def months_between(start: date, end: date):
+    """(year, month) for every month touched by [start, end]"""
+    year, month = start.year, start.month
+    while (year, month) <= (end.year, end.month):
+        yield year, month
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+
+
+def mark_payroll_dirty(entries: Iterable[Tuple[int, int, int]], reason: str) -> int:
+    """Mark (employee_pk, year, month) entries dirty in the open run of that month, returns marks written"""
+    entries = set(entries)
+    if not entries:
+        return 0
+
+    periods = Q()
+    for year, month in {(year, month) for _, year, month in entries}:
+        periods |= Q(year=year, month=month)
+    runs = {
+        (year, month): pk
+        for pk, year, month in PayrollRun.objects.filter(periods, status__in=OPEN_RUN_STATUSES)
+        .values_list('id', 'year', 'month')
+    }
+    return _write_marks(
+        [(runs[(year, month)], employee_pk) for employee_pk, year, month in entries if (year, month) in runs],
+        reason
+    )
+
+
+def mark_employee_dirty_in_open_runs(employee_pk: int, reason: str) -> int:
+    """Mark an employee dirty in every open run (salary and employment changes)"""
+    return mark_employees_dirty_in_open_runs([employee_pk], reason)
+
+
+def mark_employees_dirty_in_open_runs(employee_pks: Iterable[int], reason: str,
+                                      since: Optional[date] = None) -> int:
+    """
+    Same as above for many employees at once, e.g. everyone on a revised salary grade.
+    With `since`, only runs for that month onwards are marked.
+    """
+    employee_pks = list(employee_pks)
+    if not employee_pks:
+        return 0
+    runs = PayrollRun.objects.filter(status__in=OPEN_RUN_STATUSES)
+    if since is not None:
+        runs = runs.filter(Q(year__gt=since.year) | Q(year=since.year, month__gte=since.month))
+    run_pks = list(runs.values_list('id', flat=True))
+    return _write_marks([(run_pk, employee_pk) for run_pk in run_pks for employee_pk in employee_pks], reason)
+
+
+def _write_marks(marks, reason: str) -> int:
+    if not marks:
+        return 0
+    now = timezone.now()
+    PayrollDirtyEmployee.objects.bulk_create(
+        [PayrollDirtyEmployee(run_id=run_pk, employee_id=employee_pk, reason=reason, marked_at=now)
+         for run_pk, employee_pk in set(marks)],
+        update_conflicts=True,
+        unique_fields=['run', 'employee', 'reason'],
+        update_fields=['marked_at']
+    )
+    return len(marks)
@@ -0,0 +1,546 @@
+"""
+Payroll batch engine
+Computes a month's salary sheet in employee-pk chunks: each chunk pre-loads its inputs
+with a few queries, shards the salary math over a process pool on plain dicts and
+writes the merged payslips with bulk_create. Progress is committed per chunk, so a
+failed run resumes where it stopped.
+"""
+
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from datetime import date, timedelta
+from decimal import Decimal, ROUND_HALF_UP
+from typing import Dict, FrozenSet, Iterable, List, Optional, Any
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .advances import installments_due
+from .models import PayrollRun, Payslip, PayrollDirtyEmployee
+from attendance.models import DailyAttendance
+from attendance.recompute import month_range
+from attendance.rules import get_attendance_rules
+from attendance.timesheet import WEEKDAY_INDEX, PRESENT_STATUSES, holiday_dates, approved_leave_days
+from employees.models import Employee
+from employees.salary import SALARY_COMPONENTS
+
+logger = logging.getLogger(__name__)
+
+CENT = Decimal('0.01')
+
+# Bangladesh Labour Act: overtime is paid at twice the hourly basic, hourly basic = basic / 208
+OVERTIME_HOURS_DIVISOR = Decimal('208')
+OVERTIME_RATE_MULTIPLIER = Decimal('2')
+
+PAYROLL_EMPLOYEE_STATUSES = ('active', 'on_leave')
+
+# Runs a worker may take over; 'processing' ones only once their progress has stalled
+CLAIMABLE_RUN_STATUSES = ('pending', 'completed', 'failed')
+
+# Payslip fields compared when showing what a recalculation changed
+PAYSLIP_VALUE_FIELDS = (
+    'employee_name', 'department_name', 'designation_name', 'level_of_work',
+    'basic_salary', 'house_rent', 'medical_allowance', 'conveyance', 'food_allowance', 'mobile_bill',
+    'gross_salary', 'total_days', 'present_days', 'late_days', 'absent_days', 'leave_days',
+    'leave_without_pay_days', 'holiday_days', 'weekend_days', 'not_joined_days',
+    'overtime_hours', 'extra_overtime_hours', 'overtime_pay', 'extra_overtime_pay', 'attendance_bonus',
+    'absent_deduction', 'leave_without_pay_deduction', 'proration_deduction', 'advance_deduction',
+    'total_deductions', 'net_salary',
+)
+
+EMPLOYEE_FIELDS = (
+    'id', 'employee_id', 'user__first_name', 'user__last_name', 'department__name',
+    'designation__name', 'level_of_work', 'off_day', 'date_of_joining',
+    *(f'effective_{component}' for component, _, _ in SALARY_COMPONENTS), 'effective_gross_salary',
+)
+
+
+class PayrollRunBusy(ValueError):
+    """Another worker holds the run"""
+
+
+def _money(value) -> Decimal:
+    return Decimal(value).quantize(CENT, rounding=ROUND_HALF_UP)
+
+
+def _decimal(value) -> Decimal:
+    if value in (None, ''):
+        return Decimal('0')
+    try:
+        return Decimal(str(value))
+    except ArithmeticError:
+        return Decimal('0')
+
+
+@dataclass(frozen=True)
+class PayPeriod:
+    """Everything about the month that is the same for every employee"""
+    year: int
+    month: int
+    start: date
+    end: date
+    counted_until: date  # Days after this (future days of an open month) are not counted absent
+    holidays: FrozenSet[date]
+    weekend_days: FrozenSet[int]  # 0=Sunday, used when the employee has no off day
+    attendance_bonus: Decimal
+
+    @property
+    def total_days(self) -> int:
+        return (self.end - self.start).days + 1
+
+    @classmethod
+    def for_month(cls, year: int, month: int) -> 'PayPeriod':
+        start, end = month_range(year, month)
+        return cls(
+            year=year,
+            month=month,
+            start=start,
+            end=end,
+            counted_until=min(end, date.today()),
+            holidays=frozenset(holiday_dates(start, end)),
+            weekend_days=get_attendance_rules().weekend_days,
+            attendance_bonus=_decimal(getattr(settings, 'PAYROLL_ATTENDANCE_BONUS', 0)),
+        )
+
+
+def resolve_salary_components(employee: Dict[str, Any]) -> Dict[str, Decimal]:
+    """Monthly salary components for an employee, from their stored salary snapshot"""
+    resolved = {component: employee[f'effective_{component}'] for component, _, _ in SALARY_COMPONENTS}
+    resolved['gross_salary'] = employee['effective_gross_salary']
+    return resolved
+
+
+def count_attendance_days(employee: Dict[str, Any], records: Dict[date, tuple],
+                          leaves: Dict[date, str], period: PayPeriod) -> Dict[str, int]:
+    """Classify every day of the period, with the same precedence as the monthly timesheet"""
+    off_day = employee.get('off_day')
+    weekend_days = {WEEKDAY_INDEX[off_day]} if off_day in WEEKDAY_INDEX else period.weekend_days
+    joined = employee.get('date_of_joining')
+
+    counts = dict.fromkeys((
+        'present_days', 'late_days', 'absent_days', 'leave_days', 'leave_without_pay_days',
+        'holiday_days', 'weekend_days', 'not_joined_days'
+    ), 0)
+
+    day = period.start
+    while day <= period.end:
+        record = records.get(day)
+        record_status = record[0] if record else None
+        leave_status = leaves.get(day) or (record_status if record_status and record_status.startswith('Leave-') else None)
+
+        if joined and day < joined:
+            counts['not_joined_days'] += 1
+        elif record_status in PRESENT_STATUSES:
+            counts['present_days'] += 1
+            if record_status == 'Present-Late':
+                counts['late_days'] += 1
+        elif leave_status == 'Leave-WithOutPay':
+            counts['leave_without_pay_days'] += 1
+        elif leave_status:
+            counts['leave_days'] += 1
+        elif day in period.holidays or record_status == 'Holiday':
+            counts['holiday_days'] += 1
+        elif (day.weekday() + 1) % 7 in weekend_days or record_status == 'Weekend':
+            counts['weekend_days'] += 1
+        elif day <= period.counted_until:
+            counts['absent_days'] += 1
+        day += timedelta(days=1)
+
+    return counts
+
+
+def compute_payslip(employee: Dict[str, Any], records: Dict[date, tuple], leaves: Dict[date, str],
+                    period: PayPeriod, advance_due: Decimal = Decimal('0')) -> Dict[str, Any]:
+    """Salary, earnings and deductions for one employee - pure function of its inputs"""
+    components = resolve_salary_components(employee)
+    days = count_attendance_days(employee, records, leaves, period)
+    is_worker = employee['level_of_work'] == 'worker'
+
+    overtime_hours = sum((_decimal(record[1]) for record in records.values()), Decimal('0'))
+    extra_overtime_hours = sum((_decimal(record[2]) for record in records.values()), Decimal('0'))
+
+    basic, gross = components['basic_salary'], components['gross_salary']
+    daily_basic = basic / period.total_days
+    daily_gross = gross / period.total_days
+
+    # Overtime is only paid to workers
+    overtime_rate = basic / OVERTIME_HOURS_DIVISOR * OVERTIME_RATE_MULTIPLIER if is_worker else Decimal('0')
+    overtime_pay = _money(overtime_rate * overtime_hours)
+    extra_overtime_pay = _money(overtime_rate * extra_overtime_hours)
+
+    full_attendance = not (days['absent_days'] or days['late_days'] or
+                           days['leave_without_pay_days'] or days['not_joined_days'])
+    attendance_bonus = period.attendance_bonus if is_worker and full_attendance else Decimal('0')
+
+    absent_deduction = _money(daily_basic * days['absent_days'])
+    leave_without_pay_deduction = _money(daily_gross * days['leave_without_pay_days'])
+    proration_deduction = _money(daily_gross * days['not_joined_days'])
+    total_deductions = absent_deduction + leave_without_pay_deduction + proration_deduction
+
+    earnings = gross + overtime_pay + extra_overtime_pay + attendance_bonus
+    # Instalments never take pay below zero - the ledger carries any shortfall forward
+    advance_deduction = min(_money(advance_due), max(earnings - total_deductions, Decimal('0')))
+    total_deductions += advance_deduction
+    net_salary = max(earnings - total_deductions, Decimal('0'))
+
+    return {
+        **{field: _money(value) for field, value in components.items()},
+        **days,
+        'total_days': period.total_days,
+        'overtime_hours': _money(overtime_hours),
+        'extra_overtime_hours': _money(extra_overtime_hours),
+        'overtime_pay': overtime_pay,
+        'extra_overtime_pay': extra_overtime_pay,
+        'attendance_bonus': _money(attendance_bonus),
+        'absent_deduction': absent_deduction,
+        'leave_without_pay_deduction': leave_without_pay_deduction,
+        'proration_deduction': proration_deduction,
+        'advance_deduction': _money(advance_deduction),
+        'total_deductions': _money(total_deductions),
+        'net_salary': _money(net_salary),
+    }
+
+
+def payroll_employees(period: PayPeriod):
+    """Employees paid for the period"""
+    return Employee.objects.filter(status__in=PAYROLL_EMPLOYEE_STATUSES).exclude(date_of_joining__gt=period.end)
+
+
+def compute_shard(shard: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Compute one shard's payslips. Runs in a worker process, so it only sees plain
+    picklable inputs (dicts, tuples, Decimals, dates) and never touches the ORM.
+    """
+    started = time.perf_counter()
+    period, records, leaves = shard['period'], shard['records'], shard['leaves']
+    payslips = [
+        (employee['id'], compute_payslip(
+            employee, records.get(employee['id'], {}), leaves.get(employee['id'], {}), period,
+            shard['advances'].get(employee['id'], Decimal('0'))
+        ))
+        for employee in shard['employees']
+    ]
+    return {
+        'payslips': payslips,
+        'compute_ms': round((time.perf_counter() - started) * 1000, 2),
+        'pid': os.getpid(),
+    }
+
+
+def _init_worker():
+    """Pool initializer - spawned workers need the app registry before unpickling tasks"""
+    import django
+    django.setup()
+
+
+def split_shards(employees: List[Dict[str, Any]], shard_count: int) -> List[List[Dict[str, Any]]]:
+    """Split pk-ordered employees into contiguous employee-pk ranges of near-equal size"""
+    shard_count = max(1, min(shard_count, len(employees)))
+    size, remainder = divmod(len(employees), shard_count)
+    shards, offset = [], 0
+    for index in range(shard_count):
+        end = offset + size + (1 if index < remainder else 0)
+        shards.append(employees[offset:end])
+        offset = end
+    return shards
+
+
+def payslip_totals(payslips: Iterable[Payslip]) -> Dict[str, Decimal]:
+    """Run-level totals contributed by a set of payslips"""
+    payslips = list(payslips)
+    return {
+        'total_gross_salary': sum((p.gross_salary for p in payslips), Decimal('0')),
+        'total_overtime_pay': sum((p.overtime_pay + p.extra_overtime_pay for p in payslips), Decimal('0')),
+        'total_deductions': sum((p.total_deductions for p in payslips), Decimal('0')),
+        'total_net_salary': sum((p.net_salary for p in payslips), Decimal('0')),
+    }
+
+
+def command_workers(workers: Optional[int] = None) -> int:
+    """
+    Pool size for the management commands: --workers, else PAYROLL_WORKERS, else one
+    per CPU. Web requests never fork a pool, so only the commands use this.
+    """
+    return max(1, workers or getattr(settings, 'PAYROLL_WORKERS', None) or os.cpu_count() or 1)
+
+
+class PayrollEngine:
+    """
+    Runs (or resumes) a PayrollRun chunk by chunk. Computes inline unless given more
+    than one worker, in which case each chunk is sharded across worker processes.
+    """
+
+    def __init__(self, run: PayrollRun, chunk_size: Optional[int] = None, workers: Optional[int] = None):
+        self.run = run
+        self.chunk_size = chunk_size or getattr(settings, 'PAYROLL_CHUNK_SIZE', 1000)
+        self.workers = max(1, workers or 1)
+        self.period = PayPeriod.for_month(run.year, run.month)
+        self.pool = None
+
+    def process(self, restart: bool = False) -> PayrollRun:
+        """Compute every remaining payslip; restart discards earlier progress"""
+        run = self.run
+        if run.is_finalized:
+            raise ValueError('Finalized payroll runs cannot be recomputed')
+
+        started = timezone.now()
+        previous_status = run.status
+        self._claim()
+        if restart or previous_status in ('pending', 'completed'):
+            self._reset()
+
+        run.started_at = run.started_at or started
+        run.workers = self.workers
+        run.total_employees = payroll_employees(self.period).count()
+        run.save(update_fields=['started_at', 'workers', 'total_employees', 'updated_at'])
+
+        try:
+            self._load_shared_inputs()
+
+            if self.workers > 1:
+                # Forked workers must not inherit (and later close) the parent's database sockets
+                connections.close_all()
+                self.pool = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker)
+
+            while True:
+                employees = list(
+                    payroll_employees(self.period).filter(pk__gt=run.last_employee_pk)
+                    .order_by('pk').values(*EMPLOYEE_FIELDS)[:self.chunk_size]
+                )
+                if not employees:
+                    break
+                self._process_chunk(employees)
+        except PayrollRunBusy:
+            # The run was taken over - its new owner records the outcome
+            raise
+        except Exception as e:
+            run.status = 'failed'
+            run.error_message = str(e)
+            run.save(update_fields=['status', 'error_message', 'updated_at'])
+            logger.exception(f"Payroll run {run.year}-{run.month:02d} failed")
+            raise
+        finally:
+            if self.pool is not None:
+                self.pool.shutdown()
+                self.pool = None
+
+        run.status = 'completed'
+        run.completed_at = timezone.now()
+        run.save(update_fields=['status', 'completed_at', 'updated_at'])
+        logger.info(
+            f"Payroll run {run.year}-{run.month:02d}: {run.processed_employees} payslips "
+            f"on {self.workers} workers in {int((run.completed_at - started).total_seconds() * 1000)} ms"
+        )
+        return run
+
+    def _claim(self):
+        """
+        Take the run with one conditional update, so two workers can never process it
+        at once. A 'processing' run whose last chunk is older than PAYROLL_STALE_SECONDS
+        belongs to a dead worker and may be taken over.
+        """
+        run = self.run
+        stale_before = timezone.now() - timedelta(seconds=getattr(settings, 'PAYROLL_STALE_SECONDS', 900))
+        claimed = PayrollRun.objects.filter(
+            Q(status__in=CLAIMABLE_RUN_STATUSES) | Q(status='processing', updated_at__lt=stale_before), pk=run.pk
+        ).update(status='processing', error_message='', updated_at=timezone.now())
+        run.refresh_from_db()
+        if not claimed:
+            if run.is_finalized:
+                raise ValueError('Finalized payroll runs cannot be recomputed')
+            raise PayrollRunBusy('Payroll run is already being processed')
+
+    def _reset(self):
+        run = self.run
+        with transaction.atomic():
+            run.payslips.all().delete()
+            run.dirty_employees.all().delete()
+            run.last_employee_pk = 0
+            run.processed_employees = 0
+            run.total_gross_salary = 0
+            run.total_overtime_pay = 0
+            run.total_deductions = 0
+            run.total_net_salary = 0
+            run.shard_timings = []
+            run.started_at = None
+            run.completed_at = None
+            run.save()
+
+    def _load_shared_inputs(self):
+        """Inputs shared by every chunk: approved leave and advance instalments due"""
+        self.leaves = approved_leave_days(self.period.start, self.period.end, None)
+        self.advances = installments_due(self.period.start)
+
+    def _load_records(self, employee_pks) -> Dict[int, Dict[date, tuple]]:
+        """Daily (status, overtime, extra overtime) per employee for the period, one query"""
+        records: Dict[int, Dict[date, tuple]] = {pk: {} for pk in employee_pks}
+        rows = DailyAttendance.objects.filter(
+            employee_id__in=employee_pks, date__range=(self.period.start, self.period.end)
+        ).values_list('employee_id', 'date', 'status', 'overtime_hours', 'extra_overtime_hours')
+        for employee_pk, day, record_status, overtime, extra_overtime in rows:
+            records[employee_pk][day] = (record_status, overtime, extra_overtime)
+        return records
+
+    def _shard_inputs(self, employees: List[Dict[str, Any]], records) -> Dict[str, Any]:
+        """Only the records, leaves and instalments this shard's employees need"""
+        return {
+            'period': self.period,
+            'employees': employees,
+            'records': {employee['id']: records[employee['id']] for employee in employees},
+            'leaves': {employee['id']: self.leaves[employee['id']] for employee in employees if employee['id'] in self.leaves},
+            'advances': {employee['id']: self.advances[employee['id']] for employee in employees if employee['id'] in self.advances},
+        }
+
+    def _build_payslips(self, employees: List[Dict[str, Any]], results: List[Dict[str, Any]]) -> List[Payslip]:
+        employees_by_pk = {employee['id']: employee for employee in employees}
+        payslips = []
+        for result in results:
+            for employee_pk, values in result['payslips']:
+                employee = employees_by_pk[employee_pk]
+                payslips.append(Payslip(
+                    run=self.run,
+                    employee_id=employee_pk,
+                    employee_code=employee['employee_id'],
+                    employee_name=f"{employee['user__first_name']} {employee['user__last_name']}".strip(),
+                    department_name=employee['department__name'] or '',
+                    designation_name=employee['designation__name'] or '',
+                    level_of_work=employee['level_of_work'],
+                    **values
+                ))
+        return payslips
+
+    def _process_chunk(self, employees: List[Dict[str, Any]]):
+        run = self.run
+        chunk_started = time.perf_counter()
+        records = self._load_records([employee['id'] for employee in employees])
+        shards = split_shards(employees, self.workers)
+        inputs = [self._shard_inputs(shard, records) for shard in shards]
+        load_ms = round((time.perf_counter() - chunk_started) * 1000, 2)
+
+        if self.pool is not None:
+            results = list(self.pool.map(compute_shard, inputs))
+        else:
+            results = [compute_shard(shard_inputs) for shard_inputs in inputs]
+
+        # Merge the shards back into one pk-ordered batch
+        payslips = self._build_payslips(employees, results)
+        totals = payslip_totals(payslips)
+
+        chunk_index = len({timing['chunk'] for timing in run.shard_timings})
+        timings = [
+            {
+                'chunk': chunk_index,
+                'shard': index,
+                'employees': len(shard),
+                'first_employee_pk': shard[0]['id'],
+                'last_employee_pk': shard[-1]['id'],
+                'load_ms': load_ms,
+                'compute_ms': result['compute_ms'],
+                'pid': result['pid'],
+            }
+            for index, (shard, result) in enumerate(zip(shards, results))
+        ]
+
+        # Payslips, the resume cursor and the shard timings commit together. The cursor
+        # only moves from where this worker read it - if it moved, the run was taken over.
+        with transaction.atomic():
+            advanced = PayrollRun.objects.filter(
+                pk=run.pk, status='processing', last_employee_pk=run.last_employee_pk
+            ).update(
+                last_employee_pk=employees[-1]['id'],
+                processed_employees=F('processed_employees') + len(payslips),
+                shard_timings=run.shard_timings + timings,
+                updated_at=timezone.now(),
+                **{field: F(field) + amount for field, amount in totals.items()}
+            )
+            if not advanced:
+                raise PayrollRunBusy('Payroll run was taken over by another worker')
+            Payslip.objects.bulk_create(payslips)
+        run.refresh_from_db()
+
+    def recalculate_dirty(self) -> Dict[str, Any]:
+        """
+        Recompute only the payslips marked dirty since the run was computed.
+        Returns the per-employee field changes.
+        """
+        run = self.run
+        if run.status != 'completed':
+            raise ValueError('Only completed, unfinalized payroll runs can be recalculated')
+
+        marks = list(PayrollDirtyEmployee.objects.filter(run=run).values_list('id', 'employee_id', 'reason'))
+        if not marks:
+            return {'recalculated': 0, 'changes': []}
+        reasons: Dict[int, List[str]] = {}
+        for _, employee_pk, reason in marks:
+            reasons.setdefault(employee_pk, []).append(reason)
+
+        self._load_shared_inputs()
+        employees = list(
+            payroll_employees(self.period).filter(pk__in=list(reasons)).order_by('pk').values(*EMPLOYEE_FIELDS)
+        )
+        records = self._load_records([employee['id'] for employee in employees])
+        new_payslips = {
+            payslip.employee_id: payslip
+            for payslip in self._build_payslips(employees, [compute_shard(self._shard_inputs(employees, records))])
+        }
+        old_payslips = {payslip.employee_id: payslip for payslip in run.payslips.filter(employee_id__in=list(reasons))}
+
+        changes = []
+        for employee_pk in sorted(reasons):
+            before, after = old_payslips.get(employee_pk), new_payslips.get(employee_pk)
+            if before is None and after is None:
+                continue
+            diff = {
+                field: {
+                    'before': str(getattr(before, field)) if before else None,
+                    'after': str(getattr(after, field)) if after else None,
+                }
+                for field in PAYSLIP_VALUE_FIELDS
+                if (getattr(before, field) if before else None) != (getattr(after, field) if after else None)
+            }
+            if diff:
+                payslip = after or before
+                changes.append({
+                    'employee': employee_pk,
+                    'employee_code': payslip.employee_code,
+                    'employee_name': payslip.employee_name,
+                    'reasons': sorted(set(reasons[employee_pk])),
+                    'action': 'added' if before is None else 'removed' if after is None else 'updated',
+                    'changes': diff,
+                })
+
+        old_totals, new_totals = payslip_totals(old_payslips.values()), payslip_totals(new_payslips.values())
+        with transaction.atomic():
+            # finalize_payroll_run locks the same row - never rewrite a run finalized meanwhile
+            if not PayrollRun.objects.select_for_update().filter(pk=run.pk, status='completed').exists():
+                raise ValueError('Only completed, unfinalized payroll runs can be recalculated')
+            run.payslips.filter(employee_id__in=list(reasons)).delete()
+            Payslip.objects.bulk_create(new_payslips.values())
+            PayrollRun.objects.filter(pk=run.pk).update(
+                processed_employees=F('processed_employees') + len(new_payslips) - len(old_payslips),
+                total_employees=payroll_employees(self.period).count(),
+                updated_at=timezone.now(),
+                **{field: F(field) + new_totals[field] - old_totals[field] for field in new_totals}
+            )
+            # Only clear the marks we read - anything marked meanwhile stays dirty
+            PayrollDirtyEmployee.objects.filter(pk__in=[mark_pk for mark_pk, _, _ in marks]).delete()
+        run.refresh_from_db()
+
+        logger.info(f"Payroll run {run.year}-{run.month:02d}: recalculated {len(reasons)} dirty employees")
+        return {'recalculated': len(reasons), 'changes': changes}
+
+
+def run_payroll(year: int, month: int, user=None, restart: bool = False,
+                chunk_size: Optional[int] = None, workers: Optional[int] = None) -> PayrollRun:
+    """Create (or resume) the payroll run for a month and process it"""
+    start, end = month_range(year, month)
+    run, _ = PayrollRun.objects.get_or_create(
+        year=year, month=month,
+        defaults={'period_start': start, 'period_end': end, 'created_by': user}
+    )
+    return PayrollEngine(run, chunk_size, workers).process(restart=restart)
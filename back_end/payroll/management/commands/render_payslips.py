@@ -0,0 +1,44 @@
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from payroll.engine import command_workers
+from payroll.models import PayrollRun
+from payroll.payslip_pdf import PayslipRenderer
+
+
+class Command(BaseCommand):
+    help = 'Render the payslip PDFs of a payroll run into the payslip cache'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--month',
+            required=True,
+            help='Payroll month, as YYYY-MM',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            help='Worker processes (defaults to PAYROLL_WORKERS, or one per CPU)',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            month = datetime.strptime(options['month'], '%Y-%m')
+        except ValueError as e:
+            raise CommandError(f'Invalid month: {e}')
+
+        try:
+            run = PayrollRun.objects.get(year=month.year, month=month.month)
+        except PayrollRun.DoesNotExist:
+            raise CommandError(f'No payroll run for {month:%Y-%m}')
+
+        self.stdout.write(f'Rendering payslips for {month:%Y-%m}...')
+        result = PayslipRenderer(run, workers=command_workers(options['workers'])).render_all()
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{result['payslips']} payslips: {result['rendered']} rendered, {result['cached']} already cached "
+                f"on {result['workers']} workers in {result['duration_ms']} ms"
+            )
+        )
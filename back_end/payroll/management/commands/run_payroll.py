@@ -0,0 +1,58 @@
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from payroll.engine import command_workers, run_payroll
+
+
+class Command(BaseCommand):
+    help = 'Compute (or resume) the payroll run for a month'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--month',
+            required=True,
+            help='Payroll month, as YYYY-MM',
+        )
+        parser.add_argument(
+            '--restart',
+            action='store_true',
+            help='Discard earlier progress instead of resuming',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            help='Employees per chunk (defaults to PAYROLL_CHUNK_SIZE)',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            help='Worker processes (defaults to PAYROLL_WORKERS, or one per CPU)',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            month = datetime.strptime(options['month'], '%Y-%m')
+        except ValueError as e:
+            raise CommandError(f'Invalid month: {e}')
+
+        self.stdout.write(f'Running payroll for {month:%Y-%m}...')
+        try:
+            run = run_payroll(month.year, month.month, restart=options['restart'],
+                              chunk_size=options['chunk_size'], workers=command_workers(options['workers']))
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Computed {run.processed_employees} payslips: gross {run.total_gross_salary}, "
+                f"deductions {run.total_deductions}, net {run.total_net_salary}"
+            )
+        )
+
+        for timing in run.shard_timings:
+            self.stdout.write(
+                f"  chunk {timing['chunk']} shard {timing['shard']}: {timing['employees']} employees "
+                f"(pk {timing['first_employee_pk']}-{timing['last_employee_pk']}), "
+                f"load {timing['load_ms']} ms, compute {timing['compute_ms']} ms"
+            )
@@ -0,0 +1,101 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:22
+
+import django.core.validators
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('employees', '0008_employee_generated_email_employee_generated_password'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PayrollRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('year', models.PositiveIntegerField(help_text='Payroll year')),
+                ('month', models.PositiveIntegerField(help_text='Payroll month (1-12)', validators=[django.core.validators.MinValueValidator(1), django.core.validators.MaxValueValidator(12)])),
+                ('period_start', models.DateField()),
+                ('period_end', models.DateField()),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('processing', 'Processing'), ('completed', 'Completed'), ('failed', 'Failed'), ('finalized', 'Finalized')], default='pending', max_length=20)),
+                ('total_employees', models.PositiveIntegerField(default=0)),
+                ('processed_employees', models.PositiveIntegerField(default=0)),
+                ('last_employee_pk', models.BigIntegerField(default=0)),
+                ('total_gross_salary', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('total_overtime_pay', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('total_deductions', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('total_net_salary', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('error_message', models.TextField(blank=True)),
+                ('notes', models.TextField(blank=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('completed_at', models.DateTimeField(blank=True, null=True)),
+                ('finalized_at', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='created_payroll_runs', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Payroll Run',
+                'verbose_name_plural': 'Payroll Runs',
+                'db_table': 'payroll_run',
+                'ordering': ['-year', '-month'],
+                'unique_together': {('year', 'month')},
+            },
+        ),
+        migrations.CreateModel(
+            name='Payslip',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('employee_code', models.CharField(max_length=20)),
+                ('employee_name', models.CharField(max_length=200)),
+                ('department_name', models.CharField(blank=True, max_length=100)),
+                ('designation_name', models.CharField(blank=True, max_length=100)),
+                ('level_of_work', models.CharField(choices=[('worker', 'Worker'), ('staff', 'Staff')], max_length=20)),
+                ('basic_salary', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('house_rent', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('medical_allowance', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('conveyance', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('food_allowance', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('mobile_bill', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('gross_salary', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('total_days', models.PositiveIntegerField(default=0)),
+                ('present_days', models.PositiveIntegerField(default=0)),
+                ('late_days', models.PositiveIntegerField(default=0)),
+                ('absent_days', models.PositiveIntegerField(default=0)),
+                ('leave_days', models.PositiveIntegerField(default=0, help_text='Paid leave days')),
+                ('leave_without_pay_days', models.PositiveIntegerField(default=0)),
+                ('holiday_days', models.PositiveIntegerField(default=0)),
+                ('weekend_days', models.PositiveIntegerField(default=0)),
+                ('not_joined_days', models.PositiveIntegerField(default=0, help_text='Days before the joining date')),
+                ('overtime_hours', models.DecimalField(decimal_places=2, default=0, max_digits=7)),
+                ('extra_overtime_hours', models.DecimalField(decimal_places=2, default=0, max_digits=7)),
+                ('overtime_pay', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('extra_overtime_pay', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('attendance_bonus', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('absent_deduction', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('leave_without_pay_deduction', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('proration_deduction', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('total_deductions', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('net_salary', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('employee', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='payslips', to='employees.employee')),
+                ('run', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='payslips', to='payroll.payrollrun')),
+            ],
+            options={
+                'verbose_name': 'Payslip',
+                'verbose_name_plural': 'Payslips',
+                'db_table': 'payroll_payslip',
+                'ordering': ['run', 'employee_code'],
+                'indexes': [models.Index(fields=['employee', 'run'], name='payroll_pay_employe_9c5925_idx')],
+                'unique_together': {('run', 'employee')},
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payroll', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='payrollrun',
+            name='shard_timings',
+            field=models.JSONField(blank=True, default=list),
+        ),
+        migrations.AddField(
+            model_name='payrollrun',
+            name='workers',
+            field=models.PositiveSmallIntegerField(default=1),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:29
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('employees', '0008_employee_generated_email_employee_generated_password'),
+        ('payroll', '0002_payrollrun_shard_timings'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PayrollDirtyEmployee',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('reason', models.CharField(choices=[('attendance', 'Attendance Changed'), ('leave', 'Leave Changed'), ('salary', 'Salary or Employment Changed')], max_length=20)),
+                ('marked_at', models.DateTimeField(auto_now=True)),
+                ('employee', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='payroll_dirty_marks', to='employees.employee')),
+                ('run', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='dirty_employees', to='payroll.payrollrun')),
+            ],
+            options={
+                'verbose_name': 'Payroll Dirty Employee',
+                'verbose_name_plural': 'Payroll Dirty Employees',
+                'db_table': 'payroll_dirty_employee',
+                'unique_together': {('run', 'employee', 'reason')},
+            },
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:30
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('employees', '0008_employee_generated_email_employee_generated_password'),
+        ('payroll', '0003_payrolldirtyemployee'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EmployeePaymentAccount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('payment_method', models.CharField(choices=[('bank', 'Bank Transfer'), ('mobile_wallet', 'Mobile Wallet'), ('cash', 'Cash')], default='bank', max_length=20)),
+                ('account_name', models.CharField(blank=True, help_text="Defaults to the employee's name", max_length=200)),
+                ('account_number', models.CharField(blank=True, max_length=34)),
+                ('bank_name', models.CharField(blank=True, max_length=100)),
+                ('branch_name', models.CharField(blank=True, max_length=100)),
+                ('routing_number', models.CharField(blank=True, help_text='9-digit bank routing number', max_length=9)),
+                ('wallet_provider', models.CharField(blank=True, choices=[('bkash', 'bKash'), ('nagad', 'Nagad'), ('rocket', 'Rocket'), ('upay', 'Upay')], max_length=20)),
+                ('wallet_number', models.CharField(blank=True, max_length=20)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('employee', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='payment_account', to='employees.employee')),
+            ],
+            options={
+                'verbose_name': 'Employee Payment Account',
+                'verbose_name_plural': 'Employee Payment Accounts',
+                'db_table': 'payroll_employee_payment_account',
+                'indexes': [models.Index(fields=['payment_method'], name='payroll_emp_payment_9a4e74_idx')],
+            },
+        ),
+    ]
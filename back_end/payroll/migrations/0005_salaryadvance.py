@@ -0,0 +1,89 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:35
+
+import django.core.validators
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('employees', '0008_employee_generated_email_employee_generated_password'),
+        ('payroll', '0004_employeepaymentaccount'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='payslip',
+            name='advance_deduction',
+            field=models.DecimalField(decimal_places=2, default=0, help_text='Advance and loan instalments recovered', max_digits=10),
+        ),
+        migrations.AlterField(
+            model_name='payrolldirtyemployee',
+            name='reason',
+            field=models.CharField(choices=[('attendance', 'Attendance Changed'), ('leave', 'Leave Changed'), ('salary', 'Salary or Employment Changed'), ('advance', 'Advance or Loan Changed')], max_length=20),
+        ),
+        migrations.CreateModel(
+            name='SalaryAdvance',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('advance_type', models.CharField(choices=[('advance', 'Salary Advance'), ('loan', 'Loan')], default='advance', max_length=20)),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=10, validators=[django.core.validators.MinValueValidator(1)])),
+                ('reason', models.TextField()),
+                ('advance_date', models.DateField(help_text='Date the money was paid out')),
+                ('first_deduction_month', models.DateField(help_text='First day of the month the first instalment is deducted')),
+                ('installment_count', models.PositiveSmallIntegerField(default=1, help_text='Number of monthly instalments', validators=[django.core.validators.MinValueValidator(1), django.core.validators.MaxValueValidator(120)])),
+                ('status', models.CharField(choices=[('active', 'Active'), ('settled', 'Settled'), ('cancelled', 'Cancelled')], default='active', max_length=20)),
+                ('notes', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='created_salary_advances', to=settings.AUTH_USER_MODEL)),
+                ('employee', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='salary_advances', to='employees.employee')),
+            ],
+            options={
+                'verbose_name': 'Salary Advance',
+                'verbose_name_plural': 'Salary Advances',
+                'db_table': 'payroll_salary_advance',
+                'ordering': ['-advance_date', '-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='AdvanceInstallment',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sequence', models.PositiveSmallIntegerField()),
+                ('due_month', models.DateField(help_text='First day of the pay period it is deducted in')),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('status', models.CharField(choices=[('scheduled', 'Scheduled'), ('recovered', 'Recovered'), ('carried_forward', 'Partly Recovered - Remainder Carried Forward')], default='scheduled', max_length=20)),
+                ('recovered_amount', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('recovered_at', models.DateTimeField(blank=True, null=True)),
+                ('employee', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='advance_installments', to='employees.employee')),
+                ('payslip', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='advance_installments', to='payroll.payslip')),
+                ('advance', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='installments', to='payroll.salaryadvance')),
+            ],
+            options={
+                'verbose_name': 'Advance Installment',
+                'verbose_name_plural': 'Advance Installments',
+                'db_table': 'payroll_advance_installment',
+                'ordering': ['advance', 'sequence'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='salaryadvance',
+            index=models.Index(fields=['employee', 'status'], name='payroll_sal_employe_b16099_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='advanceinstallment',
+            index=models.Index(fields=['due_month', 'status', 'employee'], name='payroll_adv_due_mon_5f1292_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='advanceinstallment',
+            index=models.Index(fields=['employee', 'status', 'due_month'], name='payroll_adv_employe_22efb0_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='advanceinstallment',
+            unique_together={('advance', 'sequence')},
+        ),
+    ]
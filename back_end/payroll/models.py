@@ -0,0 +1,338 @@
+from django.db import models
+from django.core.validators import MinValueValidator, MaxValueValidator
+from employees.models import Employee
+from authentication.models import User
+
+
+class PayrollRun(models.Model):
+    """
+    Model to store one month's salary sheet computation
+    """
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('processing', 'Processing'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+        ('finalized', 'Finalized'),
+    ]
+
+    year = models.PositiveIntegerField(help_text="Payroll year")
+    month = models.PositiveIntegerField(
+        validators=[MinValueValidator(1), MaxValueValidator(12)],
+        help_text="Payroll month (1-12)"
+    )
+    period_start = models.DateField()
+    period_end = models.DateField()
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+
+    # Progress - payslips are written in employee pk order, so a failed run resumes after last_employee_pk
+    total_employees = models.PositiveIntegerField(default=0)
+    processed_employees = models.PositiveIntegerField(default=0)
+    last_employee_pk = models.BigIntegerField(default=0)
+
+    # Totals
+    total_gross_salary = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    total_overtime_pay = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    total_deductions = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    total_net_salary = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    # Parallelism - one entry per shard: chunk, shard, employees, pk range, load_ms, compute_ms, pid
+    workers = models.PositiveSmallIntegerField(default=1)
+    shard_timings = models.JSONField(default=list, blank=True)
+
+    error_message = models.TextField(blank=True)
+    notes = models.TextField(blank=True)
+    created_by = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='created_payroll_runs'
+    )
+    started_at = models.DateTimeField(null=True, blank=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+    finalized_at = models.DateTimeField(null=True, blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'payroll_run'
+        verbose_name = 'Payroll Run'
+        verbose_name_plural = 'Payroll Runs'
+        unique_together = ['year', 'month']
+        ordering = ['-year', '-month']
+
+    def __str__(self):
+        return f"Payroll {self.year}-{self.month:02d} ({self.status})"
+
+    @property
+    def is_finalized(self):
+        return self.status == 'finalized'
+
+
+class Payslip(models.Model):
+    """
+    Model to store one employee's computed salary for a payroll run
+    """
+    run = models.ForeignKey(
+        PayrollRun,
+        on_delete=models.CASCADE,
+        related_name='payslips'
+    )
+    employee = models.ForeignKey(
+        Employee,
+        on_delete=models.CASCADE,
+        related_name='payslips'
+    )
+
+    # Employee snapshot at computation time
+    employee_code = models.CharField(max_length=20)
+    employee_name = models.CharField(max_length=200)
+    department_name = models.CharField(max_length=100, blank=True)
+    designation_name = models.CharField(max_length=100, blank=True)
+    level_of_work = models.CharField(max_length=20, choices=Employee.EMPLOYEE_TYPE_CHOICES)
+
+    # Salary components
+    basic_salary = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    house_rent = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    medical_allowance = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    conveyance = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    food_allowance = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    mobile_bill = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    gross_salary = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+
+    # Attendance
+    total_days = models.PositiveIntegerField(default=0)
+    present_days = models.PositiveIntegerField(default=0)
+    late_days = models.PositiveIntegerField(default=0)
+    absent_days = models.PositiveIntegerField(default=0)
+    leave_days = models.PositiveIntegerField(default=0, help_text="Paid leave days")
+    leave_without_pay_days = models.PositiveIntegerField(default=0)
+    holiday_days = models.PositiveIntegerField(default=0)
+    weekend_days = models.PositiveIntegerField(default=0)
+    not_joined_days = models.PositiveIntegerField(default=0, help_text="Days before the joining date")
+    overtime_hours = models.DecimalField(max_digits=7, decimal_places=2, default=0)
+    extra_overtime_hours = models.DecimalField(max_digits=7, decimal_places=2, default=0)
+
+    # Earnings
+    overtime_pay = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    extra_overtime_pay = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    attendance_bonus = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+
+    # Deductions
+    absent_deduction = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    leave_without_pay_deduction = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    proration_deduction = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    advance_deduction = models.DecimalField(
+        max_digits=10, decimal_places=2, default=0, help_text="Advance and loan instalments recovered"
+    )
+    total_deductions = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+
+    net_salary = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'payroll_payslip'
+        verbose_name = 'Payslip'
+        verbose_name_plural = 'Payslips'
+        unique_together = ['run', 'employee']
+        ordering = ['run', 'employee_code']
+        indexes = [
+            models.Index(fields=['employee', 'run']),
+        ]
+
+    def __str__(self):
+        return f"{self.employee_code} - {self.run.year}-{self.run.month:02d}"
+
+
+class EmployeePaymentAccount(models.Model):
+    """
+    Model to store where an employee's salary is disbursed
+    """
+    PAYMENT_METHOD_CHOICES = [
+        ('bank', 'Bank Transfer'),
+        ('mobile_wallet', 'Mobile Wallet'),
+        ('cash', 'Cash'),
+    ]
+
+    WALLET_PROVIDER_CHOICES = [
+        ('bkash', 'bKash'),
+        ('nagad', 'Nagad'),
+        ('rocket', 'Rocket'),
+        ('upay', 'Upay'),
+    ]
+
+    employee = models.OneToOneField(
+        Employee,
+        on_delete=models.CASCADE,
+        related_name='payment_account'
+    )
+    payment_method = models.CharField(max_length=20, choices=PAYMENT_METHOD_CHOICES, default='bank')
+
+    # Bank transfer
+    account_name = models.CharField(max_length=200, blank=True, help_text="Defaults to the employee's name")
+    account_number = models.CharField(max_length=34, blank=True)
+    bank_name = models.CharField(max_length=100, blank=True)
+    branch_name = models.CharField(max_length=100, blank=True)
+    routing_number = models.CharField(max_length=9, blank=True, help_text="9-digit bank routing number")
+
+    # Mobile wallet
+    wallet_provider = models.CharField(max_length=20, choices=WALLET_PROVIDER_CHOICES, blank=True)
+    wallet_number = models.CharField(max_length=20, blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'payroll_employee_payment_account'
+        verbose_name = 'Employee Payment Account'
+        verbose_name_plural = 'Employee Payment Accounts'
+        indexes = [
+            models.Index(fields=['payment_method']),
+        ]
+
+    def __str__(self):
+        return f"{self.employee.employee_id} - {self.get_payment_method_display()}"
+
+
+class PayrollDirtyEmployee(models.Model):
+    """
+    Model to store employees whose payslip in an unfinalized run is out of date
+    """
+    REASON_CHOICES = [
+        ('attendance', 'Attendance Changed'),
+        ('leave', 'Leave Changed'),
+        ('salary', 'Salary or Employment Changed'),
+        ('advance', 'Advance or Loan Changed'),
+    ]
+
+    run = models.ForeignKey(
+        PayrollRun,
+        on_delete=models.CASCADE,
+        related_name='dirty_employees'
+    )
+    employee = models.ForeignKey(
+        Employee,
+        on_delete=models.CASCADE,
+        related_name='payroll_dirty_marks'
+    )
+    reason = models.CharField(max_length=20, choices=REASON_CHOICES)
+    marked_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'payroll_dirty_employee'
+        verbose_name = 'Payroll Dirty Employee'
+        verbose_name_plural = 'Payroll Dirty Employees'
+        unique_together = ['run', 'employee', 'reason']
+
+    def __str__(self):
+        return f"{self.employee_id} - run {self.run_id} ({self.reason})"
+
+
+class SalaryAdvance(models.Model):
+    """
+    Model to store a salary advance or loan recovered from payroll in instalments
+    """
+    ADVANCE_TYPE_CHOICES = [
+        ('advance', 'Salary Advance'),
+        ('loan', 'Loan'),
+    ]
+
+    STATUS_CHOICES = [
+        ('active', 'Active'),
+        ('settled', 'Settled'),
+        ('cancelled', 'Cancelled'),
+    ]
+
+    employee = models.ForeignKey(
+        Employee,
+        on_delete=models.CASCADE,
+        related_name='salary_advances'
+    )
+    advance_type = models.CharField(max_length=20, choices=ADVANCE_TYPE_CHOICES, default='advance')
+    amount = models.DecimalField(max_digits=10, decimal_places=2, validators=[MinValueValidator(1)])
+    reason = models.TextField()
+    advance_date = models.DateField(help_text="Date the money was paid out")
+    first_deduction_month = models.DateField(help_text="First day of the month the first instalment is deducted")
+    installment_count = models.PositiveSmallIntegerField(
+        default=1,
+        validators=[MinValueValidator(1), MaxValueValidator(120)],
+        help_text="Number of monthly instalments"
+    )
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='active')
+    notes = models.TextField(blank=True)
+    created_by = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='created_salary_advances'
+    )
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'payroll_salary_advance'
+        verbose_name = 'Salary Advance'
+        verbose_name_plural = 'Salary Advances'
+        ordering = ['-advance_date', '-created_at']
+        indexes = [
+            models.Index(fields=['employee', 'status']),
+        ]
+
+    def __str__(self):
+        return f"{self.employee.employee_id} - {self.get_advance_type_display()} {self.amount}"
+
+
+class AdvanceInstallment(models.Model):
+    """
+    Model to store one scheduled monthly recovery of a salary advance or loan
+    """
+    STATUS_CHOICES = [
+        ('scheduled', 'Scheduled'),
+        ('recovered', 'Recovered'),
+        ('carried_forward', 'Partly Recovered - Remainder Carried Forward'),
+    ]
+
+    advance = models.ForeignKey(
+        SalaryAdvance,
+        on_delete=models.CASCADE,
+        related_name='installments'
+    )
+    # Denormalized from the advance so a pay period's deductions are one indexed query
+    employee = models.ForeignKey(
+        Employee,
+        on_delete=models.CASCADE,
+        related_name='advance_installments'
+    )
+    sequence = models.PositiveSmallIntegerField()
+    due_month = models.DateField(help_text="First day of the pay period it is deducted in")
+    amount = models.DecimalField(max_digits=10, decimal_places=2)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='scheduled')
+    recovered_amount = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    payslip = models.ForeignKey(
+        Payslip,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='advance_installments'
+    )
+    recovered_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'payroll_advance_installment'
+        verbose_name = 'Advance Installment'
+        verbose_name_plural = 'Advance Installments'
+        unique_together = ['advance', 'sequence']
+        ordering = ['advance', 'sequence']
+        indexes = [
+            models.Index(fields=['due_month', 'status', 'employee']),
+            models.Index(fields=['employee', 'status', 'due_month']),
+        ]
+
+    def __str__(self):
+        return f"{self.advance_id} #{self.sequence} - {self.due_month:%Y-%m} ({self.status})"
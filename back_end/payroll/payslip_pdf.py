@@ -0,0 +1,326 @@
+"""
+Payslip PDF rendering
+Renders a payroll run's payslips across a process pool into a content-addressed cache
+under MEDIA_ROOT: a payslip's file name is the hash of everything printed on it, so
+re-downloads are served from disk and any change to the payslip renders a new file.
+"""
+
+import calendar
+import hashlib
+import json
+import os
+import tempfile
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple, Any
+
+from django.conf import settings
+from django.db import connections
+from django.utils import timezone
+
+from .engine import SALARY_COMPONENTS, _init_worker
+from .models import Payslip
+from .pdf import PdfCanvas
+
+# Bump whenever the layout changes so cached files are re-rendered
+PAYSLIP_TEMPLATE_VERSION = 2
+
+PAYSLIP_CACHE_DIR = 'payslips'
+RENDER_BATCH_SIZE = 50
+PAYSLIP_QUERY_CHUNK_SIZE = 2000
+
+PAYSLIP_PDF_FIELDS = (
+    'employee_code', 'employee_name', 'department_name', 'designation_name', 'level_of_work',
+    *(component[0] for component in SALARY_COMPONENTS), 'gross_salary',
+    'total_days', 'present_days', 'late_days', 'absent_days', 'leave_days', 'leave_without_pay_days',
+    'holiday_days', 'weekend_days', 'not_joined_days', 'overtime_hours', 'extra_overtime_hours',
+    'overtime_pay', 'extra_overtime_pay', 'attendance_bonus',
+    'absent_deduction', 'leave_without_pay_deduction', 'proration_deduction', 'advance_deduction', 'total_deductions',
+    'net_salary',
+)
+
+EARNING_LINES = [
+    ('basic_salary', 'Basic Salary'),
+    ('house_rent', 'House Rent'),
+    ('medical_allowance', 'Medical Allowance'),
+    ('conveyance', 'Conveyance'),
+    ('food_allowance', 'Food Allowance'),
+    ('mobile_bill', 'Mobile Bill'),
+    ('gross_salary', 'Gross Salary'),
+    ('overtime_pay', 'Overtime Pay'),
+    ('extra_overtime_pay', 'Extra Overtime Pay'),
+    ('attendance_bonus', 'Attendance Bonus'),
+]
+
+DEDUCTION_LINES = [
+    ('absent_deduction', 'Absent Deduction'),
+    ('leave_without_pay_deduction', 'Leave Without Pay'),
+    ('proration_deduction', 'Proration (Joined Mid-Month)'),
+    ('advance_deduction', 'Advance / Loan Instalment'),
+]
+
+ATTENDANCE_LINES = [
+    ('total_days', 'Days in Month'),
+    ('present_days', 'Present'),
+    ('late_days', 'Late'),
+    ('absent_days', 'Absent'),
+    ('leave_days', 'Paid Leave'),
+    ('leave_without_pay_days', 'Leave Without Pay'),
+    ('holiday_days', 'Holidays'),
+    ('weekend_days', 'Weekends'),
+    ('not_joined_days', 'Before Joining'),
+    ('overtime_hours', 'Overtime Hours'),
+    ('extra_overtime_hours', 'Extra Overtime Hours'),
+]
+
+
+def _money(amount) -> str:
+    return f"Tk {amount:,.2f}"
+
+
+def payslip_document(run, values: Dict[str, Any]) -> Dict[str, Any]:
+    """Everything printed on one payslip, as plain picklable data"""
+    return {
+        **values,
+        'company': getattr(settings, 'PAYROLL_COMPANY_NAME', ''),
+        'period': f"{calendar.month_name[run.month]} {run.year}",
+    }
+
+
+def payslip_cache_key(document: Dict[str, Any]) -> str:
+    """sha256 over the canonical document plus the template version"""
+    canonical = json.dumps(document, sort_keys=True, default=str, separators=(',', ':'))
+    return hashlib.sha256(f"v{PAYSLIP_TEMPLATE_VERSION}:{canonical}".encode()).hexdigest()
+
+
+def payslip_cache_path(key: str, media_root=None) -> Path:
+    return Path(media_root or settings.MEDIA_ROOT) / PAYSLIP_CACHE_DIR / key[:2] / f"{key}.pdf"
+
+
+def draw_payslip(document: Dict[str, Any]) -> bytes:
+    """Lay out one A4 payslip"""
+    pdf = PdfCanvas()
+    left, right, middle = 40, 555, 297
+
+    pdf.text(left, 60, document['company'], size=16, bold=True)
+    pdf.text(left, 80, f"Payslip - {document['period']}", size=11)
+    pdf.text(right, 56, 'Net Salary', size=9, align='right')
+    pdf.text(right, 76, _money(document['net_salary']), size=15, bold=True, align='right')
+    pdf.line(left, 95, right, 95, width=1)
+
+    # Employee information
+    details = [
+        ('Employee ID', document['employee_code']),
+        ('Name', document['employee_name']),
+        ('Designation', document['designation_name'] or '-'),
+        ('Department', document['department_name'] or '-'),
+        ('Level of Work', str(document['level_of_work']).replace('_', ' ').title()),
+        ('Month', document['period']),
+    ]
+    pdf.text(left, 120, 'Employee Information', size=11, bold=True)
+    for index, (label, value) in enumerate(details):
+        x = left if index % 2 == 0 else middle + 8
+        y = 140 + (index // 2) * 18
+        pdf.text(x, y, label, size=8)
+        pdf.text(x + 80, y, value, size=10)
+
+    # Attendance
+    pdf.text(left, 210, 'Attendance Summary', size=11, bold=True)
+    for index, (field, label) in enumerate(ATTENDANCE_LINES):
+        x = left + (index % 3) * 172
+        y = 230 + (index // 3) * 16
+        pdf.text(x, y, label, size=8)
+        pdf.text(x + 160, y, document[field], size=9, align='right')
+
+    # Earnings and deductions side by side
+    top = 310
+    pdf.rect(left, top - 13, right - left, 18)
+    pdf.text(left + 6, top, 'Earnings', size=10, bold=True)
+    pdf.text(middle + 14, top, 'Deductions', size=10, bold=True)
+    for index, (field, label) in enumerate(EARNING_LINES):
+        y = top + 22 + index * 17
+        bold = field == 'gross_salary'
+        pdf.text(left + 6, y, label, size=9, bold=bold)
+        pdf.text(middle - 8, y, _money(document[field]), size=9, bold=bold, align='right')
+    for index, (field, label) in enumerate(DEDUCTION_LINES):
+        y = top + 22 + index * 17
+        pdf.text(middle + 14, y, label, size=9)
+        pdf.text(right - 6, y, _money(document[field]), size=9, align='right')
+    total_y = top + 22 + len(DEDUCTION_LINES) * 17
+    pdf.line(middle + 14, total_y - 11, right - 6, total_y - 11, gray=0.6)
+    pdf.text(middle + 14, total_y, 'Total Deductions', size=9, bold=True)
+    pdf.text(right - 6, total_y, _money(document['total_deductions']), size=9, bold=True, align='right')
+    pdf.line(middle + 3, top - 13, middle + 3, top + 22 + len(EARNING_LINES) * 17 - 8, gray=0.8)
+
+    # Net pay
+    net_y = top + 32 + len(EARNING_LINES) * 17
+    pdf.rect(left, net_y - 15, right - left, 24, fill_gray=0.85)
+    pdf.text(left + 6, net_y, 'Net Payable Salary', size=12, bold=True)
+    pdf.text(right - 6, net_y, _money(document['net_salary']), size=12, bold=True, align='right')
+
+    pdf.line(left, 800, right, 800, gray=0.7)
+    pdf.text(left, 814, 'This is a computer generated payslip and does not require a signature.', size=7)
+    return pdf.render()
+
+
+def render_to_cache(document: Dict[str, Any], media_root=None) -> Tuple[str, Path, bool]:
+    """Render a payslip unless its file already exists; returns (key, path, rendered)"""
+    key = payslip_cache_key(document)
+    path = payslip_cache_path(key, media_root)
+    if path.exists():
+        return key, path, False
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # Write beside the target then rename, so readers never see a partial file
+    with tempfile.NamedTemporaryFile(dir=path.parent, suffix='.tmp', delete=False) as partial:
+        partial.write(draw_payslip(document))
+    os.chmod(partial.name, 0o644)
+    os.replace(partial.name, path)
+    return key, path, True
+
+
+def render_batch(batch: Dict[str, Any]) -> List[Tuple[str, str, bool]]:
+    """Render a batch of payslips. Runs in a worker process and never touches the ORM."""
+    results = []
+    for document in batch['documents']:
+        _, path, rendered = render_to_cache(document, batch['media_root'])
+        results.append((document['employee_code'], str(path), rendered))
+    return results
+
+
+def payslip_pdf(payslip) -> Tuple[str, Path]:
+    """Cached PDF for a single payslip, rendered inline on a miss; returns (key, path)"""
+    values = {field: getattr(payslip, field) for field in PAYSLIP_PDF_FIELDS}
+    key, path, _ = render_to_cache(payslip_document(payslip.run, values))
+    return key, path
+
+
+def run_payslip_documents(run) -> Iterator[Dict[str, Any]]:
+    rows = Payslip.objects.filter(run=run).order_by('employee_code').values(*PAYSLIP_PDF_FIELDS)
+    for values in rows.iterator(chunk_size=PAYSLIP_QUERY_CHUNK_SIZE):
+        yield payslip_document(run, values)
+
+
+class PayslipRenderer:
+    """
+    Renders a run's payslips, yielding each file as soon as it exists. Inline by
+    default; more than one worker renders on a process pool.
+    """
+
+    def __init__(self, run, workers: Optional[int] = None):
+        self.run = run
+        self.workers = max(1, workers or 1)
+        self.media_root = str(settings.MEDIA_ROOT)
+        self.rendered = 0
+        self.cached = 0
+
+    def iter_files(self) -> Iterator[Tuple[str, str]]:
+        """(employee_code, path) pairs - cache hits straight away, renders in completion order"""
+        pool, pending, batch = None, set(), []
+        if self.workers > 1:
+            # Forked workers must not inherit (and later close) the parent's database sockets
+            connections.close_all()
+            pool = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker)
+
+        try:
+            for document in run_payslip_documents(self.run):
+                path = payslip_cache_path(payslip_cache_key(document), self.media_root)
+                if path.exists():
+                    self.cached += 1
+                    yield document['employee_code'], str(path)
+                    continue
+
+                batch.append(document)
+                if len(batch) < RENDER_BATCH_SIZE:
+                    continue
+                if pool is None:
+                    yield from self._collect(render_batch(self._task(batch)))
+                else:
+                    pending.add(pool.submit(render_batch, self._task(batch)))
+                    # Bound the in-flight work so memory stays flat on large runs
+                    block = len(pending) >= self.workers * 2
+                    done, pending = wait(pending, timeout=None if block else 0, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        yield from self._collect(future.result())
+                batch = []
+
+            if batch:
+                if pool is None:
+                    yield from self._collect(render_batch(self._task(batch)))
+                else:
+                    pending.add(pool.submit(render_batch, self._task(batch)))
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield from self._collect(future.result())
+        finally:
+            if pool is not None:
+                pool.shutdown(cancel_futures=True)
+
+    def render_all(self) -> Dict[str, Any]:
+        """Warm the cache for the whole run"""
+        started = time.perf_counter()
+        files = sum(1 for _ in self.iter_files())
+        return {
+            'payslips': files,
+            'rendered': self.rendered,
+            'cached': self.cached,
+            'workers': self.workers,
+            'duration_ms': round((time.perf_counter() - started) * 1000, 2),
+        }
+
+    def _task(self, documents: List[Dict[str, Any]]) -> Dict[str, Any]:
+        return {'documents': documents, 'media_root': self.media_root}
+
+    def _collect(self, results) -> Iterator[Tuple[str, str]]:
+        for employee_code, path, rendered in results:
+            if rendered:
+                self.rendered += 1
+            else:
+                # Another request rendered it first
+                self.cached += 1
+            yield employee_code, path
+
+
+class _ZipStream:
+    """Write-only, non-seekable zip target whose bytes are drained after every member"""
+
+    def __init__(self):
+        self._chunks = []
+        self._offset = 0
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._offset += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._offset
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data, self._chunks = b''.join(self._chunks), []
+        return data
+
+
+def payslip_archive_name(run) -> str:
+    return f"payslips-{run.year}-{run.month:02d}"
+
+
+def stream_payslip_zip(run, workers: Optional[int] = None) -> Iterator[bytes]:
+    """Zip of every payslip in the run, streamed member by member as files are produced"""
+    folder = payslip_archive_name(run)
+    date_time = timezone.localtime().timetuple()[:6]
+    stream = _ZipStream()
+    with zipfile.ZipFile(stream, mode='w', compression=zipfile.ZIP_DEFLATED) as archive:
+        for employee_code, path in PayslipRenderer(run, workers=workers).iter_files():
+            member = zipfile.ZipInfo(f"{folder}/{employee_code}.pdf", date_time=date_time)
+            member.compress_type = zipfile.ZIP_DEFLATED
+            with open(path, 'rb') as source:
+                archive.writestr(member, source.read())
+            yield stream.drain()
+    yield stream.drain()
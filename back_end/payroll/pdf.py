@@ -0,0 +1,81 @@
+"""
+Minimal single-page PDF writer
+Text and rules in the built-in Helvetica fonts - enough for payslips without a PDF
+dependency. Output is byte-for-byte deterministic for the same drawing calls.
+"""
+
+from typing import List
+
+A4_WIDTH, A4_HEIGHT = 595, 842
+
+FONTS = {
+    'regular': ('F1', 'Helvetica'),
+    'bold': ('F2', 'Helvetica-Bold'),
+}
+
+# Standard 14 fonts only cover WinAnsi (latin-1 close enough for names and amounts)
+ENCODING = 'latin-1'
+
+
+def _escape(text: str) -> str:
+    text = str(text).encode(ENCODING, 'replace').decode(ENCODING)
+    return text.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+
+
+def text_width(text: str, size: float) -> float:
+    """Approximate Helvetica advance width (average glyph ~0.5em, digits 0.556em)"""
+    return sum(0.556 if ch.isdigit() else 0.5 for ch in str(text)) * size
+
+
+class PdfCanvas:
+    """Collects drawing operations for one page, top-left origin"""
+
+    def __init__(self, width: int = A4_WIDTH, height: int = A4_HEIGHT):
+        self.width = width
+        self.height = height
+        self._ops: List[str] = []
+
+    def text(self, x: float, y: float, value, size: float = 10, bold: bool = False, align: str = 'left'):
+        if align == 'right':
+            x -= text_width(value, size)
+        elif align == 'center':
+            x -= text_width(value, size) / 2
+        font = FONTS['bold' if bold else 'regular'][0]
+        self._ops.append(f"BT /{font} {size:g} Tf {x:.2f} {self.height - y:.2f} Td ({_escape(value)}) Tj ET")
+
+    def line(self, x1: float, y1: float, x2: float, y2: float, width: float = 0.5, gray: float = 0):
+        self._ops.append(
+            f"{gray:g} G {width:g} w {x1:.2f} {self.height - y1:.2f} m {x2:.2f} {self.height - y2:.2f} l S"
+        )
+
+    def rect(self, x: float, y: float, w: float, h: float, fill_gray: float = 0.93):
+        self._ops.append(f"{fill_gray:g} g {x:.2f} {self.height - y - h:.2f} {w:.2f} {h:.2f} re f 0 g")
+
+    def render(self) -> bytes:
+        content = '\n'.join(self._ops).encode(ENCODING)
+        objects = [
+            b'<< /Type /Catalog /Pages 2 0 R >>',
+            b'<< /Type /Pages /Kids [3 0 R] /Count 1 >>',
+            (
+                f'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {self.width} {self.height}] '
+                f'/Resources << /Font << /F1 5 0 R /F2 6 0 R >> >> /Contents 4 0 R >>'
+            ).encode(),
+            b'<< /Length ' + str(len(content)).encode() + b' >>\nstream\n' + content + b'\nendstream',
+        ]
+        for _, base_font in FONTS.values():
+            objects.append(
+                f'<< /Type /Font /Subtype /Type1 /BaseFont /{base_font} /Encoding /WinAnsiEncoding >>'.encode()
+            )
+
+        out = bytearray(b'%PDF-1.4\n')
+        offsets = []
+        for number, body in enumerate(objects, start=1):
+            offsets.append(len(out))
+            out += f'{number} 0 obj\n'.encode() + body + b'\nendobj\n'
+
+        xref = len(out)
+        out += f'xref\n0 {len(objects) + 1}\n0000000000 65535 f \n'.encode()
+        for offset in offsets:
+            out += f'{offset:010d} 00000 n \n'.encode()
+        out += f'trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n'.encode()
+        return bytes(out)
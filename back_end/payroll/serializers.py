@@ -0,0 +1,179 @@
+from decimal import Decimal
+
+from rest_framework import serializers
+from django.db import transaction
+from .models import (
+    PayrollRun, Payslip, PayrollDirtyEmployee, EmployeePaymentAccount, SalaryAdvance, AdvanceInstallment
+)
+from .advances import has_recoveries, schedule_installments
+from .dirty import mark_employee_dirty_in_open_runs
+
+
+class PayrollRunSerializer(serializers.ModelSerializer):
+    created_by_name = serializers.CharField(source='created_by.full_name', read_only=True)
+    status_display = serializers.CharField(source='get_status_display', read_only=True)
+    dirty_employees = serializers.IntegerField(source='dirty_count', read_only=True, default=0)
+    
+    class Meta:
+        model = PayrollRun
+        fields = [
+            'id', 'year', 'month', 'period_start', 'period_end', 'status', 'status_display',
+            'total_employees', 'processed_employees', 'total_gross_salary', 'total_overtime_pay',
+            'total_deductions', 'total_net_salary', 'workers', 'shard_timings',
+            'dirty_employees', 'error_message', 'notes', 'created_by', 'created_by_name', 'started_at', 'completed_at', 'finalized_at',
+            'created_at', 'updated_at'
+        ]
+        read_only_fields = [
+            'id', 'period_start', 'period_end', 'status', 'total_employees', 'processed_employees',
+            'total_gross_salary', 'total_overtime_pay', 'total_deductions', 'total_net_salary',
+            'workers', 'shard_timings', 'error_message', 'created_by', 'started_at', 'completed_at', 'finalized_at',
+            'created_at', 'updated_at'
+        ]
+    
+    def validate_month(self, value):
+        if not 1 <= value <= 12:
+            raise serializers.ValidationError("Month must be between 1 and 12")
+        return value
+
+
+class PayslipSerializer(serializers.ModelSerializer):
+    year = serializers.IntegerField(source='run.year', read_only=True)
+    month = serializers.IntegerField(source='run.month', read_only=True)
+    
+    class Meta:
+        model = Payslip
+        fields = [
+            'id', 'run', 'year', 'month', 'employee', 'employee_code', 'employee_name',
+            'department_name', 'designation_name', 'level_of_work',
+            'basic_salary', 'house_rent', 'medical_allowance', 'conveyance', 'food_allowance',
+            'mobile_bill', 'gross_salary',
+            'total_days', 'present_days', 'late_days', 'absent_days', 'leave_days',
+            'leave_without_pay_days', 'holiday_days', 'weekend_days', 'not_joined_days',
+            'overtime_hours', 'extra_overtime_hours', 'overtime_pay', 'extra_overtime_pay',
+            'attendance_bonus', 'absent_deduction', 'leave_without_pay_deduction',
+            'proration_deduction', 'advance_deduction', 'total_deductions', 'net_salary', 'created_at', 'updated_at'
+        ]
+        read_only_fields = fields
+
+
+class PayrollDirtyEmployeeSerializer(serializers.ModelSerializer):
+    employee_id = serializers.CharField(source='employee.employee_id', read_only=True)
+    employee_name = serializers.CharField(source='employee.user.full_name', read_only=True)
+    reason_display = serializers.CharField(source='get_reason_display', read_only=True)
+    
+    class Meta:
+        model = PayrollDirtyEmployee
+        fields = ['id', 'run', 'employee', 'employee_id', 'employee_name', 'reason', 'reason_display', 'marked_at']
+        read_only_fields = fields
+
+
+class EmployeePaymentAccountSerializer(serializers.ModelSerializer):
+    employee_id = serializers.CharField(source='employee.employee_id', read_only=True)
+    employee_name = serializers.CharField(source='employee.user.full_name', read_only=True)
+    payment_method_display = serializers.CharField(source='get_payment_method_display', read_only=True)
+    
+    class Meta:
+        model = EmployeePaymentAccount
+        fields = [
+            'id', 'employee', 'employee_id', 'employee_name', 'payment_method', 'payment_method_display',
+            'account_name', 'account_number', 'bank_name', 'branch_name', 'routing_number',
+            'wallet_provider', 'wallet_number', 'created_at', 'updated_at'
+        ]
+        read_only_fields = ['id', 'created_at', 'updated_at']
+    
+    def validate(self, data):
+        method = data.get('payment_method', getattr(self.instance, 'payment_method', 'bank'))
+        merged = {**({} if self.instance is None else {
+            'account_number': self.instance.account_number, 'wallet_number': self.instance.wallet_number
+        }), **data}
+        if method == 'bank' and not merged.get('account_number'):
+            raise serializers.ValidationError("Account number is required for bank transfers")
+        if method == 'mobile_wallet' and not merged.get('wallet_number'):
+            raise serializers.ValidationError("Wallet number is required for mobile wallet payments")
+        return data
+
+
+class AdvanceInstallmentSerializer(serializers.ModelSerializer):
+    status_display = serializers.CharField(source='get_status_display', read_only=True)
+    
+    class Meta:
+        model = AdvanceInstallment
+        fields = [
+            'id', 'sequence', 'due_month', 'amount', 'status', 'status_display',
+            'recovered_amount', 'payslip', 'recovered_at'
+        ]
+        read_only_fields = fields
+
+
+class SalaryAdvanceSerializer(serializers.ModelSerializer):
+    employee_id = serializers.CharField(source='employee.employee_id', read_only=True)
+    employee_name = serializers.CharField(source='employee.user.full_name', read_only=True)
+    department_name = serializers.CharField(source='employee.department.name', read_only=True)
+    advance_type_display = serializers.CharField(source='get_advance_type_display', read_only=True)
+    status_display = serializers.CharField(source='get_status_display', read_only=True)
+    created_by_name = serializers.CharField(source='created_by.full_name', read_only=True)
+    recovered_amount = serializers.SerializerMethodField()
+    outstanding_amount = serializers.SerializerMethodField()
+    installments = AdvanceInstallmentSerializer(many=True, read_only=True)
+    
+    # Changing any of these rebuilds the instalment schedule
+    SCHEDULE_FIELDS = ('employee', 'amount', 'first_deduction_month', 'installment_count')
+    
+    class Meta:
+        model = SalaryAdvance
+        fields = [
+            'id', 'employee', 'employee_id', 'employee_name', 'department_name', 'advance_type',
+            'advance_type_display', 'amount', 'reason', 'advance_date', 'first_deduction_month',
+            'installment_count', 'status', 'status_display', 'recovered_amount', 'outstanding_amount',
+            'installments', 'notes', 'created_by', 'created_by_name', 'created_at', 'updated_at'
+        ]
+        read_only_fields = ['id', 'created_by', 'created_at', 'updated_at']
+    
+    def get_recovered_amount(self, obj):
+        return str(sum((i.recovered_amount for i in obj.installments.all()), Decimal('0')))
+    
+    def get_outstanding_amount(self, obj):
+        if obj.status != 'active':
+            return '0.00'
+        return str(sum((i.amount for i in obj.installments.all() if i.status == 'scheduled'), Decimal('0')))
+    
+    def validate_first_deduction_month(self, value):
+        return value.replace(day=1)
+    
+    def validate_status(self, value):
+        if value == 'settled' and (self.instance is None or self.instance.status != 'settled'):
+            raise serializers.ValidationError("Advances are settled by payroll recovery, not by hand")
+        return value
+    
+    def validate(self, data):
+        if self.instance is not None and has_recoveries(self.instance):
+            changed = [
+                field for field in self.SCHEDULE_FIELDS
+                if field in data and data[field] != getattr(self.instance, field)
+            ]
+            if changed:
+                raise serializers.ValidationError(
+                    f"Cannot change {', '.join(changed)} once instalments have been recovered"
+                )
+        return data
+    
+    def create(self, validated_data):
+        with transaction.atomic():
+            advance = super().create(validated_data)
+            schedule_installments(advance)
+        return advance
+    
+    def update(self, instance, validated_data):
+        reschedule = any(
+            field in validated_data and validated_data[field] != getattr(instance, field)
+            for field in self.SCHEDULE_FIELDS
+        )
+        status_changed = 'status' in validated_data and validated_data['status'] != instance.status
+        with transaction.atomic():
+            advance = super().update(instance, validated_data)
+            if reschedule:
+                schedule_installments(advance)
+            elif status_changed:
+                # Cancelling (or reinstating) changes what the open runs deduct
+                mark_employee_dirty_in_open_runs(advance.employee_id, 'advance')
+        return advance
@@ -0,0 +1,71 @@
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+from attendance.models import DailyAttendance, LeaveRequest
+from attendance.signals import daily_attendance_bulk_changed
+from employees.models import Employee, SalaryGrade
+from employees.signals import salary_grade_revised
+from .dirty import (
+    mark_payroll_dirty, mark_employee_dirty_in_open_runs, mark_employees_dirty_in_open_runs, months_between
+)
+
+# Employee fields that change what a payslip computes to
+PAYROLL_EMPLOYEE_FIELDS = (
+    'salary_components', 'gross_salary', 'salary_grade_id', 'level_of_work',
+    'status', 'date_of_joining', 'off_day'
+)
+
+
+@receiver(post_save, sender=DailyAttendance)
+@receiver(post_delete, sender=DailyAttendance)
+def daily_attendance_changed(sender, instance, **kwargs):
+    """An edited (or scanned) day makes that month's payslip stale"""
+    mark_payroll_dirty([(instance.employee_id, instance.date.year, instance.date.month)], 'attendance')
+
+
+@receiver(daily_attendance_bulk_changed)
+def daily_attendance_bulk_changed_handler(sender, keys, **kwargs):
+    """Same as above for the bulk write paths"""
+    mark_payroll_dirty(((employee_pk, day.year, day.month) for employee_pk, day in keys), 'attendance')
+
+
+@receiver(post_save, sender=LeaveRequest)
+@receiver(post_delete, sender=LeaveRequest)
+def leave_request_changed(sender, instance, **kwargs):
+    """Approving or cancelling leave changes every month the request spans"""
+    mark_payroll_dirty(
+        ((instance.employee_id, year, month) for year, month in months_between(instance.start_date, instance.end_date)),
+        'leave'
+    )
+
+
+@receiver(pre_save, sender=Employee)
+def employee_payroll_fields_before(sender, instance, **kwargs):
+    """Remember the payroll-relevant fields so post_save can tell whether they changed"""
+    if instance.pk:
+        instance._payroll_fields_before = Employee.objects.filter(pk=instance.pk).values_list(
+            *PAYROLL_EMPLOYEE_FIELDS
+        ).first()
+
+
+@receiver(post_save, sender=Employee)
+def employee_payroll_fields_changed(sender, instance, created, **kwargs):
+    """New hires and salary/employment changes affect every open run"""
+    before = getattr(instance, '_payroll_fields_before', None)
+    after = tuple(getattr(instance, field) for field in PAYROLL_EMPLOYEE_FIELDS)
+    if created or before is None or tuple(before) != after:
+        mark_employee_dirty_in_open_runs(instance.pk, 'salary')
+
+
+@receiver(post_save, sender=SalaryGrade)
+def salary_grade_changed(sender, instance, created, **kwargs):
+    """A revised grade changes the pay of everyone paid on it (their snapshots refresh in bulk)"""
+    if not created:
+        mark_employees_dirty_in_open_runs(
+            instance.employee_set.filter(salary_source='grade').values_list('id', flat=True), 'salary'
+        )
+
+
+@receiver(salary_grade_revised)
+def salary_grade_revised_handler(sender, revision, employee_pks, **kwargs):
+    """A grade revision changes pay from its effective month onwards"""
+    mark_employees_dirty_in_open_runs(employee_pks, 'salary', since=revision.effective_date)
@@ -0,0 +1,464 @@
+import os
+from datetime import date, timedelta
+from decimal import Decimal
+from unittest import mock
+
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from attendance.models import DailyAttendance
+from authentication.models import User
+from employees.models import Department, Designation, Employee
+
+from .advances import installments_due, recover_advance_installments, schedule_installments
+from .engine import PayPeriod, PayrollEngine, PayrollRunBusy, compute_payslip, run_payroll
+from .models import AdvanceInstallment, EmployeePaymentAccount, PayrollDirtyEmployee, PayrollRun, Payslip, SalaryAdvance
+
+TOTAL_FIELDS = ('processed_employees', 'total_gross_salary', 'total_overtime_pay', 'total_deductions', 'total_net_salary')
+
+SEPTEMBER = PayPeriod(
+    year=2026, month=9, start=date(2026, 9, 1), end=date(2026, 9, 30), counted_until=date(2026, 9, 30),
+    holidays=frozenset(), weekend_days=frozenset({5}), attendance_bonus=Decimal('775'),
+)
+# Fridays are the off day, leaving 26 working days
+WORKING_DAYS = [
+    date(2026, 9, day) for day in range(1, 31) if date(2026, 9, day).weekday() != 4
+]
+
+
+def salary_employee(**fields):
+    employee = {
+        'level_of_work': 'worker', 'off_day': 'Friday', 'date_of_joining': date(2025, 1, 1),
+        'effective_basic_salary': Decimal('6000'), 'effective_house_rent': Decimal('3000'),
+        'effective_medical_allowance': Decimal('600'), 'effective_conveyance': Decimal('200'),
+        'effective_food_allowance': Decimal('200'), 'effective_mobile_bill': Decimal('0'),
+        'effective_gross_salary': Decimal('10000'),
+    }
+    employee.update(fields)
+    return employee
+
+
+def present(days, record_status='Present-OnTime', overtime=0):
+    return {day: (record_status, Decimal(overtime), Decimal('0')) for day in days}
+
+
+class ComputePayslipTests(SimpleTestCase):
+    def test_full_attendance_worker_gets_overtime_and_bonus(self):
+        records = present(WORKING_DAYS)
+        records.update(present(WORKING_DAYS[:3], overtime=2))
+
+        payslip = compute_payslip(salary_employee(), records, {}, SEPTEMBER)
+
+        self.assertEqual(payslip['present_days'], 26)
+        self.assertEqual(payslip['weekend_days'], 4)
+        self.assertEqual(payslip['absent_days'], 0)
+        self.assertEqual(payslip['overtime_hours'], Decimal('6.00'))
+        # 6000 / 208 * 2 per hour
+        self.assertEqual(payslip['overtime_pay'], Decimal('346.15'))
+        self.assertEqual(payslip['attendance_bonus'], Decimal('775.00'))
+        self.assertEqual(payslip['total_deductions'], Decimal('0.00'))
+        self.assertEqual(payslip['net_salary'], Decimal('11121.15'))
+
+    def test_staff_overtime_is_unpaid(self):
+        payslip = compute_payslip(
+            salary_employee(level_of_work='staff'), present(WORKING_DAYS, overtime=1), {}, SEPTEMBER
+        )
+        self.assertEqual(payslip['overtime_hours'], Decimal('26.00'))
+        self.assertEqual(payslip['overtime_pay'], Decimal('0.00'))
+        self.assertEqual(payslip['attendance_bonus'], Decimal('0.00'))
+        self.assertEqual(payslip['net_salary'], Decimal('10000.00'))
+
+    def test_absent_days_deduct_daily_basic_and_late_days_lose_the_bonus(self):
+        records = present(WORKING_DAYS[2:])
+        records.update(present(WORKING_DAYS[2:3], 'Present-Late'))
+
+        payslip = compute_payslip(salary_employee(), records, {}, SEPTEMBER)
+
+        self.assertEqual((payslip['absent_days'], payslip['late_days'], payslip['present_days']), (2, 1, 24))
+        # 6000 / 30 per absent day
+        self.assertEqual(payslip['absent_deduction'], Decimal('400.00'))
+        self.assertEqual(payslip['attendance_bonus'], Decimal('0.00'))
+        self.assertEqual(payslip['net_salary'], Decimal('9600.00'))
+
+    def test_unpaid_leave_deducts_daily_gross(self):
+        payslip = compute_payslip(
+            salary_employee(), present(WORKING_DAYS[1:]), {WORKING_DAYS[0]: 'Leave-WithOutPay'}, SEPTEMBER
+        )
+        self.assertEqual(payslip['leave_without_pay_days'], 1)
+        self.assertEqual(payslip['leave_without_pay_deduction'], Decimal('333.33'))
+        self.assertEqual(payslip['net_salary'], Decimal('9666.67'))
+
+    def test_mid_month_joiner_is_prorated(self):
+        joined = date(2026, 9, 11)
+        payslip = compute_payslip(
+            salary_employee(date_of_joining=joined), present(day for day in WORKING_DAYS if day >= joined),
+            {}, SEPTEMBER
+        )
+        self.assertEqual(payslip['not_joined_days'], 10)
+        self.assertEqual(payslip['absent_days'], 0)
+        self.assertEqual(payslip['proration_deduction'], Decimal('3333.33'))
+        self.assertEqual(payslip['attendance_bonus'], Decimal('0.00'))
+        self.assertEqual(payslip['net_salary'], Decimal('6666.67'))
+
+    def test_advance_never_takes_pay_below_zero(self):
+        payslip = compute_payslip(salary_employee(), {}, {}, SEPTEMBER, advance_due=Decimal('5000'))
+        self.assertEqual(payslip['absent_days'], 26)
+        self.assertEqual(payslip['absent_deduction'], Decimal('5200.00'))
+        self.assertEqual(payslip['advance_deduction'], Decimal('4800.00'))
+        self.assertEqual(payslip['net_salary'], Decimal('0.00'))
+
+
+class PayrollEngineTests(TransactionTestCase):
+    # The pooled run closes the database connections before forking, which a
+    # TestCase transaction would not survive
+    def setUp(self):
+        department = Department.objects.create(name='Sewing')
+        designation = Designation.objects.create(name='Operator', department=department, level='worker')
+        statuses = ('Present-OnTime', 'Present-Late', 'Absent', 'Present-Considered')
+        for index in range(7):
+            user = User.objects.create_user(
+                email=f'emp{index}@example.com', password='x', first_name='E', last_name=str(index)
+            )
+            employee = Employee.objects.create(
+                user=user, employee_id=f'EMP{index:03d}', department=department, designation=designation,
+                level_of_work='worker' if index % 2 else 'staff', gross_salary=10000 + index * 1500,
+                off_day='Friday', date_of_joining=date(2025, 1, 1)
+            )
+            DailyAttendance.objects.bulk_create([
+                DailyAttendance(
+                    employee=employee, date=date(2026, 9, day), status=statuses[(index + day) % len(statuses)],
+                    overtime_hours=Decimal('1.5') if day % 3 == 0 else 0
+                )
+                for day in range(1, 31)
+            ])
+
+    def payslips(self, run):
+        return list(Payslip.objects.filter(run=run).order_by('employee_code').values_list(
+            'employee_code', 'gross_salary', 'overtime_pay', 'total_deductions', 'net_salary'
+        ))
+
+    def test_sharded_run_matches_inline_run(self):
+        run = run_payroll(2026, 9, workers=1, chunk_size=3)
+        inline_totals = [getattr(run, field) for field in TOTAL_FIELDS]
+        inline_payslips = self.payslips(run)
+        self.assertGreater(run.total_overtime_pay, 0)
+        self.assertGreater(run.total_deductions, 0)
+
+        run = run_payroll(2026, 9, restart=True, workers=3, chunk_size=3)
+
+        self.assertEqual(run.status, 'completed')
+        self.assertEqual(run.workers, 3)
+        self.assertEqual(len([timing for timing in run.shard_timings if timing['chunk'] == 0]), 3)
+        self.assertNotIn(os.getpid(), {timing['pid'] for timing in run.shard_timings})
+        self.assertEqual(run.processed_employees, 7)
+        self.assertEqual([getattr(run, field) for field in TOTAL_FIELDS], inline_totals)
+        self.assertEqual(self.payslips(run), inline_payslips)
+        self.assertEqual(run.total_net_salary, sum(payslip[4] for payslip in inline_payslips))
+
+
+    def test_failed_run_resumes_after_the_last_committed_chunk(self):
+        expected = run_payroll(2026, 9, workers=1, chunk_size=3)
+        expected_totals = [getattr(expected, field) for field in TOTAL_FIELDS]
+        expected_payslips = self.payslips(expected)
+
+        process_chunk = PayrollEngine._process_chunk
+        calls = []
+
+        def failing_second_chunk(engine, employees):
+            calls.append(employees)
+            if len(calls) == 2:
+                raise RuntimeError('worker crashed')
+            process_chunk(engine, employees)
+
+        with mock.patch.object(PayrollEngine, '_process_chunk', failing_second_chunk), \
+                self.assertLogs('payroll.engine', 'ERROR'):
+            with self.assertRaises(RuntimeError):
+                run_payroll(2026, 9, restart=True, workers=1, chunk_size=3)
+        run = PayrollRun.objects.get(year=2026, month=9)
+        self.assertEqual(run.status, 'failed')
+        self.assertEqual(run.processed_employees, 3)
+        self.assertEqual(Payslip.objects.filter(run=run).count(), 3)
+
+        run = run_payroll(2026, 9, workers=1, chunk_size=3)
+
+        self.assertEqual(run.status, 'completed')
+        self.assertEqual([getattr(run, field) for field in TOTAL_FIELDS], expected_totals)
+        self.assertEqual(self.payslips(run), expected_payslips)
+
+    @override_settings(PAYROLL_STALE_SECONDS=600)
+    def test_a_run_in_progress_cannot_be_claimed_twice(self):
+        run = run_payroll(2026, 9, workers=1, chunk_size=3)
+        totals = [getattr(run, field) for field in TOTAL_FIELDS]
+        PayrollRun.objects.filter(pk=run.pk).update(status='processing', updated_at=timezone.now())
+
+        with self.assertRaises(PayrollRunBusy):
+            run_payroll(2026, 9, restart=True, workers=1, chunk_size=3)
+        run.refresh_from_db()
+        self.assertEqual(run.status, 'processing')
+        self.assertEqual([getattr(run, field) for field in TOTAL_FIELDS], totals)
+
+        # A worker that stopped writing chunks long ago is presumed dead
+        PayrollRun.objects.filter(pk=run.pk).update(updated_at=timezone.now() - timedelta(minutes=11))
+        run = run_payroll(2026, 9, restart=True, workers=1, chunk_size=3)
+        self.assertEqual(run.status, 'completed')
+        self.assertEqual([getattr(run, field) for field in TOTAL_FIELDS], totals)
+
+    def test_worker_that_lost_the_run_writes_nothing(self):
+        expected = run_payroll(2026, 9, workers=1, chunk_size=3)
+        load_records = PayrollEngine._load_records
+        calls = []
+
+        def taken_over_before_second_chunk(engine, employee_pks):
+            calls.append(employee_pks)
+            if len(calls) == 2:
+                # Another worker took the run over and committed the chunk first
+                PayrollRun.objects.filter(pk=engine.run.pk).update(last_employee_pk=employee_pks[-1])
+            return load_records(engine, employee_pks)
+
+        with mock.patch.object(PayrollEngine, '_load_records', taken_over_before_second_chunk):
+            with self.assertRaises(PayrollRunBusy):
+                run_payroll(2026, 9, restart=True, workers=1, chunk_size=3)
+        run = PayrollRun.objects.get(pk=expected.pk)
+        self.assertEqual(run.status, 'processing')
+        self.assertEqual(run.processed_employees, 3)
+        self.assertEqual(Payslip.objects.filter(run=run).count(), 3)
+
+    def test_stale_payslips_block_finalize_until_recalculated(self):
+        run = run_payroll(2026, 9, workers=1)
+        employee = Employee.objects.get(employee_id='EMP002')
+        before = Payslip.objects.get(run=run, employee=employee)
+        self.assertFalse(PayrollDirtyEmployee.objects.exists())
+
+        # An unchanged save is not a payroll change
+        employee.save()
+        self.assertFalse(PayrollDirtyEmployee.objects.exists())
+
+        day = DailyAttendance.objects.get(employee=employee, date=date(2026, 9, 8))
+        self.assertEqual(day.status, 'Absent')
+        day.status = 'Present-OnTime'
+        day.save()
+        employee.gross_salary = 20000
+        employee.save()
+        self.assertEqual(
+            sorted(PayrollDirtyEmployee.objects.filter(run=run).values_list('employee_id', 'reason')),
+            [(employee.pk, 'attendance'), (employee.pk, 'salary')]
+        )
+
+        hr = User.objects.create_user(email='hr@example.com', password='x', role='hr_manager')
+        client = APIClient()
+        client.force_authenticate(hr)
+        response = client.post(f'/api/payroll/runs/{run.pk}/finalize/')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['dirty_employees'], 1)
+        run.refresh_from_db()
+        self.assertEqual(run.status, 'completed')
+
+        result = PayrollEngine(run, workers=1).recalculate_dirty()
+
+        self.assertEqual(result['recalculated'], 1)
+        self.assertEqual(result['changes'][0]['reasons'], ['attendance', 'salary'])
+        self.assertFalse(PayrollDirtyEmployee.objects.filter(run=run).exists())
+        after = Payslip.objects.get(run=run, employee=employee)
+        self.assertEqual(after.absent_days, before.absent_days - 1)
+        self.assertGreater(after.gross_salary, before.gross_salary)
+        self.assertEqual(run.total_net_salary, sum(Payslip.objects.filter(run=run).values_list('net_salary', flat=True)))
+
+        response = client.post(f'/api/payroll/runs/{run.pk}/finalize/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['status'], 'finalized')
+        # Finalized runs are no longer marked or recalculated
+        day.status = 'Absent'
+        day.save()
+        self.assertFalse(PayrollDirtyEmployee.objects.filter(run=run).exists())
+
+@override_settings(PAYROLL_COMPANY_NAME='HR Xen', PAYROLL_DEBIT_ACCOUNT_NUMBER='1100223344')
+class BankExportTests(TestCase):
+    def setUp(self):
+        self.department = Department.objects.create(name='Sewing')
+        self.designation = Designation.objects.create(name='Operator', department=self.department, level='worker')
+        self.run = PayrollRun.objects.create(
+            year=2026, month=9, period_start=date(2026, 9, 1), period_end=date(2026, 9, 30), status='finalized'
+        )
+        self.bank_a = self.payee('EMP001', Decimal('12000.50'), payment_method='bank', account_number='0011223344',
+                                 routing_number='123456789', bank_name='City Bank')
+        self.bank_b = self.payee('EMP002', Decimal('8000.00'), payment_method='bank', account_number='0099887766',
+                                 routing_number='987654321', account_name='Payee Two')
+        self.wallet = self.payee('EMP003', Decimal('5000.25'), payment_method='mobile_wallet',
+                                 wallet_provider='bkash', wallet_number='01711000000')
+        self.payee('EMP004', Decimal('0'), payment_method='bank', account_number='0055', routing_number='111111111')
+        self.payee('EMP005', Decimal('7000.00'))
+
+        hr = User.objects.create_user(email='hr@example.com', password='x', role='hr_manager')
+        self.client = APIClient()
+        self.client.force_authenticate(hr)
+
+    def payee(self, employee_id, net_salary, **account):
+        user = User.objects.create_user(email=f'{employee_id.lower()}@example.com', password='x',
+                                        first_name='E', last_name=employee_id)
+        employee = Employee.objects.create(
+            user=user, employee_id=employee_id, department=self.department, designation=self.designation,
+            level_of_work='worker',
+            gross_salary=10000, date_of_joining=date(2025, 1, 1)
+        )
+        if account:
+            EmployeePaymentAccount.objects.create(employee=employee, **account)
+        Payslip.objects.create(
+            run=self.run, employee=employee, employee_code=employee_id, employee_name=f'E {employee_id}',
+            level_of_work='worker', net_salary=net_salary
+        )
+        return employee
+
+    def export(self, export_format):
+        return self.client.get(f'/api/payroll/runs/{self.run.pk}/export/{export_format}/')
+
+    def content(self, response):
+        return b''.join(response.streaming_content).decode()
+
+    def test_bank_csv_lists_only_payable_bank_transfers(self):
+        response = self.export('bank_csv')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['X-Export-Records'], '2')
+        self.assertEqual(response['X-Export-Total'], '20000.50')
+        lines = self.content(response).splitlines()
+        self.assertEqual(lines[0].split(',')[0], 'Reference')
+        self.assertEqual([line.split(',')[1] for line in lines[1:]], ['EMP001', 'EMP002'])
+        self.assertEqual(lines[1].split(','), [
+            'SAL202609-EMP001', 'EMP001', 'E EMP001', '0011223344', 'City Bank', '', '123456789', '12000.50'
+        ])
+        self.assertEqual(lines[2].split(',')[2], 'Payee Two')
+
+    def test_wallet_csv_lists_only_wallet_transfers(self):
+        response = self.export('wallet_csv')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['X-Export-Records'], '1')
+        lines = self.content(response).splitlines()
+        self.assertEqual(len(lines), 2)
+        self.assertEqual(lines[1].split(','), ['SAL202609-EMP003', 'EMP003', 'E EMP003', 'bkash', '01711000000', '5000.25'])
+
+    def test_fixed_width_lines_and_totals(self):
+        response = self.export('bank_fixed')
+        self.assertEqual(response.status_code, 200)
+        content = self.content(response)
+        lines = content.split('\r\n')
+        self.assertEqual(lines.pop(), '')
+        self.assertEqual([len(line) for line in lines], [120] * 4)
+        self.assertEqual([line[0] for line in lines], ['H', 'D', 'D', 'T'])
+
+        header, first, second, trailer = lines
+        self.assertEqual(header[9:44].rstrip(), 'HR Xen')
+        self.assertEqual(header[44:64].rstrip(), '1100223344')
+        self.assertEqual(header[64:70], '000002')
+        self.assertEqual(header[70:85], '000000002000050')
+        self.assertEqual(trailer[1:22], '000002000000002000050')
+
+        self.assertEqual(first[1:7], '000001')
+        self.assertEqual(first[7:27].rstrip(), '0011223344')
+        self.assertEqual(first[27:36], '123456789')
+        self.assertEqual(first[36:71].rstrip(), 'E EMP001')
+        self.assertEqual(first[71:84], '0000001200050')
+        self.assertEqual(first[84:104].rstrip(), 'SAL202609-EMP001')
+        self.assertEqual(second[36:71].rstrip(), 'Payee Two')
+        self.assertEqual(sum(int(line[71:84]) for line in (first, second)), int(trailer[7:22]))
+
+    def test_fixed_width_refuses_values_that_do_not_fit(self):
+        EmployeePaymentAccount.objects.filter(employee=self.bank_a).update(account_number='GB' + '1' * 30)
+        self.bank_b.employee_id = 'EMP002-LONGCODE'
+        self.bank_b.save()
+        Payslip.objects.filter(employee=self.bank_b).update(employee_code='EMP002-LONGCODE')
+
+        response = self.export('bank_fixed')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['employees'], [
+            {'employee_code': 'EMP001', 'fields': ['account_number']},
+            {'employee_code': 'EMP002-LONGCODE', 'fields': ['reference']},
+        ])
+        self.assertIn('EMP001', response.data['error'])
+        self.assertEqual(self.export('bank_csv').status_code, 200)
+
+
+class AdvanceLedgerTests(TestCase):
+    def setUp(self):
+        department = Department.objects.create(name='Sewing')
+        designation = Designation.objects.create(name='Operator', department=department, level='worker')
+        user = User.objects.create_user(email='emp@example.com', password='x', first_name='E', last_name='One')
+        self.employee = Employee.objects.create(
+            user=user, employee_id='EMP001', department=department, designation=designation,
+            level_of_work='worker', gross_salary=10000, date_of_joining=date(2025, 1, 1)
+        )
+        self.advance = SalaryAdvance.objects.create(
+            employee=self.employee, amount=Decimal('2000'), reason='Medical', advance_date=date(2026, 8, 20),
+            first_deduction_month=date(2026, 9, 1), installment_count=2
+        )
+        schedule_installments(self.advance)
+
+    def finalized_run(self, month, advance_deduction, status='finalized'):
+        """A run of 2026-`month` whose payslip deducted `advance_deduction`, recovered if finalized"""
+        run = PayrollRun.objects.create(
+            year=2026, month=month, period_start=date(2026, month, 1),
+            period_end=date(2026, month + 1, 1) - timedelta(days=1), status=status
+        )
+        Payslip.objects.create(
+            run=run, employee=self.employee, employee_code='EMP001', employee_name='E One',
+            level_of_work='worker', advance_deduction=advance_deduction
+        )
+        return run, recover_advance_installments(run) if status == 'finalized' else None
+
+    def schedule(self):
+        return list(self.advance.installments.order_by('sequence').values_list(
+            'sequence', 'due_month', 'amount', 'status', 'recovered_amount'
+        ))
+
+    def test_recovered_instalments_settle_the_advance(self):
+        _, recovery = self.finalized_run(9, Decimal('1000'))
+        self.assertEqual(recovery, {'recovered': Decimal('1000'), 'carried_forward': Decimal('0')})
+        self.advance.refresh_from_db()
+        self.assertEqual(self.advance.status, 'active')
+
+        self.finalized_run(10, Decimal('1000'))
+
+        self.assertEqual([row[3] for row in self.schedule()], ['recovered', 'recovered'])
+        self.advance.refresh_from_db()
+        self.assertEqual(self.advance.status, 'settled')
+
+    def test_shortfall_is_carried_past_the_end_of_the_schedule(self):
+        _, recovery = self.finalized_run(9, Decimal('400'))
+
+        self.assertEqual(recovery, {'recovered': Decimal('400'), 'carried_forward': Decimal('600')})
+        self.assertEqual(self.schedule(), [
+            (1, date(2026, 9, 1), Decimal('1000.00'), 'carried_forward', Decimal('400.00')),
+            (2, date(2026, 10, 1), Decimal('1000.00'), 'scheduled', Decimal('0.00')),
+            (3, date(2026, 11, 1), Decimal('600.00'), 'scheduled', Decimal('0.00')),
+        ])
+        self.assertEqual(installments_due(date(2026, 11, 1)), {self.employee.pk: Decimal('1600.00')})
+
+        self.finalized_run(10, Decimal('1000'))
+        self.finalized_run(11, Decimal('600'))
+        self.advance.refresh_from_db()
+        self.assertEqual(self.advance.status, 'settled')
+
+    def test_instalments_of_a_month_never_finalized_are_swept_into_the_next(self):
+        september, _ = self.finalized_run(9, Decimal('1000'), status='completed')
+        self.assertEqual(installments_due(date(2026, 10, 1)), {self.employee.pk: Decimal('2000.00')})
+
+        _, recovery = self.finalized_run(10, Decimal('2000'))
+
+        self.assertEqual(recovery, {'recovered': Decimal('2000'), 'carried_forward': Decimal('0')})
+        self.assertEqual([row[3] for row in self.schedule()], ['recovered', 'recovered'])
+        self.advance.refresh_from_db()
+        self.assertEqual(self.advance.status, 'settled')
+        # The open September draft still deducts an instalment that is now recovered
+        self.assertTrue(PayrollDirtyEmployee.objects.filter(run=september, reason='advance').exists())
+        self.assertEqual(installments_due(date(2026, 9, 1)), {})
+
+    def test_overdue_shortfall_is_carried_forward(self):
+        self.finalized_run(9, Decimal('0'), status='completed')
+
+        _, recovery = self.finalized_run(10, Decimal('1500'))
+
+        self.assertEqual(recovery, {'recovered': Decimal('1500'), 'carried_forward': Decimal('500')})
+        self.assertEqual([row[3:] for row in self.schedule()], [
+            ('recovered', Decimal('1000.00')), ('carried_forward', Decimal('500.00')), ('scheduled', Decimal('0.00')),
+        ])
+        self.assertEqual(self.schedule()[2][1:3], (date(2026, 11, 1), Decimal('500.00')))
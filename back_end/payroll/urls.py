@@ -0,0 +1,28 @@
+from django.urls import path
+from . import views
+
+urlpatterns = [
+    # Payroll Runs
+    path('runs/', views.PayrollRunListCreateView.as_view(), name='payroll-run-list'),
+    path('runs/<int:pk>/', views.PayrollRunDetailView.as_view(), name='payroll-run-detail'),
+    path('runs/<int:pk>/process/', views.process_payroll_run, name='payroll-run-process'),
+    path('runs/<int:pk>/finalize/', views.finalize_payroll_run, name='payroll-run-finalize'),
+    path('runs/<int:pk>/dirty/', views.payroll_run_dirty_employees, name='payroll-run-dirty'),
+    path('runs/<int:pk>/recalculate/', views.recalculate_payroll_run, name='payroll-run-recalculate'),
+    path('runs/<int:pk>/export/<str:export_format>/', views.export_payroll_run, name='payroll-run-export'),
+    path('runs/<int:pk>/payslips.zip', views.download_payroll_run_payslips, name='payroll-run-payslips-zip'),
+    
+    # Payslips
+    path('runs/<int:run_pk>/payslips/', views.PayslipListView.as_view(), name='payslip-list'),
+    path('payslips/<int:pk>/', views.PayslipDetailView.as_view(), name='payslip-detail'),
+    path('payslips/<int:pk>/pdf/', views.download_payslip_pdf, name='payslip-pdf'),
+    
+    # Salary Advances and Loans
+    path('advances/', views.SalaryAdvanceListCreateView.as_view(), name='salary-advance-list'),
+    path('advances/<int:pk>/', views.SalaryAdvanceDetailView.as_view(), name='salary-advance-detail'),
+    path('advances/outstanding/', views.advance_outstanding_balances, name='salary-advance-outstanding'),
+    
+    # Payment Accounts
+    path('payment-accounts/', views.EmployeePaymentAccountListCreateView.as_view(), name='payment-account-list'),
+    path('payment-accounts/<int:pk>/', views.EmployeePaymentAccountDetailView.as_view(), name='payment-account-detail'),
+]
@@ -0,0 +1,420 @@
+from decimal import Decimal
+
+from rest_framework import generics, status, filters
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.exceptions import PermissionDenied
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from django_filters.rest_framework import DjangoFilterBackend
+from django.db import transaction
+from django.db.models import Count
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.utils import timezone
+
+from .models import PayrollRun, Payslip, PayrollDirtyEmployee, EmployeePaymentAccount, SalaryAdvance
+from .serializers import (
+    PayrollRunSerializer, PayslipSerializer, PayrollDirtyEmployeeSerializer, EmployeePaymentAccountSerializer,
+    SalaryAdvanceSerializer
+)
+from .advances import has_recoveries, outstanding_balances, recover_advance_installments
+from .engine import PayrollEngine, PayrollRunBusy
+from .bank_export import EXPORT_FORMATS, ExportFieldOverflow, export_summary, export_filename, stream_disbursement_file
+from .payslip_pdf import payslip_pdf, payslip_archive_name, stream_payslip_zip
+from .dirty import mark_employee_dirty_in_open_runs
+from attendance.recompute import month_range
+from employees.models import Employee
+
+HR_ROLES = ['hr_staff', 'hr_manager', 'super_admin']
+
+
+# ===== PAYROLL RUN VIEWS =====
+
+def _runs_with_dirty_count():
+    return PayrollRun.objects.select_related('created_by').annotate(
+        dirty_count=Count('dirty_employees__employee', distinct=True)
+    )
+
+
+class PayrollRunListCreateView(generics.ListCreateAPIView):
+    """List and create payroll runs"""
+    serializer_class = PayrollRunSerializer
+    permission_classes = [IsAuthenticated]
+    filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
+    filterset_fields = ['year', 'month', 'status']
+    ordering_fields = ['year', 'month', 'created_at']
+    ordering = ['-year', '-month']
+
+    def get_queryset(self):
+        """Only HR can see payroll runs"""
+        if self.request.user.role in HR_ROLES:
+            return _runs_with_dirty_count()
+        return PayrollRun.objects.none()
+
+    def perform_create(self, serializer):
+        if self.request.user.role not in HR_ROLES:
+            raise PermissionDenied('Only HR can create payroll runs')
+
+        start, end = month_range(serializer.validated_data['year'], serializer.validated_data['month'])
+        serializer.save(period_start=start, period_end=end, created_by=self.request.user)
+
+
+class PayrollRunDetailView(generics.RetrieveUpdateDestroyAPIView):
+    """Retrieve, update notes on, or delete a payroll run"""
+    serializer_class = PayrollRunSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        if self.request.user.role in HR_ROLES:
+            return _runs_with_dirty_count()
+        return PayrollRun.objects.none()
+
+    def perform_update(self, serializer):
+        # Year and month are fixed once a run exists
+        serializer.save(year=serializer.instance.year, month=serializer.instance.month)
+
+    def perform_destroy(self, instance):
+        if instance.is_finalized:
+            raise PermissionDenied('Finalized payroll runs cannot be deleted')
+        instance.delete()
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def process_payroll_run(request, pk):
+    """Compute the payroll run, resuming a failed run unless restart is requested"""
+    if request.user.role not in HR_ROLES:
+        return Response({'error': 'Permission denied'}, status=status.HTTP_403_FORBIDDEN)
+
+    try:
+        run = PayrollRun.objects.get(pk=pk)
+    except PayrollRun.DoesNotExist:
+        return Response({'error': 'Payroll run not found'}, status=status.HTTP_404_NOT_FOUND)
+
+    if run.is_finalized:
+        return Response({'error': 'Finalized payroll runs cannot be recomputed'}, status=status.HTTP_400_BAD_REQUEST)
+
+    restart = str(request.data.get('restart', '')).lower() in ('1', 'true', 'yes')
+    try:
+        # Computed inline - a request never forks a worker pool; run_payroll does that
+        run = PayrollEngine(run, workers=1).process(restart=restart)
+    except PayrollRunBusy as e:
+        return Response({'error': str(e)}, status=status.HTTP_409_CONFLICT)
+    except Exception as e:
+        return Response({
+            'error': f'Payroll run failed: {str(e)}',
+            'run': PayrollRunSerializer(PayrollRun.objects.get(pk=pk)).data
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+    return Response(PayrollRunSerializer(run).data)
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def finalize_payroll_run(request, pk):
+    """Lock a completed payroll run and recover the advance instalments its payslips deducted"""
+    if request.user.role not in HR_ROLES:
+        return Response({'error': 'Permission denied'}, status=status.HTTP_403_FORBIDDEN)
+
+    with transaction.atomic():
+        # Lock the run so a concurrent finalize or recalculation cannot interleave
+        try:
+            run = PayrollRun.objects.select_for_update().get(pk=pk)
+        except PayrollRun.DoesNotExist:
+            return Response({'error': 'Payroll run not found'}, status=status.HTTP_404_NOT_FOUND)
+
+        if run.status != 'completed':
+            return Response({'error': 'Only completed payroll runs can be finalized'}, status=status.HTTP_400_BAD_REQUEST)
+
+        dirty = run.dirty_employees.values('employee').distinct().count()
+        if dirty:
+            return Response(
+                {'error': f'{dirty} employee payslip(s) are out of date - recalculate the run before finalizing',
+                 'dirty_employees': dirty},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        run.status = 'finalized'
+        run.finalized_at = timezone.now()
+        run.save(update_fields=['status', 'finalized_at', 'updated_at'])
+        recovery = recover_advance_installments(run)
+
+    return Response({
+        **PayrollRunSerializer(run).data,
+        'advance_recovered': f"{recovery['recovered']:.2f}",
+        'advance_carried_forward': f"{recovery['carried_forward']:.2f}",
+    })
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def payroll_run_dirty_employees(request, pk):
+    """List employees whose payslips went stale since the run was computed"""
+    if request.user.role not in HR_ROLES:
+        return Response({'error': 'Permission denied'}, status=status.HTTP_403_FORBIDDEN)
+    
+    marks = PayrollDirtyEmployee.objects.filter(run_id=pk).select_related('employee__user').order_by(
+        'employee__employee_id', 'reason'
+    )
+    return Response(PayrollDirtyEmployeeSerializer(marks, many=True).data)
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def recalculate_payroll_run(request, pk):
+    """Recompute only the dirty payslips of a completed run and report what changed"""
+    if request.user.role not in HR_ROLES:
+        return Response({'error': 'Permission denied'}, status=status.HTTP_403_FORBIDDEN)
+
+    try:
+        run = PayrollRun.objects.get(pk=pk)
+    except PayrollRun.DoesNotExist:
+        return Response({'error': 'Payroll run not found'}, status=status.HTTP_404_NOT_FOUND)
+
+    try:
+        result = PayrollEngine(run, workers=1).recalculate_dirty()
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    return Response({**result, 'run': PayrollRunSerializer(run).data})
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def export_payroll_run(request, pk, export_format):
+    """Stream a bank-transfer or mobile-wallet disbursement file for a finalized run"""
+    if request.user.role not in HR_ROLES:
+        return Response({'error': 'Permission denied'}, status=status.HTTP_403_FORBIDDEN)
+
+    if export_format not in EXPORT_FORMATS:
+        return Response(
+            {'error': f"Unknown export format. Use one of: {', '.join(EXPORT_FORMATS)}"},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    try:
+        run = PayrollRun.objects.get(pk=pk)
+    except PayrollRun.DoesNotExist:
+        return Response({'error': 'Payroll run not found'}, status=status.HTTP_404_NOT_FOUND)
+
+    if not run.is_finalized:
+        return Response({'error': 'Only finalized payroll runs can be exported'}, status=status.HTTP_400_BAD_REQUEST)
+
+    summary = export_summary(run, export_format)
+    try:
+        lines = stream_disbursement_file(run, export_format, summary)
+    except ExportFieldOverflow as e:
+        return Response({'error': str(e), 'employees': e.offenders}, status=status.HTTP_400_BAD_REQUEST)
+
+    response = StreamingHttpResponse(
+        lines,
+        content_type=EXPORT_FORMATS[export_format][2]
+    )
+    response['Content-Disposition'] = f'attachment; filename="{export_filename(run, export_format)}"'
+    response['X-Export-Records'] = str(summary['records'])
+    response['X-Export-Total'] = f"{summary['total']:.2f}"
+    return response
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def download_payroll_run_payslips(request, pk):
+    """Stream a zip of every payslip PDF in the run, rendering uncached ones on a process pool"""
+    if request.user.role not in HR_ROLES:
+        return Response({'error': 'Permission denied'}, status=status.HTTP_403_FORBIDDEN)
+
+    try:
+        run = PayrollRun.objects.get(pk=pk)
+    except PayrollRun.DoesNotExist:
+        return Response({'error': 'Payroll run not found'}, status=status.HTTP_404_NOT_FOUND)
+
+    if run.status not in ('completed', 'finalized'):
+        return Response(
+            {'error': 'Payslips are available once the payroll run has completed'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    # Rendered inline: the generator runs inside the response, where forking a pool
+    # (and closing the request's connections) is not safe. render_payslips pre-renders
+    response = StreamingHttpResponse(stream_payslip_zip(run, workers=1), content_type='application/zip')
+    response['Content-Disposition'] = f'attachment; filename="{payslip_archive_name(run)}.zip"'
+    return response
+
+
+# ===== PAYMENT ACCOUNT VIEWS =====
+
+class EmployeePaymentAccountListCreateView(generics.ListCreateAPIView):
+    """List and create employee payment accounts"""
+    serializer_class = EmployeePaymentAccountSerializer
+    permission_classes = [IsAuthenticated]
+    filter_backends = [DjangoFilterBackend, filters.SearchFilter]
+    filterset_fields = ['payment_method', 'wallet_provider', 'employee']
+    search_fields = ['employee__employee_id', 'account_number', 'wallet_number']
+
+    def get_queryset(self):
+        queryset = EmployeePaymentAccount.objects.select_related('employee__user')
+        if self.request.user.role in HR_ROLES:
+            return queryset
+        return queryset.filter(employee__user=self.request.user)
+
+    def perform_create(self, serializer):
+        if self.request.user.role not in HR_ROLES:
+            raise PermissionDenied('Only HR can manage payment accounts')
+        serializer.save()
+
+
+class EmployeePaymentAccountDetailView(generics.RetrieveUpdateDestroyAPIView):
+    """Retrieve, update, or delete an employee payment account"""
+    serializer_class = EmployeePaymentAccountSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        if self.request.user.role in HR_ROLES:
+            return EmployeePaymentAccount.objects.select_related('employee__user')
+        return EmployeePaymentAccount.objects.none()
+
+
+# ===== SALARY ADVANCE VIEWS =====
+
+class SalaryAdvanceListCreateView(generics.ListCreateAPIView):
+    """List and create salary advances and loans"""
+    serializer_class = SalaryAdvanceSerializer
+    permission_classes = [IsAuthenticated]
+    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filterset_fields = ['employee', 'advance_type', 'status', 'employee__department']
+    search_fields = ['employee__employee_id', 'employee__user__first_name', 'employee__user__last_name', 'reason']
+    ordering_fields = ['advance_date', 'amount', 'first_deduction_month', 'created_at']
+    ordering = ['-advance_date']
+
+    def get_queryset(self):
+        queryset = SalaryAdvance.objects.select_related(
+            'employee__user', 'employee__department', 'created_by'
+        ).prefetch_related('installments')
+        if self.request.user.role in HR_ROLES:
+            return queryset
+        return queryset.filter(employee__user=self.request.user)
+
+    def perform_create(self, serializer):
+        if self.request.user.role not in HR_ROLES:
+            raise PermissionDenied('Only HR can record salary advances')
+        serializer.save(created_by=self.request.user)
+
+
+class SalaryAdvanceDetailView(generics.RetrieveUpdateDestroyAPIView):
+    """Retrieve, update, or delete a salary advance"""
+    serializer_class = SalaryAdvanceSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        if self.request.user.role in HR_ROLES:
+            return SalaryAdvance.objects.select_related(
+                'employee__user', 'employee__department', 'created_by'
+            ).prefetch_related('installments')
+        return SalaryAdvance.objects.none()
+
+    def perform_destroy(self, instance):
+        if has_recoveries(instance):
+            raise PermissionDenied('Advances with recovered instalments cannot be deleted - cancel them instead')
+        employee_pk = instance.employee_id
+        instance.delete()
+        mark_employee_dirty_in_open_runs(employee_pk, 'advance')
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def advance_outstanding_balances(request):
+    """Per-employee instalment due and outstanding advance balance for a pay period"""
+    if request.user.role not in HR_ROLES:
+        return Response({'error': 'Permission denied'}, status=status.HTTP_403_FORBIDDEN)
+
+    today = timezone.localdate()
+    try:
+        year = int(request.query_params.get('year', today.year))
+        month = int(request.query_params.get('month', today.month))
+        period_start, _ = month_range(year, month)
+    except ValueError:
+        return Response({'error': 'Invalid year or month'}, status=status.HTTP_400_BAD_REQUEST)
+
+    balances = outstanding_balances(period_start)
+    employees = {
+        employee['id']: employee
+        for employee in Employee.objects.filter(pk__in=list(balances)).values(
+            'id', 'employee_id', 'user__first_name', 'user__last_name', 'department__name'
+        )
+    }
+    results = [
+        {
+            'employee': employee_pk,
+            'employee_id': employees[employee_pk]['employee_id'],
+            'employee_name': f"{employees[employee_pk]['user__first_name']} {employees[employee_pk]['user__last_name']}".strip(),
+            'department_name': employees[employee_pk]['department__name'],
+            'due': f"{balance['due']:.2f}",
+            'outstanding': f"{balance['outstanding']:.2f}",
+            'outstanding_after_period': f"{balance['after_period']:.2f}",
+        }
+        for employee_pk, balance in sorted(balances.items(), key=lambda item: employees[item[0]]['employee_id'])
+    ]
+    return Response({
+        'year': year,
+        'month': month,
+        'employees': len(results),
+        'total_due': f"{sum((b['due'] for b in balances.values()), Decimal('0')):.2f}",
+        'total_outstanding': f"{sum((b['outstanding'] for b in balances.values()), Decimal('0')):.2f}",
+        'results': results,
+    })
+
+
+# ===== PAYSLIP VIEWS =====
+
+def _payslips_for(user):
+    """Filter payslips based on user role"""
+    queryset = Payslip.objects.select_related('run')
+    if user.role in HR_ROLES:
+        return queryset
+    elif user.role == 'department_head':
+        return queryset.filter(employee__department__head=user)
+    return queryset.filter(employee__user=user)
+
+
+class PayslipListView(generics.ListAPIView):
+    """List the payslips of a payroll run"""
+    serializer_class = PayslipSerializer
+    permission_classes = [IsAuthenticated]
+    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filterset_fields = ['department_name', 'level_of_work', 'employee']
+    search_fields = ['employee_code', 'employee_name', 'department_name', 'designation_name']
+    ordering_fields = ['employee_code', 'employee_name', 'gross_salary', 'net_salary']
+    ordering = ['employee_code']
+
+    def get_queryset(self):
+        return _payslips_for(self.request.user).filter(run_id=self.kwargs['run_pk'])
+
+
+class PayslipDetailView(generics.RetrieveAPIView):
+    """Retrieve a payslip"""
+    serializer_class = PayslipSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        return _payslips_for(self.request.user)
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def download_payslip_pdf(request, pk):
+    """Download one payslip as PDF, served from the render cache when unchanged"""
+    try:
+        payslip = _payslips_for(request.user).get(pk=pk)
+    except Payslip.DoesNotExist:
+        return Response({'error': 'Payslip not found'}, status=status.HTTP_404_NOT_FOUND)
+
+    key, path = payslip_pdf(payslip)
+    etag = f'"{key}"'
+    if request.headers.get('If-None-Match') == etag:
+        response = HttpResponse(status=status.HTTP_304_NOT_MODIFIED)
+    else:
+        response = FileResponse(
+            open(path, 'rb'), as_attachment=True, content_type='application/pdf',
+            filename=f"payslip-{payslip.run.year}-{payslip.run.month:02d}-{payslip.employee_code}.pdf"
+        )
+    response['ETag'] = etag
+    return response